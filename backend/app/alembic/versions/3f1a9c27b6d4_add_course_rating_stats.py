@@ -0,0 +1,58 @@
+"""add course rating stats
+
+Revision ID: 3f1a9c27b6d4
+Revises: 0e5287e02a3d
+Create Date: 2026-10-18 10:12:41.503118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1a9c27b6d4'
+down_revision: Union[str, Sequence[str], None] = '0e5287e02a3d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('course_rating_stats',
+    sa.Column('course_id', sa.Integer(), nullable=False),
+    sa.Column('rating_count', sa.Integer(), nullable=False),
+    sa.Column('rating_sum', sa.Integer(), nullable=False),
+    sa.Column('star_1', sa.Integer(), nullable=False),
+    sa.Column('star_2', sa.Integer(), nullable=False),
+    sa.Column('star_3', sa.Integer(), nullable=False),
+    sa.Column('star_4', sa.Integer(), nullable=False),
+    sa.Column('star_5', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['course_id'], ['courses.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('course_id')
+    )
+
+    # Backfill from existing ratings
+    op.execute("""
+        INSERT INTO course_rating_stats
+            (course_id, rating_count, rating_sum, star_1, star_2, star_3, star_4, star_5, updated_at)
+        SELECT
+            course_id,
+            COUNT(id),
+            COALESCE(SUM(rating), 0),
+            SUM(CASE WHEN rating = 1 THEN 1 ELSE 0 END),
+            SUM(CASE WHEN rating = 2 THEN 1 ELSE 0 END),
+            SUM(CASE WHEN rating = 3 THEN 1 ELSE 0 END),
+            SUM(CASE WHEN rating = 4 THEN 1 ELSE 0 END),
+            SUM(CASE WHEN rating = 5 THEN 1 ELSE 0 END),
+            NOW()
+        FROM ratings
+        GROUP BY course_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('course_rating_stats')
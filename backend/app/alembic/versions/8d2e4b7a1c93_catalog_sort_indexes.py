@@ -0,0 +1,44 @@
+"""catalog sort indexes
+
+Revision ID: 8d2e4b7a1c93
+Revises: 3f1a9c27b6d4
+Create Date: 2026-10-18 11:40:07.218456
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2e4b7a1c93'
+down_revision: Union[str, Sequence[str], None] = '3f1a9c27b6d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('courses', sa.Column('average_rating', sa.Float(), server_default='0', nullable=False))
+
+    op.execute("""
+        UPDATE courses SET average_rating = s.rating_sum::float / s.rating_count
+        FROM course_rating_stats s
+        WHERE s.course_id = courses.id AND s.rating_count > 0
+    """)
+
+    # Free courses carry price 0 so the price sort never has to handle NULLs
+    op.execute("UPDATE courses SET price = 0 WHERE price IS NULL")
+
+    op.create_index('ix_courses_published_created', 'courses', ['is_published', 'created_at', 'id'], unique=False)
+    op.create_index('ix_courses_published_rating', 'courses', ['is_published', 'average_rating', 'id'], unique=False)
+    op.create_index('ix_courses_published_price', 'courses', ['is_published', 'price', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_courses_published_price', table_name='courses')
+    op.drop_index('ix_courses_published_rating', table_name='courses')
+    op.drop_index('ix_courses_published_created', table_name='courses')
+    op.drop_column('courses', 'average_rating')
@@ -0,0 +1,81 @@
+"""course full text search
+
+Revision ID: a47c0e915d2b
+Revises: 8d2e4b7a1c93
+Create Date: 2026-10-18 13:05:52.671934
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a47c0e915d2b'
+down_revision: Union[str, Sequence[str], None] = '8d2e4b7a1c93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('courses', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+
+    # Course rows build their own vector, pulling the instructor name from users
+    op.execute("""
+        CREATE OR REPLACE FUNCTION courses_search_vector_update() RETURNS trigger AS $$
+        DECLARE
+            instructor_name text;
+        BEGIN
+            SELECT coalesce(first_name, '') || ' ' || coalesce(last_name, '')
+              INTO instructor_name
+              FROM users WHERE id = NEW.instructor_id;
+
+            NEW.search_vector :=
+                setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(NEW.sub_title, '')), 'B') ||
+                setweight(to_tsvector('english', coalesce(instructor_name, '')), 'B') ||
+                setweight(to_tsvector('english', coalesce(NEW.description, '')), 'C');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER courses_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF title, sub_title, description, instructor_id ON courses
+        FOR EACH ROW EXECUTE FUNCTION courses_search_vector_update();
+    """)
+
+    # Renaming an instructor re-indexes their courses
+    op.execute("""
+        CREATE OR REPLACE FUNCTION users_course_search_refresh() RETURNS trigger AS $$
+        BEGIN
+            UPDATE courses SET title = title WHERE instructor_id = NEW.id;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER users_course_search_trigger
+        AFTER UPDATE OF first_name, last_name ON users
+        FOR EACH ROW
+        WHEN (OLD.first_name IS DISTINCT FROM NEW.first_name OR OLD.last_name IS DISTINCT FROM NEW.last_name)
+        EXECUTE FUNCTION users_course_search_refresh();
+    """)
+
+    # Backfill existing rows through the trigger
+    op.execute("UPDATE courses SET title = title")
+
+    op.create_index('ix_courses_search_vector', 'courses', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_courses_search_vector', table_name='courses', postgresql_using='gin')
+    op.execute("DROP TRIGGER IF EXISTS users_course_search_trigger ON users")
+    op.execute("DROP FUNCTION IF EXISTS users_course_search_refresh()")
+    op.execute("DROP TRIGGER IF EXISTS courses_search_vector_trigger ON courses")
+    op.execute("DROP FUNCTION IF EXISTS courses_search_vector_update()")
+    op.drop_column('courses', 'search_vector')
@@ -5,6 +5,7 @@ from fastapi.middleware.cors import CORSMiddleware
 import os
 
 from database_config import engine, Base
+import database_config
 
 from routes.video_progress_route import router as video_progress_route
 from routes.instructor_route import router as instructor_route
@@ -12,10 +13,37 @@ from routes.payment_route import router as payment_route
 from routes.public_route import router as public_route
 from routes.admin_route import router as admin_route
 from routes.auth_route import router as auth_route
+from routes.media_route import router as media_route
 from routes.user_route import router as user_route
 
+from utils.email_worker import email_worker
+from utils.transcode_worker import transcode_worker
+from utils.image_variants import image_pool
+from utils.heartbeat_buffer import heartbeat_buffer
+from utils.payment_gateway import gateway
+from utils.payment_reconciler import payment_reconciler
+
 Base.metadata.create_all(bind=engine)
-app = FastAPI()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    Base.metadata.create_all(bind=engine)
+    email_worker.start()
+    transcode_worker.start()
+    heartbeat_buffer.start()
+    payment_reconciler.start()
+    yield
+    await payment_reconciler.stop()
+    await heartbeat_buffer.stop()
+    await transcode_worker.stop()
+    await email_worker.stop()
+    image_pool.shutdown()
+    await gateway.aclose()
+    if database_config.async_engine is not None:
+        await database_config.async_engine.dispose()
+
+app = FastAPI(lifespan=lifespan)
 
 
 
@@ -36,12 +64,8 @@ app.include_router(public_route, prefix="/public")
 app.include_router(admin_route, prefix="/admin")
 app.include_router(auth_route, prefix="/auth")
 app.include_router(user_route, prefix="/user")
+app.include_router(media_route, prefix="/media")
 
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
-
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    Base.metadata.create_all(bind=engine)
-    yield
-
-app.lifespan = lifespan
\ No newline at end of file
+# Only images are public; videos go through the signed /media routes
+app.mount("/uploads/course_images", StaticFiles(directory="uploads/course_images"), name="course_images")
+app.mount("/uploads/profile_images", StaticFiles(directory="uploads/profile_images"), name="profile_images")
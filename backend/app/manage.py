@@ -0,0 +1,299 @@
+# -------------------------------
+# Maintenance Commands
+# Usage: python manage.py <command>
+# -------------------------------
+import argparse
+
+from database_config import SessionLocal
+from models import user_models, category_model, course_model, video_model, video_progress_model, enrollment_model, payment_model, rating_stats_model, email_outbox_model, media_object_model
+
+
+# -------------------------------
+# Rebuild Course Rating Stats
+# -------------------------------
+def rebuild_rating_stats_command(args):
+    from utils.rating_stats import rebuild_rating_stats
+
+    db = SessionLocal()
+    try:
+        count = rebuild_rating_stats(db)
+        print(f"Rebuilt rating stats for {count} course(s)")
+    finally:
+        db.close()
+
+
+
+# -------------------------------
+# Rebuild Course Counters
+# -------------------------------
+def rebuild_course_counters_command(args):
+    from utils.course_stats import rebuild_course_counters
+
+    db = SessionLocal()
+    try:
+        count = rebuild_course_counters(db, args.course_id)
+        db.commit()
+        print(f"Rebuilt counters for {count} course(s)")
+    finally:
+        db.close()
+
+
+
+# -------------------------------
+# Local SMTP Stub
+# -------------------------------
+def smtp_stub_command(args):
+    import asyncio
+    from utils.smtp_stub import serve_forever
+
+    asyncio.run(serve_forever(args.host, args.port))
+
+
+
+# -------------------------------
+# Local SSLCommerz Stub
+# -------------------------------
+def sslcommerz_stub_command(args):
+    import asyncio
+    from utils.sslcommerz_stub import serve_forever
+
+    asyncio.run(serve_forever(args.host, args.port, args.delay, args.failure_rate))
+
+
+
+# -------------------------------
+# Purge Abandoned Resumable Uploads
+# -------------------------------
+def purge_uploads_command(args):
+    from utils.resumable_upload import purge_expired_sessions
+
+    removed = purge_expired_sessions(args.max_age_hours)
+    print(f"Removed {removed} abandoned upload session(s)")
+
+
+
+# -------------------------------
+# Queue Videos For HLS Transcoding
+# -------------------------------
+def queue_transcodes_command(args):
+    from models.video_model import VideoModel
+
+    statuses = ["none", "failed"] if args.retry_failed else ["none"]
+
+    db = SessionLocal()
+    try:
+        count = db.query(VideoModel).filter(
+            VideoModel.transcode_status.in_(statuses)
+        ).update({"transcode_status": "queued", "transcode_error": None}, synchronize_session=False)
+        db.commit()
+        print(f"Queued {count} video(s) for transcoding")
+    finally:
+        db.close()
+
+
+
+# -------------------------------
+# Backfill Image Variants
+# -------------------------------
+def backfill_image_variants_command(args):
+    import os
+    from concurrent.futures import ProcessPoolExecutor
+    from models.course_model import CourseModel
+    from models.user_models import UserModel
+    from utils.image_variants import generate_variants, store_variants, IMAGE_WORKERS
+
+    db = SessionLocal()
+    try:
+        courses = db.query(CourseModel.id, CourseModel.image_url).filter(CourseModel.image_url.isnot(None))
+        users = db.query(UserModel.id, UserModel.profile_image).filter(UserModel.profile_image.isnot(None))
+        if not args.force:
+            courses = courses.filter(CourseModel.image_variants.is_(None))
+            users = users.filter(UserModel.profile_image_variants.is_(None))
+
+        jobs = [("course", row.id, row.image_url) for row in courses] + \
+               [("profile", row.id, row.profile_image) for row in users]
+    finally:
+        db.close()
+
+    jobs = [job for job in jobs if os.path.isfile(job[2])]
+
+    done = failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers or IMAGE_WORKERS) as pool:
+        futures = [(job, pool.submit(generate_variants, job[2], job[0])) for job in jobs]
+        for (kind, entity_id, source), future in futures:
+            try:
+                store_variants(kind, entity_id, source, future.result())
+                done += 1
+            except Exception as e:
+                failed += 1
+                print(f"{source}: {str(e)}")
+
+    print(f"Generated variants for {done} image(s), {failed} failed")
+
+
+
+# -------------------------------
+# Media Garbage Collection
+# -------------------------------
+def gc_media_command(args):
+    from utils.storage import collect_garbage
+
+    db = SessionLocal()
+    try:
+        stats = collect_garbage(db, grace_seconds=args.grace_seconds, dry_run=args.dry_run)
+    finally:
+        db.close()
+
+    prefix = "Would remove" if args.dry_run else "Removed"
+    print(f"{prefix} {stats['objects_removed']} unreferenced object(s) and {stats['orphans_removed']} orphan file(s), "
+          f"{stats['bytes_freed'] / (1024 * 1024):.1f} MB")
+
+
+
+# -------------------------------
+# Repair Enrollment Progress Counters
+# -------------------------------
+def repair_enrollment_progress_command(args):
+    from utils.course_completision import sync_enrollment_progress
+    from models.enrollment_model import EnrollmentModel
+
+    db = SessionLocal()
+    try:
+        course_ids = [course_id for (course_id,) in db.query(EnrollmentModel.course_id).distinct()]
+        repaired = 0
+
+        # One course per transaction keeps row locks short on a live database
+        for course_id in course_ids:
+            repaired += sync_enrollment_progress(db, [course_id], drifted_only=True)
+            if args.dry_run:
+                db.rollback()
+            else:
+                db.commit()
+    finally:
+        db.close()
+
+    prefix = "Would repair" if args.dry_run else "Repaired"
+    print(f"{prefix} {repaired} enrollment(s) across {len(course_ids)} course(s)")
+
+
+
+# -------------------------------
+# Reconcile Stuck Payments
+# -------------------------------
+def reconcile_payments_command(args):
+    import asyncio
+    from utils.payment_reconciler import reconcile_payments
+    from utils.payment_gateway import gateway
+    import database_config
+
+    async def run():
+        try:
+            return await reconcile_payments(
+                dry_run=args.dry_run,
+                older_than_minutes=args.older_than_minutes,
+                batch_size=args.batch_size,
+                concurrency=args.concurrency
+            )
+        finally:
+            await gateway.aclose()
+            if database_config.async_engine is not None:
+                await database_config.async_engine.dispose()
+
+    report = asyncio.run(run())
+
+    for item in report["transactions"]:
+        print(f"  {item['transaction_id']}: {item['from']} -> {item['to'] or 'unchanged'} ({item['reason']})")
+
+    prefix = "Would settle" if args.dry_run else "Settled"
+    print(f"{prefix} {report['completed']} completed and {report['failed']} failed of {report['scanned']} scanned; "
+          f"{report['unchanged']} unchanged, {report['errors']} gateway error(s)")
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="E-Learning Platform maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser(
+        "rebuild-rating-stats",
+        help="Recompute course_rating_stats from the ratings table"
+    ).set_defaults(handler=rebuild_rating_stats_command)
+
+    rebuild_counters = commands.add_parser(
+        "rebuild-course-counters",
+        help="Recompute enrollment, rating, video and revenue counters on courses"
+    )
+    rebuild_counters.add_argument("--course-id", type=int, default=None)
+    rebuild_counters.set_defaults(handler=rebuild_course_counters_command)
+
+    smtp_stub = commands.add_parser(
+        "smtp-stub",
+        help="Run an in-memory SMTP server for local email testing"
+    )
+    smtp_stub.add_argument("--host", default="127.0.0.1")
+    smtp_stub.add_argument("--port", type=int, default=1025)
+    smtp_stub.set_defaults(handler=smtp_stub_command)
+
+    sslcommerz_stub = commands.add_parser(
+        "sslcommerz-stub",
+        help="Run a fake SSLCommerz gateway for local payment testing"
+    )
+    sslcommerz_stub.add_argument("--host", default="127.0.0.1")
+    sslcommerz_stub.add_argument("--port", type=int, default=8025)
+    sslcommerz_stub.add_argument("--delay", type=float, default=0.0, help="Seconds added to every response")
+    sslcommerz_stub.add_argument("--failure-rate", type=float, default=0.0, help="Share of requests answered with 503")
+    sslcommerz_stub.set_defaults(handler=sslcommerz_stub_command)
+
+    purge_uploads = commands.add_parser(
+        "purge-uploads",
+        help="Delete resumable upload sessions that were never finalized"
+    )
+    purge_uploads.add_argument("--max-age-hours", type=int, default=48)
+    purge_uploads.set_defaults(handler=purge_uploads_command)
+
+    queue_transcodes = commands.add_parser(
+        "queue-transcodes",
+        help="Queue videos uploaded before the HLS pipeline for transcoding"
+    )
+    queue_transcodes.add_argument("--retry-failed", action="store_true")
+    queue_transcodes.set_defaults(handler=queue_transcodes_command)
+
+    backfill_images = commands.add_parser(
+        "backfill-image-variants",
+        help="Generate thumbnails for course covers and profile pictures already under uploads/"
+    )
+    backfill_images.add_argument("--force", action="store_true", help="Regenerate images that already have variants")
+    backfill_images.add_argument("--workers", type=int, default=0)
+    backfill_images.set_defaults(handler=backfill_image_variants_command)
+
+    gc_media = commands.add_parser(
+        "gc-media",
+        help="Delete stored media that nothing references anymore"
+    )
+    gc_media.add_argument("--grace-seconds", type=int, default=24 * 3600)
+    gc_media.add_argument("--dry-run", action="store_true")
+    gc_media.set_defaults(handler=gc_media_command)
+
+    repair_progress = commands.add_parser(
+        "repair-enrollment-progress",
+        help="Recount watched/total videos and completion on enrollments that drifted"
+    )
+    repair_progress.add_argument("--dry-run", action="store_true")
+    repair_progress.set_defaults(handler=repair_enrollment_progress_command)
+
+    reconcile = commands.add_parser(
+        "reconcile-payments",
+        help="Ask the gateway about payments stuck in pending and settle them"
+    )
+    reconcile.add_argument("--dry-run", action="store_true")
+    reconcile.add_argument("--older-than-minutes", type=int, default=30)
+    reconcile.add_argument("--batch-size", type=int, default=100)
+    reconcile.add_argument("--concurrency", type=int, default=5)
+    reconcile.set_defaults(handler=reconcile_payments_command)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DateTime, Float, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DateTime, Float, Text, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from database_config import Base
 from datetime import datetime
 
@@ -11,12 +12,32 @@ class CourseModel(Base):
     sub_title = Column(String(1500), nullable=True)
     description = Column(Text, nullable=True)
     is_paid = Column(Boolean, default=False)
-    price = Column(Float, nullable=True)
+    price = Column(Float, nullable=False, default=0.0, server_default="0")   # 0 for free courses, so price sorts and cursors never see NULL
     is_published = Column(Boolean, default=False) 
     image_url = Column(String(255), nullable=True) 
+    image_variants = Column(Text, nullable=True)      # JSON map written by utils.image_variants
     instructor_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     category_id = Column(Integer, ForeignKey("categories.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    average_rating = Column(Float, nullable=False, default=0.0, server_default="0")
+    # Maintained by utils.course_stats in the enrollment, rating, video and payment write paths
+    enrollment_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_sum = Column(Integer, nullable=False, default=0, server_default="0")
+    video_count = Column(Integer, nullable=False, default=0, server_default="0")
+    revenue_total = Column(Float, nullable=False, default=0.0, server_default="0")
+    # Filled by the courses_search_vector trigger (title, sub_title, instructor name, description)
+    search_vector = deferred(Column(Text().with_variant(TSVECTOR(), "postgresql"), nullable=True))
     instructor = relationship("UserModel")
     videos = relationship("VideoModel", back_populates="course")
     category = relationship("CategoryModel", back_populates="courses")
+
+    __table_args__ = (
+        # Each public catalog sort order is a range scan over one of these
+        Index("ix_courses_published_created", "is_published", "created_at", "id"),
+        Index("ix_courses_published_rating", "is_published", "average_rating", "id"),
+        Index("ix_courses_published_price", "is_published", "price", "id"),
+        Index("ix_courses_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_courses_instructor_id", "instructor_id"),
+        Index("ix_courses_category_published", "category_id", "is_published"),
+    )
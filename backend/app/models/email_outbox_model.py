@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index
+from database_config import Base
+from datetime import datetime
+
+
+class EmailOutboxModel(Base):
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True)
+    recipient = Column(String(150), nullable=False)
+    template = Column(String(50), nullable=False)
+    context = Column(Text, nullable=True)              # JSON encoded template variables
+    status = Column(String(20), nullable=False, default="pending")   # pending / sending / sent / failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
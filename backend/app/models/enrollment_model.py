@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint, Index
 from database_config import Base
 from datetime import datetime
 
@@ -10,3 +10,15 @@ class EnrollmentModel(Base):
     user_id = Column(Integer, ForeignKey("users.id"))
     course_id = Column(Integer, ForeignKey("courses.id"))
     enrolled_at = Column(DateTime, default=datetime.utcnow)
+
+    # Kept in step by utils.course_completision.sync_enrollment_progress
+    watched_count = Column(Integer, nullable=False, default=0, server_default="0")
+    total_videos = Column(Integer, nullable=False, default=0, server_default="0")
+    completed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Also the conflict target of utils.payments.enroll_user
+        UniqueConstraint("user_id", "course_id", name="uq_enrollments_user_course"),
+        # The unique constraint already serves lookups by user; this one serves the per-course ones
+        Index("ix_enrollments_course_id", "course_id"),
+    )
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Index
+from database_config import Base
+from datetime import datetime
+
+
+class MediaObjectModel(Base):
+    __tablename__ = "media_objects"
+
+    sha256 = Column(String(64), primary_key=True)
+    storage_key = Column(String(255), nullable=False, unique=True)   # what video_url / image_url point at
+    size = Column(BigInteger, nullable=False, default=0)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    released_at = Column(DateTime, nullable=True)                     # last time ref_count dropped to 0
+
+    __table_args__ = (
+        Index("ix_media_objects_unreferenced", "ref_count", "released_at"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Boolean, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Boolean, Text, Index
 from sqlalchemy.orm import relationship
 from database_config import Base
 from datetime import datetime
@@ -12,14 +12,23 @@ class PaymentModel(Base):
     transaction_id = Column(String(100), unique=True, nullable=False)
     amount = Column(Float, nullable=False)
     currency = Column(String(10), default="BDT")
+    # pending -> validating -> completed | failed, or pending -> cancelled (see utils.payments)
     status = Column(String(50), default="pending")  
     payment_method = Column(String(50))
     payment_date = Column(DateTime, default=datetime.utcnow)
     sslcommerz_response = Column(Text, nullable=True)
+    status_changed_at = Column(DateTime, nullable=True)
     
     user = relationship("UserModel")
     course = relationship("CourseModel")
 
+    __table_args__ = (
+        Index("ix_payments_user_status", "user_id", "status"),
+        Index("ix_payments_course_status", "course_id", "status"),
+        # The reconciler's scan for stale pending / validating payments
+        Index("ix_payments_status_date", "status", "payment_date"),
+    )
+
 class RatingModel(Base):
     __tablename__ = "ratings"
 
@@ -31,4 +40,9 @@ class RatingModel(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     
     user = relationship("UserModel")
-    course = relationship("CourseModel")
\ No newline at end of file
+    course = relationship("CourseModel")
+
+    __table_args__ = (
+        # Course reviews, and the one-rating-per-user check
+        Index("ix_ratings_course_user", "course_id", "user_id"),
+    )
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from sqlalchemy.orm import relationship
+from database_config import Base
+from datetime import datetime
+
+
+class CourseRatingStatsModel(Base):
+    __tablename__ = "course_rating_stats"
+
+    course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"), primary_key=True)
+
+    # Star histogram only; the rating count and sum are courses.rating_count / rating_sum
+    star_1 = Column(Integer, nullable=False, default=0)
+    star_2 = Column(Integer, nullable=False, default=0)
+    star_3 = Column(Integer, nullable=False, default=0)
+    star_4 = Column(Integer, nullable=False, default=0)
+    star_5 = Column(Integer, nullable=False, default=0)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    course = relationship("CourseModel")
+
+    def distribution(self) -> dict:
+        return {str(star): getattr(self, f"star_{star}") or 0 for star in range(1, 6)}
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum, Text
 from database_config import Base
 import enum
 from datetime import datetime
@@ -16,6 +16,7 @@ class UserModel(Base):
     last_name = Column(String(100), nullable=False)
     email = Column(String(150), unique=True, index=True, nullable=False)
     profile_image: str = Column(String(255), nullable=True)
+    profile_image_variants = Column(Text, nullable=True)      # JSON map written by utils.image_variants
     password = Column(String(255), nullable=False)
 
     role = Column(Enum(UserRole), nullable=False)
@@ -25,7 +26,9 @@ class UserModel(Base):
 
     is_verified = Column(Boolean, default=False)
     is_blocked = Column(Boolean, default=False)
-    verification_token = Column(String(255), nullable=True)
+    verification_token = Column(String(255), nullable=True, index=True)
     token_expiry = Column(DateTime, nullable=True)
+    # Bumped to revoke every access token issued before it
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DateTime, Float
+from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DateTime, Float, Text, Index
 from sqlalchemy.orm import relationship
 from database_config import Base
 from datetime import datetime
@@ -14,4 +14,17 @@ class VideoModel(Base):
     video_url = Column(String(255), nullable=False)
     order = Column(Integer, nullable=False)   
 
+    # HLS transcoding: none (uploaded before the pipeline) | queued | processing | ready | failed
+    transcode_status = Column(String(20), nullable=False, default="queued", server_default="none")
+    hls_path = Column(String(255), nullable=True)
+    transcode_error = Column(Text, nullable=True)
+    transcode_started_at = Column(DateTime, nullable=True)
+    transcoded_at = Column(DateTime, nullable=True)
+
     course = relationship("CourseModel", back_populates="videos")
+
+    __table_args__ = (
+        Index("ix_videos_transcode_status", "transcode_status", "id"),
+        # Course playlists come back already in order
+        Index("ix_videos_course_order", "course_id", "order"),
+    )
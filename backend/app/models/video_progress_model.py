@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, Boolean, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from database_config import Base
 from datetime import datetime
@@ -15,6 +15,18 @@ class VideoProgressModel(Base):
     watched = Column(Boolean, default=False)
     watch_date = Column(DateTime, default=datetime.utcnow)
 
+    # Written in bulk by utils.heartbeat_buffer
+    position_seconds = Column(Float, nullable=False, default=0, server_default="0")
+    watch_seconds = Column(Float, nullable=False, default=0, server_default="0")
+    last_heartbeat_at = Column(DateTime, nullable=True)
+
     user = relationship("UserModel")
     video = relationship("VideoModel")
     course = relationship("CourseModel")
+
+    __table_args__ = (
+        # One row per user and video; also the conflict target of the batch upsert
+        UniqueConstraint("user_id", "video_id", name="uq_video_progress_user_video"),
+        Index("ix_video_progress_user_course", "user_id", "course_id"),
+        Index("ix_video_progress_video_id", "video_id"),
+    )
@@ -3,6 +3,7 @@
 # -------------------------------
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
+from typing import Optional
 
 
 
@@ -10,12 +11,18 @@ from sqlalchemy.orm import Session
 # -------------------------------
 # Import From Files
 # -------------------------------
+from utils.analytics import get_earnings_totals, get_earnings_transactions, format_name, ADMIN_SHARE, INSTRUCTOR_SHARE, DEFAULT_PAGE_SIZE
 from utils.send_email import send_blocked_notification_email, send_unblocked_notification_email
 from schemas.category_schema import CategoryCreate, CategoryResponse
 from models.category_model import CategoryModel
 from models.payment_model import PaymentModel
 from models.course_model import CourseModel
+from utils.principal import Principal, invalidate_principal
+from routes.auth_route import revoke_user_tokens
 from utils.permission import admin_required
+from utils.hash import hash_pool_stats
+from utils.payment_gateway import gateway
+from utils.cache import invalidate_public_categories, invalidate_public_courses, public_cache
 from models.user_models import UserModel
 from database_config import get_db
 
@@ -32,7 +39,7 @@ router = APIRouter(tags=["Admin"])
 @router.get("/users")
 def get_all_users(
     db: Session = Depends(get_db),
-    admin: UserModel = Depends(admin_required)
+    admin: Principal = Depends(admin_required)
 ):
     users = db.query(UserModel).all()
     return users
@@ -59,6 +66,7 @@ def create_category(
     )
     db.add(new_category)
     db.commit()
+    invalidate_public_categories()
     db.refresh(new_category)
 
     return new_category
@@ -93,6 +101,9 @@ def update_category(
     category.description = category_data.description
 
     db.commit()
+    # Cached course listings and details embed the category name
+    invalidate_public_categories()
+    invalidate_public_courses()
     db.refresh(category)
 
     return category
@@ -126,6 +137,8 @@ def delete_category(
 
     db.delete(category)
     db.commit()
+    invalidate_public_categories()
+    invalidate_public_courses()
 
     return {"message": "Category deleted successfully"}
 
@@ -135,10 +148,10 @@ def delete_category(
 # Block User
 # -------------------------------
 @router.put("/users/{user_id}/block")
-async def block_user(
+def block_user(
     user_id: int,
     db: Session = Depends(get_db),
-    admin_user: UserModel = Depends(admin_required)
+    admin_user: Principal = Depends(admin_required)
 ):
     user_to_block = db.query(UserModel).filter(UserModel.id == user_id).first()
     if not user_to_block:
@@ -151,12 +164,15 @@ async def block_user(
         return {"message": "User is already blocked"}
 
     user_to_block.is_blocked = True
-    db.commit()
-    
+    revoke_user_tokens(user_to_block)
+
     try:
-        await send_blocked_notification_email(user_to_block.email)
+        send_blocked_notification_email(db, user_to_block.email)
     except Exception as e:
-        print(f"Failed to send block email: {str(e)}")
+        print(f"Failed to queue block email: {str(e)}")
+
+    db.commit()
+    invalidate_principal(user_to_block.id)
 
     return {"message": f"User {user_to_block.first_name} has been blocked successfully."}
 
@@ -166,10 +182,10 @@ async def block_user(
 # Unblock User
 # -------------------------------
 @router.put("/users/{user_id}/unblock")
-async def unblock_user(
+def unblock_user(
     user_id: int,
     db: Session = Depends(get_db),
-    admin_user: UserModel = Depends(admin_required)
+    admin_user: Principal = Depends(admin_required)
 ):
     user_to_unblock = db.query(UserModel).filter(UserModel.id == user_id).first()
     if not user_to_unblock:
@@ -179,12 +195,14 @@ async def unblock_user(
         return {"message": "User is not blocked"}
 
     user_to_unblock.is_blocked = False
-    db.commit()
 
     try:
-        await send_unblocked_notification_email(user_to_unblock.email)
+        send_unblocked_notification_email(db, user_to_unblock.email)
     except Exception as e:
-        print(f"Failed to send unblock email: {str(e)}")
+        print(f"Failed to queue unblock email: {str(e)}")
+
+    db.commit()
+    invalidate_principal(user_to_unblock.id)
 
     return {"message": f"User {user_to_unblock.first_name} has been unblocked."}
 
@@ -194,46 +212,64 @@ async def unblock_user(
 # -------------------------------
 @router.get("/analytics/earnings")
 def get_admin_earnings(
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
-    admin_user: UserModel = Depends(admin_required)
+    admin_user: Principal = Depends(admin_required)
 ):
+    totals = get_earnings_totals(db)
+    rows, next_cursor = get_earnings_transactions(db, limit=limit, cursor=cursor)
 
-    payments = db.query(PaymentModel).filter(
-        PaymentModel.status == "completed"
-    ).all()
-
-    total_gross_revenue = 0.0
     transactions = []
-
-    for p in payments:
-        total_gross_revenue += p.amount
-        
-        course = db.query(CourseModel).filter(CourseModel.id == p.course_id).first()
-        course_title = course.title if course else "Unknown Course"
-        
-        instructor_name = "Unknown"
-        if course:
-            inst = db.query(UserModel).filter(UserModel.id == course.instructor_id).first()
-            if inst:
-                instructor_name = f"{inst.first_name} {inst.last_name}"
-
+    for row in rows:
         transactions.append({
-            "transaction_id": p.transaction_id,
-            "course_title": course_title,
-            "instructor": instructor_name,
-            "amount": p.amount,
-            "date": p.payment_date,
-            "admin_share": p.amount * 0.25,
-            "instructor_share": p.amount * 0.75
+            "transaction_id": row.transaction_id,
+            "course_title": row.course_title or "Unknown Course",
+            "instructor": format_name(row.instructor_first_name, row.instructor_last_name, "Unknown"),
+            "amount": row.amount,
+            "date": row.payment_date,
+            "admin_share": row.amount * ADMIN_SHARE,
+            "instructor_share": row.amount * INSTRUCTOR_SHARE
         })
 
-    admin_net_revenue = total_gross_revenue * 0.25
-    instructor_payouts = total_gross_revenue * 0.75
-
     return {
-        "total_gross_revenue": total_gross_revenue,
-        "admin_net_revenue": admin_net_revenue,
-        "total_instructor_payouts": instructor_payouts,
-        "total_transactions": len(transactions),
-        "transactions": transactions
-    }
\ No newline at end of file
+        "total_gross_revenue": totals["gross"],
+        "admin_net_revenue": totals["admin_share"],
+        "total_instructor_payouts": totals["instructor_share"],
+        "total_transactions": totals["count"],
+        "transactions": transactions,
+        "next_cursor": next_cursor
+    }
+
+
+
+# -------------------------------
+# Public Cache Stats
+# -------------------------------
+@router.get("/cache-stats")
+def get_cache_stats(
+    admin_user: Principal = Depends(admin_required)
+):
+    return public_cache.stats()
+
+
+
+# -------------------------------
+# Password Hashing Pool Stats
+# -------------------------------
+@router.get("/password-hashing-stats")
+def get_password_hashing_stats(
+    admin_user: Principal = Depends(admin_required)
+):
+    return hash_pool_stats()
+
+
+
+# -------------------------------
+# Payment Gateway Stats
+# -------------------------------
+@router.get("/payment-gateway-stats")
+def get_payment_gateway_stats(
+    admin_user: Principal = Depends(admin_required)
+):
+    return gateway.stats()
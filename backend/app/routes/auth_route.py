@@ -4,10 +4,12 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, status
 from fastapi.security import OAuth2PasswordBearer
 from fastapi.responses import RedirectResponse
+from starlette.concurrency import run_in_threadpool
 from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from sqlalchemy import select
 from uuid import uuid4
-import shutil
 import os
 
 
@@ -15,12 +17,15 @@ import os
 # Import Frm Files
 # -------------------------------
 from utils.jwt import create_access_token, decode_access_token
+from utils.principal import Principal, load_principal, invalidate_principal
 from schemas.password_schema import ChangePasswordModel, ForgotPasswordModel, ResetPasswordModel
-from utils.hash import hash_password, verify_password
+from utils.hash import hash_password_async, verify_password_async
 from utils.send_email import send_verification_email, send_reset_password_email
+from utils.image_variants import image_pool
+from utils.storage import store_upload_file, PROFILE_IMAGE_OBJECTS
 from models.user_models import UserModel, UserRole
 from schemas.user_schema import UserLogin
-from database_config import get_db
+from database_config import get_db, get_async_db
 
 
 
@@ -30,7 +35,7 @@ router = APIRouter(tags=["Auth"])
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-UPLOAD_DIR = "uploads/profile_images"
+UPLOAD_DIR = PROFILE_IMAGE_OBJECTS
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 
@@ -47,20 +52,24 @@ async def register_account(
     profile_image: UploadFile = File(None),
     db: Session = Depends(get_db)
 ):
-    existing_user = db.query(UserModel).filter(UserModel.email == email).first()
-    if existing_user:
+    # Session and file work runs in the threadpool; only password hashing is awaited on the loop
+    if await run_in_threadpool(email_registered, db, email):
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    image_path = None
-    if profile_image:
-        ext = profile_image.filename.split(".")[-1]
-        filename = f"{uuid4()}.{ext}"
-        file_location = f"{UPLOAD_DIR}/{filename}"
+    password_hash = await hash_password_async(password)
+    await run_in_threadpool(create_account, db, first_name, last_name, email, password_hash, role, profile_image)
+
+    return {"message": "Please check your email to verify your account."}
 
-        with open(file_location, "wb") as buffer:
-            shutil.copyfileobj(profile_image.file, buffer)
 
-        image_path = file_location  
+def email_registered(db: Session, email: str) -> bool:
+    return db.query(UserModel.id).filter(UserModel.email == email).first() is not None
+
+
+def create_account(db: Session, first_name: str, last_name: str, email: str, password_hash: str, role: str, profile_image: UploadFile | None):
+    image_path = None
+    if profile_image:
+        image_path = store_upload_file(db, profile_image.file, profile_image.filename, UPLOAD_DIR)
 
     token = str(uuid4())
     token_expiry = datetime.utcnow() + timedelta(hours=24)
@@ -70,7 +79,7 @@ async def register_account(
         first_name=first_name,
         last_name=last_name,
         email=email,
-        password=hash_password(password),
+        password=password_hash,
         role=UserRole(role),
         profile_image=image_path,
         is_verified=False,
@@ -79,12 +88,12 @@ async def register_account(
     )
 
     db.add(new_user)
+    send_verification_email(db, email, token)
     db.commit()
     db.refresh(new_user)
 
-    await send_verification_email(email, token)
-
-    return {"message": "Please check your email to verify your account."}
+    if image_path:
+        image_pool.schedule("profile", new_user.id, image_path)
 
 
 # -------------------------------
@@ -114,10 +123,12 @@ def verify_email(token: str, db: Session = Depends(get_db)):
 # User Login Route
 # -------------------------------
 @router.post("/login")
-def login(user: UserLogin, db: Session = Depends(get_db)):
-    db_user = db.query(UserModel).filter(UserModel.email == user.email).first()
+async def login(user: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    db_user = (await db.execute(
+        select(UserModel).where(UserModel.email == user.email)
+    )).scalars().first()
 
-    if not db_user or not verify_password(user.password, db_user.password):
+    if not db_user or not await verify_password_async(user.password, db_user.password):
         raise HTTPException(status_code=400, detail="Invalid credentials")
     
     if db_user.is_blocked:
@@ -134,7 +145,7 @@ def login(user: UserLogin, db: Session = Depends(get_db)):
         )
     
 
-    token = create_access_token({"user_id": db_user.id, "role": db_user.role.value})
+    token = create_access_token({"user_id": db_user.id, "role": db_user.role.value, "ver": db_user.token_version or 0})
     return {"access_token": token, "token_type": "bearer"}
 
 # from fastapi.security import OAuth2PasswordRequestForm
@@ -152,19 +163,44 @@ def login(user: UserLogin, db: Session = Depends(get_db)):
 # -------------------------------
 # Protected Function
 # -------------------------------
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def get_current_principal(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Principal:
+    """Authenticates the token against the cached principal; only touches the database on a cache miss"""
     try:
         payload = decode_access_token(token)
         user_id = payload.get("user_id")
         if not user_id:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-        user = db.query(UserModel).filter(UserModel.id == user_id).first()
-        if not user:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-        return user
+        principal = load_principal(db, user_id)
     except Exception:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
+    if not principal:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+
+    if payload.get("ver", 0) != principal.token_version:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has been revoked")
+
+    if principal.is_blocked:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Your account has been blocked. Please contact support."
+        )
+
+    return principal
+
+
+def get_current_user(principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
+    """Full user row, for routes that need profile fields or modify the user"""
+    user = db.query(UserModel).filter(UserModel.id == principal.id).first()
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    return user
+
+
+def revoke_user_tokens(user: UserModel):
+    """Invalidates every token issued so far; takes effect when the caller commits"""
+    user.token_version = UserModel.token_version + 1
+
 
 
 
@@ -174,16 +210,22 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
 # Change Password (Authenticated)
 # -------------------------------
 @router.post("/change-password")
-def change_password(
+async def change_password(
     data: ChangePasswordModel,
-    db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    principal: Principal = Depends(get_current_principal)
 ):
-    if not verify_password(data.old_password, current_user.password):
+    current_user = await db.get(UserModel, principal.id)
+    if not current_user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+
+    if not await verify_password_async(data.old_password, current_user.password):
         raise HTTPException(status_code=400, detail="Incorrect old password")
     
-    current_user.password = hash_password(data.new_password)
-    db.commit()
+    current_user.password = await hash_password_async(data.new_password)
+    revoke_user_tokens(current_user)
+    await db.commit()
+    invalidate_principal(current_user.id)
     
     return {"message": "Password changed successfully"}
 
@@ -193,7 +235,7 @@ def change_password(
 # NEW ROUTE 2: Forgot Password 
 # -------------------------------
 @router.post("/forgot-password")
-async def forgot_password(
+def forgot_password(
     data: ForgotPasswordModel,
     db: Session = Depends(get_db)
 ):
@@ -204,12 +246,13 @@ async def forgot_password(
     reset_token = str(uuid4())
     user.verification_token = reset_token
     user.token_expiry = datetime.utcnow() + timedelta(hours=1)
-    db.commit()
     
     try:
-        await send_reset_password_email(user.email, reset_token)
+        send_reset_password_email(db, user.email, reset_token)
     except Exception as e:
         raise HTTPException(status_code=500, detail="Failed to send email")
+
+    db.commit()
         
     return {"message": "If this email is registered, you will receive a reset link."}
 
@@ -218,11 +261,13 @@ async def forgot_password(
 # NEW ROUTE 3: Reset Password 
 # -------------------------------
 @router.post("/reset-password")
-def reset_password(
+async def reset_password(
     data: ResetPasswordModel,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = db.query(UserModel).filter(UserModel.verification_token == data.token).first()
+    user = (await db.execute(
+        select(UserModel).where(UserModel.verification_token == data.token)
+    )).scalars().first()
     
     if not user:
         raise HTTPException(status_code=400, detail="Invalid or expired token")
@@ -230,10 +275,12 @@ def reset_password(
     if user.token_expiry and datetime.utcnow() > user.token_expiry:
         raise HTTPException(status_code=400, detail="Token has expired")
         
-    user.password = hash_password(data.new_password)
+    user.password = await hash_password_async(data.new_password)
     
     user.verification_token = None
     user.token_expiry = None
-    db.commit()
+    revoke_user_tokens(user)
+    await db.commit()
+    invalidate_principal(user.id)
     
     return {"message": "Password reset successfully. You can now login."}
\ No newline at end of file
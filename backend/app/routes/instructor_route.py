@@ -1,12 +1,11 @@
 # -------------------------------
 # Import From Libraies
 # -------------------------------
-from fastapi import APIRouter, HTTPException, Depends, File, Form, UploadFile
+from fastapi import APIRouter, HTTPException, Depends, File, Form, UploadFile, Request, Response, Header
+from starlette.concurrency import run_in_threadpool
 from collections import Counter
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from uuid import uuid4
-import shutil
 import json
 import os
 # -------------------------------
@@ -20,20 +19,33 @@ from models.course_model import CourseModel
 from models.video_model import VideoModel
 from models.user_models import UserModel
 
-from schemas.course_schema import CourseCreate, CourseResponse, CourseOut, MultiVideoResponse, CourseListResponse, CourseDetailResponse
+from schemas.course_schema import CourseCreate, CourseResponse, CourseOut, MultiVideoResponse, CourseListResponse, CourseDetailResponse, ResumableUploadCreate, VideoResponse
 
+from utils.analytics import get_earnings_totals, get_earnings_transactions, format_name, INSTRUCTOR_SHARE, DEFAULT_PAGE_SIZE
 from utils.permission import instructor_required
+from utils.course_completision import sync_enrollment_progress
+from utils.course_stats import bump_course_counters
+from utils.principal import Principal
+from utils.cache import invalidate_public_courses
+from utils.media import invalidate_video_location, sign_media_path
+from utils.transcode_worker import transcode_worker
+from utils.transcode import remove_hls_output
+from utils.image_variants import image_pool
+from utils.storage import store_file, store_upload_file, release, remove_legacy_file, VIDEO_OBJECTS, COURSE_IMAGE_OBJECTS
+from utils.upload_stream import stream_multipart_upload, StreamedForm
+from utils import resumable_upload
 
 from database_config import get_db
 
 router = APIRouter(tags=["Instructor"])
 
 
-COURSE_IMAGE_DIR = "uploads/course_images"
+# Uploads land in the content-addressed object store (utils/storage.py)
+COURSE_IMAGE_DIR = COURSE_IMAGE_OBJECTS
 
 os.makedirs(COURSE_IMAGE_DIR, exist_ok=True)
 
-VIDEO_UPLOAD_DIR = "uploads/videos"
+VIDEO_UPLOAD_DIR = VIDEO_OBJECTS
 os.makedirs(VIDEO_UPLOAD_DIR, exist_ok=True)
 
 
@@ -61,21 +73,14 @@ def create_course(
 
     image_path = None
     if image:
-        ext = image.filename.split(".")[-1]
-        file_name = f"{uuid4()}.{ext}"
-        file_location = os.path.join(COURSE_IMAGE_DIR, file_name)
-
-        with open(file_location, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
-
-        image_path = file_location
+        image_path = store_upload_file(db, image.file, image.filename, COURSE_IMAGE_DIR)
 
     new_course = CourseModel(
         title=title,
         sub_title=sub_title,
         description=description,
         is_paid=is_paid,
-        price=price,
+        price=price if is_paid else 0.0,
         category_id=category_id,
         instructor_id=user.id,
         image_url=image_path
@@ -85,6 +90,9 @@ def create_course(
     db.commit()
     db.refresh(new_course)
 
+    if image_path:
+        image_pool.schedule("course", new_course.id, image_path)
+
     return new_course
 
 
@@ -119,7 +127,11 @@ def get_course_details(
 
     if not course:
         raise HTTPException(status_code=404, detail="Course not found or unauthorized")
-    return course
+
+    details = CourseDetailResponse.model_validate(course, from_attributes=True)
+    for video in details.videos:
+        video.video_url = sign_media_path(video.video_url)
+    return details
 
 
 
@@ -192,18 +204,23 @@ def update_course(
             raise HTTPException(404, "Category not found")
         course.category_id = category_id
 
+    previous_image = None
     if image:
-        ext = image.filename.split(".")[-1]
-        filename = f"{uuid4()}.{ext}"
-        image_path = f"{COURSE_IMAGE_DIR}/{filename}"
-        
-        with open(image_path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
-        
+        image_path = store_upload_file(db, image.file, image.filename, COURSE_IMAGE_DIR)
+
+        previous_image = course.image_url
         course.image_url = image_path
+        course.image_variants = None
+        release(db, previous_image)
 
     db.commit()
+    invalidate_public_courses()
     db.refresh(course)
+
+    if image:
+        remove_legacy_file(previous_image)
+        image_pool.schedule("course", course.id, course.image_url)
+
     return course
 
 
@@ -227,23 +244,19 @@ def publish_course(
         raise HTTPException(status_code=404, detail="Course not found or unauthorized")
     
     if publish_status is False:
-        enrolled_count = db.query(EnrollmentModel).filter(
-            EnrollmentModel.course_id == course_id
-        ).count()
-        
-        if enrolled_count > 0:
+        if course.enrollment_count > 0:
             raise HTTPException(
                 status_code=400, 
                 detail="Cannot unpublish this course because students are already enrolled."
             )
 
     if publish_status is True:
-        video_count = db.query(VideoModel).filter(VideoModel.course_id == course_id).count()
-        if video_count == 0:
+        if course.video_count == 0:
              raise HTTPException(status_code=400, detail="Cannot publish an empty course. Add at least one video.")
 
     course.is_published = publish_status
     db.commit()
+    invalidate_public_courses()
 
     status_msg = "Published" if publish_status else "Unpublished (Draft)"
     return {"message": f"Course has been {status_msg}", "is_published": course.is_published}
@@ -252,25 +265,53 @@ def publish_course(
 # Add video in Course
 # -------------------------------
 @router.post("/courses/{course_id}/add-video", response_model=MultiVideoResponse)
-def add_video(
+async def add_video(
     course_id: int,
-    titles: str = Form(...),   # JSON list: ["Intro", "Lesson 1"]
-    orders: str = Form(...),   # JSON list: [1, 2]
-    videos: List[UploadFile] = File(...),  # multiple video files
+    request: Request,
+    # Multipart fields, streamed by hand instead of declared as Form/File parameters:
+    #   titles: JSON list ["Intro", "Lesson 1"], orders: JSON list [1, 2], videos: multiple video files
     user = Depends(instructor_required),
     db: Session = Depends(get_db)
 ):
+    await run_in_threadpool(get_owned_course, db, course_id, user.id)
+
+    form = await stream_multipart_upload(request, VIDEO_UPLOAD_DIR)
+    try:
+        saved_videos = await run_in_threadpool(save_uploaded_videos, db, course_id, form)
+    except BaseException:
+        form.discard_files()
+        raise
+
+    invalidate_public_courses()
+    transcode_worker.notify()
+
+    return {
+        "message": "Videos uploaded successfully",
+        "uploaded_count": len(saved_videos),
+        "videos": saved_videos,
+        "checksums": [upload.sha256 for upload in form.get_files("videos")]
+    }
+
+
+def get_owned_course(db: Session, course_id: int, instructor_id: int) -> CourseModel:
     course = db.query(CourseModel).filter(
         CourseModel.id == course_id,
-        CourseModel.instructor_id == user.id
+        CourseModel.instructor_id == instructor_id
     ).first()
 
     if not course:
         raise HTTPException(404, "Course not found or unauthorized")
+    return course
+
+
+def save_uploaded_videos(db: Session, course_id: int, form: StreamedForm) -> list:
+    videos = form.get_files("videos")
+    if not videos or "titles" not in form.fields or "orders" not in form.fields:
+        raise HTTPException(400, "titles, orders and videos are required")
 
     try:
-        titles = json.loads(titles)
-        orders = json.loads(orders)
+        titles = json.loads(form.fields["titles"])
+        orders = json.loads(form.fields["orders"])
     except:
         raise HTTPException(400, "titles and orders must be JSON lists")
 
@@ -283,30 +324,123 @@ def add_video(
     saved_videos = []
 
     for idx, video in enumerate(videos):
-        ext = video.filename.split(".")[-1]
-        file_name = f"{uuid4()}.{ext}"
-        video_path = os.path.join(VIDEO_UPLOAD_DIR, file_name)
-
-        with open(video_path, "wb") as buffer:
-            shutil.copyfileobj(video.file, buffer)
-
         new_video = VideoModel(
             title=titles[idx],
             order=orders[idx],
-            video_url=video_path,
+            video_url=store_file(db, video.path, video.sha256, video.size, VIDEO_UPLOAD_DIR, video.filename),
             course_id=course_id
         )
 
         db.add(new_video)
         saved_videos.append(new_video)
 
+    db.flush()
+    bump_course_counters(db, course_id, video_count=len(saved_videos))
+    sync_enrollment_progress(db, [course_id])
     db.commit()
+    for video in saved_videos:
+        db.refresh(video)
 
-    return {
-        "message": "Videos uploaded successfully",
-        "uploaded_count": len(saved_videos),
-        "videos": saved_videos
-    }
+    return saved_videos
+
+
+
+# -------------------------------
+# RESUMABLE VIDEO UPLOADS
+# -------------------------------
+# Create a session, PATCH bytes at the current offset (HEAD tells where to resume
+# after a dropped connection), then finalize it into a video of the course.
+@router.post("/courses/{course_id}/uploads", status_code=201)
+def create_resumable_upload(
+    course_id: int,
+    data: ResumableUploadCreate,
+    response: Response,
+    user = Depends(instructor_required),
+    db: Session = Depends(get_db)
+):
+    get_owned_course(db, course_id, user.id)
+
+    session = resumable_upload.create_session(
+        instructor_id=user.id,
+        course_id=course_id,
+        filename=data.filename,
+        length=data.size,
+        title=data.title,
+        order=data.order
+    )
+
+    response.headers["Location"] = f"/instructor/uploads/{session['id']}"
+    response.headers["Upload-Offset"] = "0"
+    return {"upload_id": session["id"], "offset": 0, "length": session["length"]}
+
+
+@router.head("/uploads/{upload_id}")
+def get_upload_offset(upload_id: str, user = Depends(instructor_required)):
+    session = resumable_upload.load_session(upload_id, user.id)
+
+    return Response(status_code=200, headers={
+        "Upload-Offset": str(resumable_upload.current_offset(session)),
+        "Upload-Length": str(session["length"]),
+        "Cache-Control": "no-store"
+    })
+
+
+@router.patch("/uploads/{upload_id}", status_code=204)
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(...),
+    user = Depends(instructor_required)
+):
+    if request.headers.get("content-type") != "application/offset+octet-stream":
+        raise HTTPException(415, "Content-Type must be application/offset+octet-stream")
+
+    session = await run_in_threadpool(resumable_upload.load_session, upload_id, user.id)
+    offset = await resumable_upload.append_chunk(request, session, upload_offset)
+
+    return Response(status_code=204, headers={"Upload-Offset": str(offset)})
+
+
+@router.post("/uploads/{upload_id}/finalize", response_model=VideoResponse)
+def finalize_resumable_upload(
+    upload_id: str,
+    user = Depends(instructor_required),
+    db: Session = Depends(get_db)
+):
+    session = resumable_upload.load_session(upload_id, user.id)
+    get_owned_course(db, session["course_id"], user.id)
+
+    # Nothing is lost if this fails: the session survives until the commit went through
+    with resumable_upload.finalizing(session, VIDEO_UPLOAD_DIR) as (video_path, sha256):
+        try:
+            new_video = VideoModel(
+                title=session["title"],
+                order=session["order"],
+                video_url=store_file(db, video_path, sha256, session["length"], VIDEO_UPLOAD_DIR, session["filename"]),
+                course_id=session["course_id"]
+            )
+            db.add(new_video)
+            db.flush()
+            bump_course_counters(db, session["course_id"], video_count=1)
+            sync_enrollment_progress(db, [session["course_id"]])
+            db.commit()
+        except BaseException:
+            db.rollback()
+            raise
+
+    db.refresh(new_video)
+
+    invalidate_public_courses()
+    transcode_worker.notify()
+
+    return new_video
+
+
+@router.delete("/uploads/{upload_id}", status_code=204)
+def cancel_resumable_upload(upload_id: str, user = Depends(instructor_required)):
+    session = resumable_upload.load_session(upload_id, user.id)
+    resumable_upload.delete_session(session)
+    return Response(status_code=204)
 
 
 
@@ -314,32 +448,50 @@ def add_video(
 # MASTER VIDEO MANAGEMENT (Combines Update, Reorder, Add, Replace)
 # -------------------------------
 @router.put("/courses/{course_id}/manage-videos")
-def manage_course_videos(
+async def manage_course_videos(
     course_id: int,
-    video_updates: Optional[str] = Form(None),
-    
-    new_files: List[UploadFile] = File(None),
-    new_files_data: Optional[str] = Form(None),
-    
-    replace_files: List[UploadFile] = File(None),
-    replace_files_data: Optional[str] = Form(None),
-    
+    request: Request,
+    # Multipart fields, streamed by hand instead of declared as Form/File parameters:
+    #   video_updates, new_files + new_files_data, replace_files + replace_files_data
     user = Depends(instructor_required),
     db: Session = Depends(get_db)
 ):
-    import json
+    course = await run_in_threadpool(get_owned_course, db, course_id, user.id)
 
-    course = db.query(CourseModel).filter(
-        CourseModel.id == course_id,
-        CourseModel.instructor_id == user.id
-    ).first()
-
-    if not course:
-        raise HTTPException(status_code=404, detail="Course not found or unauthorized")
-    
     if course.is_published:
         raise HTTPException(status_code=400, detail="Cannot edit video details of a published course. Unpublish first.")
 
+    form = await stream_multipart_upload(request, VIDEO_UPLOAD_DIR)
+    try:
+        final_videos, replaced_paths = await run_in_threadpool(apply_video_changes, db, course_id, form)
+    except BaseException:
+        form.discard_files()
+        raise
+
+    for video in final_videos:
+        invalidate_video_location(video.id)
+    transcode_worker.notify()
+
+    # Old files are only removed once the new paths are committed
+    for path, hls_path in replaced_paths:
+        remove_hls_output(hls_path)
+        remove_legacy_file(path)
+
+    return {
+        "message": "Course videos updated successfully",
+        "videos": final_videos
+    }
+
+
+def apply_video_changes(db: Session, course_id: int, form: StreamedForm):
+    video_updates = form.fields.get("video_updates")
+    new_files = form.get_files("new_files")
+    new_files_data = form.fields.get("new_files_data")
+    replace_files = form.get_files("replace_files")
+    replace_files_data = form.fields.get("replace_files_data")
+
+    replaced_paths = []
+
     if video_updates:
         try:
             updates_list = json.loads(video_updates) # List[Dict]
@@ -375,19 +527,12 @@ def manage_course_videos(
 
         for i, file in enumerate(new_files):
             meta = new_meta_list[i]
-            
-            ext = file.filename.split(".")[-1]
-            filename = f"{uuid4()}.{ext}"
-            file_path = f"{VIDEO_UPLOAD_DIR}/{filename}"
-
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
 
             new_video = VideoModel(
                 course_id=course_id,
                 title=meta.get("title", file.filename),
                 order=meta.get("order", 0), 
-                video_url=file_path
+                video_url=store_file(db, file.path, file.sha256, file.size, VIDEO_UPLOAD_DIR, file.filename)
             )
             db.add(new_video)
 
@@ -413,20 +558,14 @@ def manage_course_videos(
             ).first()
             
             if target_video:
-                if os.path.exists(target_video.video_url):
-                    try:
-                        os.remove(target_video.video_url)
-                    except:
-                        pass
-                
-                ext = file.filename.split(".")[-1]
-                filename = f"{uuid4()}.{ext}"
-                file_path = f"{VIDEO_UPLOAD_DIR}/{filename}"
-
-                with open(file_path, "wb") as buffer:
-                    shutil.copyfileobj(file.file, buffer)
-                
-                target_video.video_url = file_path
+                replaced_paths.append((target_video.video_url, target_video.hls_path))
+                release(db, target_video.video_url)
+                target_video.video_url = store_file(db, file.path, file.sha256, file.size, VIDEO_UPLOAD_DIR, file.filename)
+                target_video.transcode_status = "queued"
+                target_video.hls_path = None
+                target_video.transcoded_at = None
+            else:
+                os.remove(file.path)
 
     db.flush()
 
@@ -446,16 +585,15 @@ def manage_course_videos(
             detail=f"Duplicate video orders found: {duplicates}. Every video must have a unique order number."
         )
 
+    bump_course_counters(db, course_id, video_count=len(new_files))
+    sync_enrollment_progress(db, [course_id])
     db.commit()
     
     final_videos = db.query(VideoModel).filter(
         VideoModel.course_id == course_id
     ).order_by(VideoModel.order).all()
-    
-    return {
-        "message": "Course videos updated successfully",
-        "videos": final_videos
-    }
+
+    return final_videos, replaced_paths
 
 
 
@@ -495,16 +633,21 @@ def delete_videos(
     deleted = 0
 
     for video in videos:
-        try:
-            if os.path.exists(video.video_url):
-                os.remove(video.video_url)
-        except:
-            pass
-
+        release(db, video.video_url)
         db.delete(video)
         deleted += 1
 
+    db.flush()
+    bump_course_counters(db, course_id, video_count=-deleted)
+    sync_enrollment_progress(db, [course_id])
     db.commit()
+    invalidate_public_courses()
+
+    # Files are only touched once the rows are gone
+    for video in videos:
+        invalidate_video_location(video.id)
+        remove_hls_output(video.hls_path)
+        remove_legacy_file(video.video_url)
 
     return {
         "message": "Videos deleted successfully",
@@ -538,25 +681,23 @@ def delete_course(
         )
 
     videos = db.query(VideoModel).filter(VideoModel.course_id == course.id).all()
-    
-    for video in videos:
-        try:
-            if os.path.exists(video.video_url):
-                os.remove(video.video_url)
-        except:
-            pass 
-
-    try:
-        if course.image_url and os.path.exists(course.image_url):
-            os.remove(course.image_url)
-    except:
-        pass
 
     for video in videos:
+        release(db, video.video_url)
         db.delete(video)
-        
+
+    release(db, course.image_url)
+    image_url = course.image_url
+
     db.delete(course)
     db.commit()
+    invalidate_public_courses()
+
+    for video in videos:
+        invalidate_video_location(video.id)
+        remove_hls_output(video.hls_path)
+        remove_legacy_file(video.video_url)
+    remove_legacy_file(image_url)
 
     return {"message": "Course deleted successfully"}
 
@@ -566,54 +707,29 @@ def delete_course(
 # ==========================================
 @router.get("/analytics/earnings")
 def get_instructor_earnings(
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
-    user: UserModel = Depends(instructor_required)
+    user: Principal = Depends(instructor_required)
 ):
-    
-    my_courses = db.query(CourseModel).filter(
-        CourseModel.instructor_id == user.id
-    ).all()
-    
-    my_course_ids = [c.id for c in my_courses]
-
-    if not my_course_ids:
-        return {
-            "total_sales": 0.0,
-            "net_earnings": 0.0,
-            "sales_count": 0,
-            "sales_history": []
-        }
-
-    payments = db.query(PaymentModel).filter(
-        PaymentModel.course_id.in_(my_course_ids),
-        PaymentModel.status == "completed"
-    ).all()
+    totals = get_earnings_totals(db, instructor_id=user.id)
+    rows, next_cursor = get_earnings_transactions(db, instructor_id=user.id, limit=limit, cursor=cursor)
 
-    total_sales = 0.0
     sales_history = []
-
-    for p in payments:
-        total_sales += p.amount
-        
-        course_title = next((c.title for c in my_courses if c.id == p.course_id), "Unknown")
-        
-        student = db.query(UserModel).filter(UserModel.id == p.user_id).first()
-        student_name = f"{student.first_name} {student.last_name}" if student else "Unknown Student"
-
+    for row in rows:
         sales_history.append({
-            "transaction_id": p.transaction_id,
-            "course_title": course_title,
-            "student_name": student_name,
-            "amount": p.amount,
-            "my_share": p.amount * 0.75,
-            "date": p.payment_date
+            "transaction_id": row.transaction_id,
+            "course_title": row.course_title or "Unknown",
+            "student_name": format_name(row.student_first_name, row.student_last_name, "Unknown Student"),
+            "amount": row.amount,
+            "my_share": row.amount * INSTRUCTOR_SHARE,
+            "date": row.payment_date
         })
 
-    net_earnings = total_sales * 0.75
-
     return {
-        "total_sales": total_sales,
-        "net_earnings": net_earnings,
-        "sales_count": len(sales_history),
-        "sales_history": sales_history
-    }
\ No newline at end of file
+        "total_sales": totals["gross"],
+        "net_earnings": totals["instructor_share"],
+        "sales_count": totals["count"],
+        "sales_history": sales_history,
+        "next_cursor": next_cursor
+    }
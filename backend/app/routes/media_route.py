@@ -0,0 +1,44 @@
+# -------------------------------
+# Import From Libraies
+# -------------------------------
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.orm import Session
+
+# -------------------------------
+# Import From Files
+# -------------------------------
+from routes.auth_route import get_current_principal
+from utils.media import get_video_location, has_course_access, media_file_response, verify_media_signature
+from utils.principal import Principal
+from database_config import get_db
+
+
+router = APIRouter(tags=["Media"])
+
+
+# -------------------------------
+# Stream Course Video (Range aware)
+# -------------------------------
+@router.api_route("/videos/{video_id}", methods=["GET", "HEAD"])
+def stream_video(
+    video_id: int,
+    request: Request,
+    current_user: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+):
+    path, course_id, instructor_id = get_video_location(db, video_id)
+
+    if not has_course_access(db, current_user, course_id, instructor_id):
+        raise HTTPException(status_code=403, detail="You must be enrolled in this course")
+
+    return media_file_response(request, path)
+
+
+
+
+# -------------------------------
+# Signed Media Links (no auth header, no database)
+# -------------------------------
+@router.api_route("/s/{expires}/{signature}/{path:path}", methods=["GET", "HEAD"])
+def stream_signed_media(expires: int, signature: str, path: str, request: Request):
+    return media_file_response(request, verify_media_signature(path, expires, signature))
@@ -1,20 +1,23 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.responses import RedirectResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from dotenv import load_dotenv
-from datetime import datetime
-import requests
 import uuid
-import json
 import os
 
 from models.payment_model import PaymentModel, RatingModel
 from utils.course_completision import is_course_completed
+from utils.rating_stats import record_rating, get_rating_stats, EMPTY_DISTRIBUTION
+from utils.cache import invalidate_public_courses
+from utils.payment_gateway import gateway, GatewayError, GatewayUnavailable
+from utils.payments import transition_payment, confirm_payment, enroll_user, PAYMENT_PENDING, PAYMENT_VALIDATING, PAYMENT_COMPLETED, PAYMENT_FAILED, PAYMENT_CANCELLED
 from models.enrollment_model import EnrollmentModel
 from schemas.rating_schema import RatingSchema
 from models.course_model import CourseModel
-from .auth_route import get_current_user
+from .auth_route import get_current_user, get_current_principal
+from utils.principal import Principal
 from models.user_models import UserModel
 from database_config import get_db
 from schemas.course_schema import PaymentReceipt
@@ -23,12 +26,6 @@ router = APIRouter(tags=["Payment"])
 
 load_dotenv()
 
-# Load Config from .env
-SSLCOMMERZ_STORE_ID = os.getenv("SSLCOMMERZ_STORE_ID")
-SSLCOMMERZ_STORE_PASSWORD = os.getenv("SSLCOMMERZ_STORE_PASSWORD")
-SSLCOMMERZ_SESSION_API = os.getenv("SSLCOMMERZ_SESSION_API")
-SSLCOMMERZ_VALIDATION_API = os.getenv("SSLCOMMERZ_VALIDATION_API")
-
 
 # --- FRONTEND REDIRECT URL ---
 FRONTEND_SUCCESS_URL = "http://localhost:5173/student/course" 
@@ -38,12 +35,44 @@ FRONTEND_FAIL_URL = "http://localhost:5173/courses"
 
 
 @router.post("/purchase/{course_id}")
-def initiate_payment(
+async def initiate_payment(
     course_id: int,
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_user)
 ):
     """Handle enrollment for both Free and Paid courses"""
+
+    # Database work runs in the threadpool; the gateway round trip is awaited on the loop
+    payload = await run_in_threadpool(prepare_purchase, db, current_user, course_id)
+
+    if payload is None:
+        return {
+            "status": "success", 
+            "message": "Successfully enrolled in free course",
+            "type": "free_enrollment"
+        }
+
+    try:
+        response_data = await gateway.create_session(payload)
+    except GatewayUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except GatewayError as e:
+        raise HTTPException(status_code=502, detail=f"Payment gateway error: {str(e)}")
+
+    if response_data.get('status') != 'SUCCESS':
+        raise HTTPException(status_code=400, detail="Failed to initiate payment")
+
+    return {
+        "status": "success",
+        "message": "Payment initiated successfully",
+        "type": "payment_redirect",
+        "GatewayPageURL": response_data.get('GatewayPageURL'),
+        "transaction_id": payload['tran_id']
+    }
+
+
+def prepare_purchase(db: Session, current_user: UserModel, course_id: int) -> Optional[dict]:
+    """Enrolls directly in a free course (returns None), or records a pending payment and returns the gateway session payload"""
     
     if current_user.role.value == "admin":
         raise HTTPException(
@@ -73,19 +102,10 @@ def initiate_payment(
     # SCENARIO A: Free Course (Direct Enrollment)
     # ======================================================
     if not course.is_paid:
-        new_enrollment = EnrollmentModel(
-            user_id=current_user.id,
-            course_id=course_id,
-            enrolled_at=datetime.utcnow()
-        )
-        db.add(new_enrollment)
+        if not enroll_user(db, current_user.id, course_id):
+            raise HTTPException(status_code=400, detail="You are already enrolled in this course")
         db.commit()
-        
-        return {
-            "status": "success", 
-            "message": "Successfully enrolled in free course",
-            "type": "free_enrollment"
-        }
+        return None
 
     # ======================================================
     # SCENARIO B: Paid Course (SSLCommerz Payment)
@@ -94,19 +114,7 @@ def initiate_payment(
     # unique transaction ID
     transaction_id = str(uuid.uuid4())
     
-    payment = PaymentModel(
-        user_id=current_user.id,
-        course_id=course_id,
-        transaction_id=transaction_id,
-        amount=course.price,
-        status="pending"
-    )
-    db.add(payment)
-    db.commit()
-    
     payload = {
-        'store_id': SSLCOMMERZ_STORE_ID,
-        'store_passwd': SSLCOMMERZ_STORE_PASSWORD,
         'total_amount': course.price,
         'currency': 'BDT',
         'tran_id': transaction_id,
@@ -125,24 +133,39 @@ def initiate_payment(
         'product_category': 'Education',
         'product_profile': 'general'
     }
-    
+
+    payment = PaymentModel(
+        user_id=current_user.id,
+        course_id=course_id,
+        transaction_id=transaction_id,
+        amount=course.price,
+        status=PAYMENT_PENDING
+    )
+    db.add(payment)
+    db.commit()
+
+    return payload
+
+
+def find_payment(db: Session, transaction_id: str) -> PaymentModel:
+    payment = db.query(PaymentModel).filter(PaymentModel.transaction_id == transaction_id).first()
+    if not payment:
+        raise HTTPException(status_code=404, detail="Payment not found")
+    return payment
+
+
+def settle_payment(db: Session, transaction_id: str, to_status: str):
+    transition_payment(db, transaction_id, to_status)
+    db.commit()
+
+
+async def _callback_val_id(request: Request) -> Optional[str]:
     try:
-        response = requests.post(SSLCOMMERZ_SESSION_API, data=payload)
-        response_data = response.json()
-        
-        if response_data.get('status') == 'SUCCESS':
-            return {
-                "status": "success",
-                "message": "Payment initiated successfully",
-                "type": "payment_redirect",
-                "GatewayPageURL": response_data.get('GatewayPageURL'),
-                "transaction_id": transaction_id
-            }
-        else:
-            raise HTTPException(status_code=400, detail="Failed to initiate payment")
-            
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Payment gateway error: {str(e)}")
+        form_data = await request.form()
+        return form_data.get('val_id')
+    except Exception:
+        return None
+
 
 
 @router.post("/success/{transaction_id}")
@@ -151,64 +174,32 @@ async def payment_success(
     request: Request, 
     db: Session = Depends(get_db)
 ):
-    payment = db.query(PaymentModel).filter(PaymentModel.transaction_id == transaction_id).first()
-    if not payment:
-        raise HTTPException(status_code=404, detail="Payment not found")
-    
-    
-    try:
-        form_data = await request.form()
-        val_id = form_data.get('val_id')
-    except Exception:
-        val_id = None
-    
+    payment = await run_in_threadpool(find_payment, db, transaction_id)
+
+    # Repeated callbacks for a settled payment stop here, before any gateway call
+    if payment.status == PAYMENT_COMPLETED:
+        return RedirectResponse(url=FRONTEND_SUCCESS_URL, status_code=303)
+    if payment.status != PAYMENT_PENDING and payment.status != PAYMENT_VALIDATING:
+        raise HTTPException(status_code=400, detail=f"Payment is already {payment.status}")
+
+    val_id = await _callback_val_id(request)
     
     if not val_id:
-        
-        payment.status = "failed"
-        db.commit()
+        await run_in_threadpool(settle_payment, db, transaction_id, PAYMENT_FAILED)
         raise HTTPException(status_code=400, detail="Validation ID missing from payment gateway response")
 
-    validation_params = {
-        'val_id': val_id, 
-        'store_id': SSLCOMMERZ_STORE_ID,
-        'store_passwd': SSLCOMMERZ_STORE_PASSWORD,
-        'format': 'json'
-    }
-    
     try:
-        response = requests.get(SSLCOMMERZ_VALIDATION_API, params=validation_params)
-        validation_data = response.json()
-        
-        if validation_data.get('status') == 'VALID' or validation_data.get('status') == 'VALIDATED':
-            payment.status = "completed"
-            payment.sslcommerz_response = json.dumps(validation_data)
-            
-            existing_enrollment = db.query(EnrollmentModel).filter(
-                EnrollmentModel.user_id == payment.user_id,
-                EnrollmentModel.course_id == payment.course_id
-            ).first()
-
-            if not existing_enrollment:
-                enrollment = EnrollmentModel(
-                    user_id=payment.user_id,
-                    course_id=payment.course_id,
-                    enrolled_at=datetime.utcnow()
-                )
-                db.add(enrollment)
-            
-            db.commit()
-            
-            # return {"status": "success", "message": "Payment completed successfully"}
-            return RedirectResponse(url=FRONTEND_SUCCESS_URL, status_code=303) 
-
-        else:
-            payment.status = "failed"
-            db.commit()
-            raise HTTPException(status_code=400, detail="Payment validation failed during verification")
-            
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Payment validation error: {str(e)}")
+        result = await confirm_payment(db, payment, val_id)
+    except GatewayUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except GatewayError as e:
+        raise HTTPException(status_code=502, detail=f"Payment validation error: {str(e)}")
+
+    if result == PAYMENT_COMPLETED or result == PAYMENT_VALIDATING:
+        # `validating`: a concurrent callback holds the claim and will enroll the user
+        return RedirectResponse(url=FRONTEND_SUCCESS_URL, status_code=303) 
+
+    raise HTTPException(status_code=400, detail="Payment validation failed during verification")
 
 
 @router.post("/fail/{transaction_id}")
@@ -218,10 +209,8 @@ def payment_fail(
 ):
     """Handle failed payment"""
     
-    payment = db.query(PaymentModel).filter(PaymentModel.transaction_id == transaction_id).first()
-    if payment:
-        payment.status = "failed"
-        db.commit()
+    # A late fail callback can't undo a completed payment
+    settle_payment(db, transaction_id, PAYMENT_FAILED)
     
     # return {"status": "failed", "message": "Payment failed"}
     return RedirectResponse(url=FRONTEND_FAIL_URL, status_code=303)
@@ -233,26 +222,35 @@ def payment_cancel(
 ):
     """Handle cancelled payment"""
     
-    payment = db.query(PaymentModel).filter(PaymentModel.transaction_id == transaction_id).first()
-    if payment:
-        payment.status = "cancelled"
-        db.commit()
+    settle_payment(db, transaction_id, PAYMENT_CANCELLED)
     
     # return {"status": "cancelled", "message": "Payment cancelled"}
     return RedirectResponse(url=FRONTEND_FAIL_URL, status_code=303)
 
 @router.post("/payment/ipn/{transaction_id}")
-def payment_ipn(
+async def payment_ipn(
     transaction_id: str,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """Handle Instant Payment Notification"""
     
-    payment = db.query(PaymentModel).filter(PaymentModel.transaction_id == transaction_id).first()
-    if not payment:
-        raise HTTPException(status_code=404, detail="Payment not found")
-    
-    return {"status": "received"}
+    payment = await run_in_threadpool(find_payment, db, transaction_id)
+
+    if payment.status != PAYMENT_PENDING:
+        return {"status": "received", "payment_status": payment.status}
+
+    val_id = await _callback_val_id(request)
+    if not val_id:
+        return {"status": "received", "payment_status": payment.status}
+
+    try:
+        result = await confirm_payment(db, payment, val_id)
+    except GatewayError as e:
+        # The gateway retries IPNs; answering 503 asks it to
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return {"status": "received", "payment_status": result}
 
 
 
@@ -265,7 +263,7 @@ def add_rating(
     course_id: int,
     rating_data: RatingSchema, 
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     
     rating = rating_data.rating
@@ -303,7 +301,9 @@ def add_rating(
         comment=comment
     )
     db.add(new_rating)
+    record_rating(db, course_id, rating)
     db.commit()
+    invalidate_public_courses()
     
     return {"status": "success", "message": "Rating added successfully"}
 
@@ -332,33 +332,21 @@ def get_course_rating_summary(
     db: Session = Depends(get_db)
 ):
 
-    from sqlalchemy import func
-    
-    ratings = db.query(RatingModel).filter(RatingModel.course_id == course_id).all()
-    
-    if not ratings:
+    totals = db.query(CourseModel.rating_count, CourseModel.rating_sum).filter(CourseModel.id == course_id).first()
+
+    if not totals or not totals.rating_count:
         return {
             "average_rating": 0,
             "total_ratings": 0,
-            "rating_distribution": {"1": 0, "2": 0, "3": 0, "4": 0, "5": 0}
+            "rating_distribution": dict(EMPTY_DISTRIBUTION)
         }
-    
-    total_ratings = len(ratings)
-    average_rating = sum(r.rating for r in ratings) / total_ratings
-    
-    rating_counts = db.query(
-        RatingModel.rating,
-        func.count(RatingModel.id)
-    ).filter(RatingModel.course_id == course_id).group_by(RatingModel.rating).all()
-    
-    distribution = {"1": 0, "2": 0, "3": 0, "4": 0, "5": 0}
-    for rating, count in rating_counts:
-        distribution[str(rating)] = count
-    
+
+    stats = get_rating_stats(db, course_id)
+
     return {
-        "average_rating": round(average_rating, 2),
-        "total_ratings": total_ratings,
-        "rating_distribution": distribution
+        "average_rating": round(totals.rating_sum / totals.rating_count, 2),
+        "total_ratings": totals.rating_count,
+        "rating_distribution": stats.distribution() if stats else dict(EMPTY_DISTRIBUTION)
     }
 
 
@@ -369,7 +357,7 @@ def get_course_rating_summary(
 @router.get("/payment-history", response_model=List[PaymentReceipt])
 def get_my_payment_history(
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     payments = db.query(PaymentModel).filter(
         PaymentModel.user_id == current_user.id,
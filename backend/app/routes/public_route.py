@@ -1,9 +1,13 @@
 # -------------------------------
 # Import From Libraies
 # -------------------------------
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
+from typing import Literal, Optional
+from urllib.parse import urlencode
+from datetime import datetime
+from sqlalchemy import func, select
 
 
 # -------------------------------
@@ -17,20 +21,40 @@ from models.payment_model import RatingModel
 from schemas.course_schema import CourseOut
 from models.video_model import VideoModel
 from utils.permission import admin_required
-from database_config import get_db
+from utils.cache import async_cached_json_response
+from utils.pagination import encode_cursor, decode_cursor, keyset_filter
+from utils.search import search_courses
+from utils.image_variants import parse_variants
+from database_config import get_db, get_async_db
 
 router = APIRouter(tags=["Public"])
 
 
+CATALOG_PAGE_SIZE = 24
+CATALOG_MAX_PAGE_SIZE = 100
+
+# sort name -> (indexed column, descending)
+CATALOG_SORTS = {
+    "newest": (CourseModel.created_at, True),
+    "rating": (CourseModel.average_rating, True),
+    "price_asc": (CourseModel.price, False),
+    "price_desc": (CourseModel.price, True)
+}
+
+
 
 
 # -------------------------------
 # Get all Categories
 # -------------------------------
 @router.get("/all-categories", response_model=list[CategoryResponse])
-def get_all_categories(db: Session = Depends(get_db)):
-    categories = db.query(CategoryModel).all()
-    return categories
+async def get_all_categories(db: AsyncSession = Depends(get_async_db)):
+    return await async_cached_json_response("categories", lambda: build_all_categories(db))
+
+
+async def build_all_categories(db: AsyncSession):
+    categories = (await db.execute(select(CategoryModel))).scalars().all()
+    return [CategoryResponse.model_validate(c) for c in categories]
 
 
 
@@ -38,33 +62,93 @@ def get_all_categories(db: Session = Depends(get_db)):
 # Get all Courses
 # -------------------------------
 @router.get("/courses")
-def get_public_courses(
-    db: Session = Depends(get_db)
+async def get_public_courses(
+    category_id: Optional[int] = None,
+    is_paid: Optional[bool] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    instructor_id: Optional[int] = None,
+    min_rating: Optional[float] = None,
+    sort: Literal["newest", "rating", "price_asc", "price_desc"] = "newest",
+    limit: int = Query(CATALOG_PAGE_SIZE, ge=1, le=CATALOG_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    
-    courses_query = db.query(
+    filters = {
+        "category_id": category_id,
+        "is_paid": is_paid,
+        "min_price": min_price,
+        "max_price": max_price,
+        "instructor_id": instructor_id,
+        "min_rating": min_rating
+    }
+
+    cache_key = "courses?" + urlencode(sorted(
+        [(k, v) for k, v in filters.items() if v is not None] +
+        [("sort", sort), ("limit", limit), ("cursor", cursor or "")]
+    ))
+
+    return await async_cached_json_response(cache_key, lambda: build_public_courses(db, filters, sort, limit, cursor))
+
+
+async def build_public_courses(db: AsyncSession, filters: dict, sort: str, limit: int, cursor: str | None):
+    sort_column, descending = CATALOG_SORTS[sort]
+
+    courses_query = select(
         CourseModel,
         CategoryModel.name.label("category_name"),
         UserModel.first_name,
         UserModel.last_name,
         UserModel.profile_image,
-        func.coalesce(func.avg(RatingModel.rating), 0).label("average_rating"),
-        func.count(RatingModel.id).label("total_ratings")
+        UserModel.profile_image_variants
     ).join(
         UserModel, CourseModel.instructor_id == UserModel.id
     ).join(
         CategoryModel, CourseModel.category_id == CategoryModel.id
-    ).outerjoin(
-        RatingModel, CourseModel.id == RatingModel.course_id
-    ).filter(
+    ).where(
         CourseModel.is_published == True 
-    ).group_by(
-        CourseModel.id, CategoryModel.id, UserModel.id
-    ).all()
+    )
+
+    if filters["category_id"] is not None:
+        courses_query = courses_query.filter(CourseModel.category_id == filters["category_id"])
+    if filters["is_paid"] is not None:
+        courses_query = courses_query.filter(CourseModel.is_paid == filters["is_paid"])
+    if filters["min_price"] is not None:
+        courses_query = courses_query.filter(CourseModel.price >= filters["min_price"])
+    if filters["max_price"] is not None:
+        courses_query = courses_query.filter(CourseModel.price <= filters["max_price"])
+    if filters["instructor_id"] is not None:
+        courses_query = courses_query.filter(CourseModel.instructor_id == filters["instructor_id"])
+    if filters["min_rating"] is not None:
+        courses_query = courses_query.filter(CourseModel.average_rating >= filters["min_rating"])
+
+    if cursor:
+        value_type = datetime if sort == "newest" else float
+        last_value, last_id = decode_cursor(cursor, value_type, int)
+        if last_value is None or last_id is None:
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+        courses_query = courses_query.filter(
+            keyset_filter(sort_column, CourseModel.id, last_value, last_id, descending)
+        )
+
+    if descending:
+        courses_query = courses_query.order_by(sort_column.desc(), CourseModel.id.desc())
+    else:
+        courses_query = courses_query.order_by(sort_column.asc(), CourseModel.id.asc())
+
+    courses_query = (await db.execute(courses_query.limit(limit + 1))).all()
+
+    next_cursor = None
+    if len(courses_query) > limit:
+        courses_query = courses_query[:limit]
+        last_course = courses_query[-1][0]
+        next_cursor = encode_cursor(getattr(last_course, sort_column.key), last_course.id)
 
     result = []
     
-    for course, cat_name, fname, lname, p_image, avg_rating, count in courses_query:
+    for course, cat_name, fname, lname, p_image, p_variants in courses_query:
+        count = course.rating_count
+        avg_rating = course.rating_sum / count if count else 0.0
         result.append({
             "id": course.id,
             "title": course.title,
@@ -73,56 +157,83 @@ def get_public_courses(
             "rating": round(avg_rating, 1), 
             "total_ratings": count,
             "image_url": course.image_url,
+            "image_variants": parse_variants(course.image_variants),
             "instructor_id": course.instructor_id,
             "instructor_name": f"{fname} {lname}",
             "instructor_image": p_image,
+            "instructor_image_variants": parse_variants(p_variants),
             "price": course.price if course.is_paid else 0.0,
             "is_paid": course.is_paid
         })
 
     return {
         "count": len(result),
-        "courses": result
+        "courses": result,
+        "next_cursor": next_cursor
     }
 
 
+# -------------------------------
+# Search Courses
+# -------------------------------
+@router.get("/search")
+async def search_public_courses(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=CATALOG_MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db)
+):
+    cache_key = "courses:search?" + urlencode({"q": q.strip().lower(), "limit": limit})
+
+    async def build():
+        results = await db.run_sync(lambda session: search_courses(session, q, limit))
+        return {"query": q, "count": len(results), "results": results}
+
+    return await async_cached_json_response(cache_key, build)
+
+
+
 # -------------------------------
 # Get Course Details
 # -------------------------------
 @router.get("/courses/{course_id}")
-def get_public_course_details(
+async def get_public_course_details(
     course_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    
-    course_data = db.query(
+    return await async_cached_json_response(f"courses:{course_id}", lambda: build_public_course_details(db, course_id))
+
+
+async def build_public_course_details(db: AsyncSession, course_id: int):
+    course_data = (await db.execute(select(
         CourseModel,
         CategoryModel.name.label("category_name"),
         UserModel.first_name,
         UserModel.last_name,
         UserModel.profile_image,
+        UserModel.profile_image_variants,
         UserModel.headline
     ).join(
         UserModel, CourseModel.instructor_id == UserModel.id
     ).join(
         CategoryModel, CourseModel.category_id == CategoryModel.id
-    ).filter(
+    ).where(
         CourseModel.id == course_id,
         CourseModel.is_published == True 
-    ).first()
+    ))).first()
 
     if not course_data:
         raise HTTPException(status_code=404, detail="Course not found")
 
-    course, cat_name, fname, lname, p_image, headline = course_data
+    course, cat_name, fname, lname, p_image, p_variants, headline = course_data
 
-    ratings = db.query(RatingModel).filter(RatingModel.course_id == course_id).all()
-    
-    total_ratings = len(ratings)
-    average_rating = 0.0
-    
-    if total_ratings > 0:
-        average_rating = round(sum(r.rating for r in ratings) / total_ratings, 1)
+    total_ratings = course.rating_count
+    average_rating = round(course.rating_sum / total_ratings, 1) if total_ratings else 0.0
+
+    ratings = (await db.execute(
+        select(RatingModel).options(
+            joinedload(RatingModel.user)
+        ).where(RatingModel.course_id == course_id)
+    )).scalars().all()
 
     reviews = []
     for r in ratings:
@@ -135,7 +246,9 @@ def get_public_course_details(
             "created_at": r.created_at
         })
 
-    videos_sorted = sorted(course.videos, key=lambda v: v.order if v.order else 0)
+    videos_sorted = (await db.execute(
+        select(VideoModel).where(VideoModel.course_id == course_id).order_by(VideoModel.order)
+    )).scalars().all()
 
     return {
         "id": course.id,
@@ -145,12 +258,14 @@ def get_public_course_details(
         "is_paid": course.is_paid,
         "price": course.price if course.is_paid else 0.0,
         "image_url": course.image_url,
+        "image_variants": parse_variants(course.image_variants),
         "category": cat_name,
         "rating": average_rating,       
         "total_ratings": total_ratings, 
         "instructor_id": course.instructor_id,
         "instructor_name": f"{fname} {lname}",
         "instructor_image": p_image,
+        "instructor_image_variants": parse_variants(p_variants),
         "instructor_headline": headline,
         "videos": [
             {
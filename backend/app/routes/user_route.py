@@ -2,10 +2,9 @@
 # Import From Lybries
 # -------------------------------
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import Optional, List
-from uuid import uuid4
-import shutil
 import os
 
 
@@ -20,12 +19,18 @@ from models.category_model import CategoryModel
 from models.course_model import CourseModel
 from models.user_models import UserModel
 from models.video_model import VideoModel
-from .auth_route import get_current_user 
+from .auth_route import get_current_user, get_current_principal
+from utils.principal import Principal, invalidate_principal
 from database_config import get_db
+from utils.cache import invalidate_public_courses
+from utils.media import sign_media_path, sign_hls_playlist
+from utils.image_variants import image_pool
+from utils.heartbeat_buffer import heartbeat_buffer
+from utils.storage import store_upload_file, release, remove_legacy_file, PROFILE_IMAGE_OBJECTS
 
 router = APIRouter(tags=["User"])
 
-UPLOAD_DIR = "uploads/profile_images"
+UPLOAD_DIR = PROFILE_IMAGE_OBJECTS
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 
@@ -59,6 +64,34 @@ async def update_profile(
     profile_image: UploadFile = File(None),
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_user)
+):
+    # Session and file work would block the event loop, so it runs in the threadpool
+    await run_in_threadpool(apply_profile_update, db, current_user, first_name, last_name, email, headline, bio, profile_image)
+
+    return {
+        "message": "Profile updated successfully",
+        "user": {
+            "id": current_user.id,
+            "first_name": current_user.first_name,
+            "last_name": current_user.last_name,
+            "email": current_user.email,
+            "profile_image": current_user.profile_image,
+            "headline": current_user.headline,
+            "bio": current_user.bio
+        }
+    }
+
+
+
+def apply_profile_update(
+    db: Session,
+    current_user: UserModel,
+    first_name: Optional[str],
+    last_name: Optional[str],
+    email: Optional[str],
+    headline: Optional[str],
+    bio: Optional[str],
+    profile_image: Optional[UploadFile]
 ):
     if email and email != current_user.email:
         existing_user = db.query(UserModel).filter(UserModel.email == email, UserModel.id != current_user.id).first()
@@ -76,31 +109,21 @@ async def update_profile(
     if bio is not None:
         current_user.bio = bio
 
+    previous_image = None
     if profile_image:
-        ext = profile_image.filename.split(".")[-1]
-        filename = f"{uuid4()}.{ext}"
-        file_location = f"{UPLOAD_DIR}/{filename}"
-
-        with open(file_location, "wb") as buffer:
-            shutil.copyfileobj(profile_image.file, buffer)
-
-        current_user.profile_image = file_location
+        previous_image = current_user.profile_image
+        current_user.profile_image = store_upload_file(db, profile_image.file, profile_image.filename, UPLOAD_DIR)
+        current_user.profile_image_variants = None
+        release(db, previous_image)
 
     db.commit()
+    invalidate_public_courses()
+    invalidate_principal(current_user.id)
     db.refresh(current_user)
 
-    return {
-        "message": "Profile updated successfully",
-        "user": {
-            "id": current_user.id,
-            "first_name": current_user.first_name,
-            "last_name": current_user.last_name,
-            "email": current_user.email,
-            "profile_image": current_user.profile_image,
-            "headline": current_user.headline,
-            "bio": current_user.bio
-        }
-    }
+    if profile_image:
+        remove_legacy_file(previous_image)
+        image_pool.schedule("profile", current_user.id, current_user.profile_image)
 
 
 
@@ -110,46 +133,50 @@ async def update_profile(
 @router.get("/my-enrollments", response_model=List[EnrolledCourseResponse])
 def get_my_enrollments(
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
-    enrollments = db.query(
-        EnrollmentModel,
-        CourseModel,
-        UserModel,
-        CategoryModel
+    # One round trip: plain columns, progress counters live on the enrollment row
+    rows = db.query(
+        CourseModel.id,
+        CourseModel.title,
+        CourseModel.sub_title,
+        CourseModel.image_url,
+        UserModel.first_name,
+        UserModel.last_name,
+        CategoryModel.name.label("category_name"),
+        EnrollmentModel.watched_count,
+        EnrollmentModel.total_videos,
+        EnrollmentModel.enrolled_at,
+        EnrollmentModel.completed_at
     ).join(
         CourseModel, EnrollmentModel.course_id == CourseModel.id
-    ).join(
+    ).outerjoin(
         UserModel, CourseModel.instructor_id == UserModel.id
-    ).join(
+    ).outerjoin(
         CategoryModel, CourseModel.category_id == CategoryModel.id
     ).filter(
         EnrollmentModel.user_id == current_user.id
+    ).order_by(
+        EnrollmentModel.enrolled_at.desc(), EnrollmentModel.id.desc()
     ).all()
 
     result = []
-    for enrollment, course, instructor, category in enrollments:
-        total_videos = db.query(VideoModel).filter(VideoModel.course_id == course.id).count()
-        
-        progress = 0.0
-        if total_videos > 0:
-            watched_count = db.query(VideoProgressModel).filter(
-                VideoProgressModel.user_id == current_user.id,
-                VideoProgressModel.course_id == course.id,
-                VideoProgressModel.watched == True
-            ).count()
-            
-            progress = (watched_count / total_videos) * 100
+    for row in rows:
+        progress = (row.watched_count / row.total_videos) * 100 if row.total_videos > 0 else 0.0
         result.append({
-            "id": course.id,
-            "title": course.title,
-            "sub_title": course.sub_title,
-            "image_url": course.image_url,
-            "instructor_name": f"{instructor.first_name} {instructor.last_name}",
-            "category_name": category.name,
-            "progress": round(progress, 2) # You can link your progress logic here later
+            "id": row.id,
+            "title": row.title,
+            "sub_title": row.sub_title,
+            "image_url": row.image_url,
+            "instructor_name": f"{row.first_name} {row.last_name}" if row.first_name else None,
+            "category_name": row.category_name,
+            "progress": round(progress, 2),
+            "total_videos": row.total_videos,
+            "watched_videos": row.watched_count,
+            "enrolled_at": row.enrolled_at,
+            "completed_at": row.completed_at
         })
-    
+
     return result
 
 
@@ -160,7 +187,7 @@ def get_my_enrollments(
 def get_enrolled_course_details(
     course_id: int,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     enrollment = db.query(EnrollmentModel).filter(
         EnrollmentModel.user_id == current_user.id,
@@ -178,11 +205,24 @@ def get_enrolled_course_details(
         VideoModel.course_id == course_id
     ).order_by(VideoModel.order).all()
 
+    positions = dict(db.query(VideoProgressModel.video_id, VideoProgressModel.position_seconds).filter(
+        VideoProgressModel.user_id == current_user.id,
+        VideoProgressModel.course_id == course_id
+    ).all())
+
+    def resume_at(video_id: int) -> float:
+        # Heartbeats not flushed yet are newer than the row
+        pending = heartbeat_buffer.pending_position(current_user.id, video_id)
+        return pending if pending is not None else (positions.get(video_id) or 0)
+
     video_list = [
         {
             "id": v.id,
             "title": v.title,
-            "video_url": v.video_url,
+            "video_url": sign_media_path(v.video_url),
+            "playlist_url": sign_hls_playlist(v.hls_path) if v.transcode_status == "ready" else None,
+            "transcode_status": v.transcode_status,
+            "position_seconds": resume_at(v.id),
             "order": v.order
         }
         for v in videos
@@ -208,39 +248,30 @@ def get_course_certificate(
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_user)
 ):
-    enrollment = db.query(EnrollmentModel).filter(
+    row = db.query(EnrollmentModel, CourseModel, UserModel).join(
+        CourseModel, EnrollmentModel.course_id == CourseModel.id
+    ).outerjoin(
+        UserModel, CourseModel.instructor_id == UserModel.id
+    ).filter(
         EnrollmentModel.user_id == current_user.id,
         EnrollmentModel.course_id == course_id
     ).first()
 
-    if not enrollment:
+    if not row:
         raise HTTPException(status_code=403, detail="You are not enrolled in this course.")
 
-    course = db.query(CourseModel).filter(CourseModel.id == course_id).first()
-    if not course:
-        raise HTTPException(status_code=404, detail="Course not found")
+    enrollment, course, instructor = row
 
-    total_videos = db.query(VideoModel).filter(VideoModel.course_id == course_id).count()
-    
-    if total_videos == 0:
+    if enrollment.total_videos == 0:
         raise HTTPException(status_code=400, detail="This course has no content yet.")
 
-    watched_videos = db.query(VideoProgressModel).filter(
-        VideoProgressModel.user_id == current_user.id,
-        VideoProgressModel.course_id == course_id,
-        VideoProgressModel.watched == True
-    ).all()
-
-    if len(watched_videos) < total_videos:
+    if enrollment.completed_at is None:
         raise HTTPException(
             status_code=403, 
-            detail=f"You have watched {len(watched_videos)}/{total_videos} videos. Complete all videos to get the certificate."
+            detail=f"You have watched {enrollment.watched_count}/{enrollment.total_videos} videos. Complete all videos to get the certificate."
         )
 
-    last_watched = sorted(watched_videos, key=lambda x: x.watch_date, reverse=True)[0]
-    completion_date = last_watched.watch_date
-
-    instructor = db.query(UserModel).filter(UserModel.id == course.instructor_id).first()
+    completion_date = enrollment.completed_at
     instructor_name = f"{instructor.first_name} {instructor.last_name}" if instructor else "Unknown Instructor"
 
     return {
@@ -5,8 +5,13 @@ from typing import List
 
 from models.video_progress_model import VideoProgressModel
 from utils.course_completision import is_course_completed
+from utils.progress import apply_progress_events
+from schemas.progress_schema import ProgressEvent, ProgressBatch, HeartbeatSchema
+from utils.heartbeat_buffer import heartbeat_buffer
+from utils.media import get_video_location, has_course_access
 from models.enrollment_model import EnrollmentModel
-from routes.auth_route import get_current_user
+from routes.auth_route import get_current_user, get_current_principal
+from utils.principal import Principal
 from models.payment_model import RatingModel
 from models.course_model import CourseModel
 from models.video_model import VideoModel
@@ -24,44 +29,59 @@ def update_video_progress(
     video_id: int,
     watched: bool,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
-    
-    video = db.query(VideoModel).filter(VideoModel.id == video_id).first()
-    if not video:
-        raise HTTPException(status_code=404, detail="Video not found")
-    
-    enrollment = db.query(EnrollmentModel).filter(
-        EnrollmentModel.user_id == current_user.id,
-        EnrollmentModel.course_id == video.course_id
-    ).first()
-    
-    if not enrollment:
+    result = apply_progress_events(db, current_user.id, [ProgressEvent(video_id=video_id, watched=watched)])
+
+    if result["rejected"]:
+        reason = result["rejected"][0]["reason"]
+        if reason == "Video not found":
+            raise HTTPException(status_code=404, detail="Video not found")
         raise HTTPException(status_code=403, detail="You must be enrolled in this course")
-    
-    progress = db.query(VideoProgressModel).filter(
-        VideoProgressModel.user_id == current_user.id,
-        VideoProgressModel.video_id == video_id
-    ).first()
-    
-    if progress:
-        progress.watched = watched
-        progress.watch_date = func.now()
-    else:
-        progress = VideoProgressModel(
-            user_id=current_user.id,
-            course_id=video.course_id, 
-            video_id=video_id,
-            watched=watched,
-            watch_date=func.now()
-        )
-        db.add(progress)
-    
-    db.commit()
-    
+
     return {"status": "success", "watched": watched}
 
 
+#----------------------------
+# Batch Progress Events
+#----------------------------
+@router.post("/batch")
+def update_video_progress_batch(
+    batch: ProgressBatch,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """Many watched toggles in one request, written with a single upsert"""
+    result = apply_progress_events(db, current_user.id, batch.events)
+
+    return {
+        "status": "success",
+        "accepted_count": len(result["accepted"]),
+        "accepted": result["accepted"],
+        "rejected": result["rejected"]
+    }
+
+
+#----------------------------
+# Playback Heartbeat
+#----------------------------
+@router.post("/videos/{video_id}/heartbeat", status_code=status.HTTP_202_ACCEPTED)
+def record_heartbeat(
+    video_id: int,
+    heartbeat: HeartbeatSchema,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """Buffered in memory and written in bulk; access checks come from the media cache"""
+    _, course_id, instructor_id = get_video_location(db, video_id)
+
+    if not has_course_access(db, current_user, course_id, instructor_id):
+        raise HTTPException(status_code=403, detail="You must be enrolled in this course")
+
+    heartbeat_buffer.record(current_user.id, course_id, video_id, heartbeat.position, heartbeat.watched_seconds)
+    return {"status": "accepted"}
+
+
 #----------------------------
 # Course Progesss
 #----------------------------
@@ -69,7 +89,7 @@ def update_video_progress(
 def get_course_progress(
     course_id: int,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     enrollment = db.query(EnrollmentModel).filter(
         EnrollmentModel.user_id == current_user.id,
@@ -118,7 +138,7 @@ def get_course_progress(
 def can_rate_course(
     course_id: int,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     enrollment = db.query(EnrollmentModel).filter(
         EnrollmentModel.user_id == current_user.id,
@@ -44,6 +44,12 @@ class CourseListResponse(BaseModel):
     image_url: str | None
     is_paid: bool
     price: float | None
+    is_published: bool | None = None
+    enrollment_count: int = 0
+    rating_count: int = 0
+    average_rating: float = 0.0
+    video_count: int = 0
+    revenue_total: float = 0.0
     
     class Config:
         orm_mode = True
@@ -67,6 +73,7 @@ class VideoResponse(BaseModel):
     title: str
     order: int
     video_url: str
+    transcode_status: str | None = None
 
     class Config:
         orm_mode = True
@@ -76,6 +83,7 @@ class MultiVideoResponse(BaseModel):
     message: str
     uploaded_count: int
     videos: list[VideoResponse]
+    checksums: list[str] = []
 
 
 
@@ -91,6 +99,10 @@ class EnrolledCourseResponse(BaseModel):
     instructor_name: str | None
     category_name: str | None
     progress: float = 0.0 
+    total_videos: int = 0
+    watched_videos: int = 0
+    enrolled_at: datetime | None = None
+    completed_at: datetime | None = None
     
     class Config:
         orm_mode = True
@@ -114,4 +126,10 @@ class PaymentReceipt(BaseModel):
     payment_method: Optional[str] = None
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class ResumableUploadCreate(BaseModel):
+    filename: str
+    size: int
+    title: str
+    order: int
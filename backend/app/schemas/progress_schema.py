@@ -0,0 +1,18 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import List, Optional
+
+
+class ProgressEvent(BaseModel):
+    video_id: int
+    watched: bool
+    timestamp: Optional[datetime] = None
+
+
+class ProgressBatch(BaseModel):
+    events: List[ProgressEvent] = Field(..., min_length=1, max_length=500)
+
+
+class HeartbeatSchema(BaseModel):
+    position: float = Field(..., ge=0)
+    watched_seconds: float = Field(0, ge=0)
@@ -0,0 +1,139 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Run against TEST_DATABASE_URL (e.g. a throwaway Postgres database), or a temporary SQLite file
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+os.chdir(APP_DIR)
+
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL") or f"sqlite:///{tempfile.mkdtemp()}/test.db"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("MAIL_USERNAME", "test")
+os.environ.setdefault("MAIL_PASSWORD", "test")
+os.environ.setdefault("MAIL_FROM", "noreply@example.com")
+
+from fastapi.testclient import TestClient
+import httpx
+from sqlalchemy import event
+
+import database_config
+from database_config import Base, engine
+import main
+from models.user_models import UserModel, UserRole
+from models.category_model import CategoryModel
+from models.course_model import CourseModel
+from utils.jwt import create_access_token
+from utils.principal import principal_cache
+from utils.cache import public_cache
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture(autouse=True)
+def clean_tables(schema):
+    yield
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+    principal_cache.invalidate()
+    public_cache.invalidate()
+
+
+@pytest.fixture
+def db():
+    session = database_config.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client():
+    # No `with`: the lifespan's background workers stay off during tests
+    return TestClient(main.app)
+
+
+@pytest.fixture
+async def api():
+    """httpx client on the test's own event loop, for routes that use the async session"""
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        yield http
+
+    # The async engine's connections belong to this test's event loop
+    if database_config.async_engine is not None:
+        await database_config.async_engine.dispose()
+        database_config.async_engine = None
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def count_queries():
+    """Collects the SQL statements run through the sync engine while the test runs"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+
+
+
+def make_user(db, role: UserRole = UserRole.user, **fields) -> UserModel:
+    count = db.query(UserModel).count()
+    user = UserModel(
+        first_name=fields.pop("first_name", "Test"),
+        last_name=fields.pop("last_name", f"User{count}"),
+        email=fields.pop("email", f"user{count}-{role.value}@example.com"),
+        password=fields.pop("password", "not-a-hash"),
+        role=role,
+        is_verified=True,
+        **fields
+    )
+    db.add(user)
+    db.commit()
+    return user
+
+
+def make_course(db, instructor: UserModel, **fields) -> CourseModel:
+    category = db.query(CategoryModel).first()
+    if category is None:
+        category = CategoryModel(name="Programming")
+        db.add(category)
+        db.flush()
+
+    course = CourseModel(
+        title=fields.pop("title", "Course"),
+        is_paid=fields.pop("is_paid", False),
+        price=fields.pop("price", 0.0),
+        is_published=fields.pop("is_published", True),
+        instructor_id=instructor.id,
+        category_id=category.id,
+        **fields
+    )
+    db.add(course)
+    db.commit()
+    return course
+
+
+def auth_headers(user: UserModel) -> dict:
+    token = create_access_token({"user_id": user.id, "role": user.role.value, "ver": user.token_version or 0})
+    return {"Authorization": f"Bearer {token}"}
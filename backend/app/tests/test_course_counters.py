@@ -0,0 +1,174 @@
+import json
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+import database_config
+import routes.payment_route as payment_route
+from utils import payment_gateway, payments, payment_reconciler
+from utils.payment_gateway import SSLCommerzClient
+from utils.payment_reconciler import reconcile_payments
+from utils.course_stats import rebuild_course_counters
+from utils.rating_stats import get_rating_stats
+from utils.payments import enroll_user, PAYMENT_PENDING
+from utils.storage import VIDEO_OBJECTS
+from utils.sslcommerz_stub import SSLCommerzStub, SESSION_PATH, VALIDATION_PATH, TRANSACTION_PATH
+from models.enrollment_model import EnrollmentModel
+from models.payment_model import PaymentModel
+from models.course_model import CourseModel
+from models.user_models import UserRole
+
+from conftest import make_user, make_course, auth_headers
+
+
+pytestmark = pytest.mark.anyio
+
+COUNTERS = ("enrollment_count", "rating_count", "rating_sum", "video_count", "revenue_total", "average_rating")
+
+
+
+
+@pytest.fixture
+async def stub(monkeypatch):
+    server = SSLCommerzStub(port=0)
+    await server.start()
+    monkeypatch.setattr(payment_gateway, "SSLCOMMERZ_SESSION_API", f"{server.base_url}{SESSION_PATH}")
+    monkeypatch.setattr(payment_gateway, "SSLCOMMERZ_VALIDATION_API", f"{server.base_url}{VALIDATION_PATH}")
+    monkeypatch.setattr(payment_gateway, "SSLCOMMERZ_TRANSACTION_API", f"{server.base_url}{TRANSACTION_PATH}")
+    monkeypatch.setattr(payment_gateway, "SSLCOMMERZ_MAX_RETRIES", 0)
+
+    gateway = SSLCommerzClient()
+    for module in (payment_route, payments, payment_reconciler):
+        monkeypatch.setattr(module, "gateway", gateway)
+    yield server
+
+    await gateway.aclose()
+    await server.stop()
+
+
+@pytest.fixture
+def school(db):
+    instructor = make_user(db, UserRole.instructor)
+    student = make_user(db)
+    free = make_course(db, instructor, title="Free")
+    paid = make_course(db, instructor, title="Paid", is_paid=True, price=500.0)
+    return SimpleNamespace(instructor=instructor, student=student, free=free, paid=paid)
+
+
+def assert_counters_match_rebuild(db, course_id: int):
+    """The incrementally maintained counters equal a full recount from the source tables"""
+
+    db.expire_all()
+    course = db.get(CourseModel, course_id)
+    live = {name: getattr(course, name) for name in COUNTERS}
+
+    rebuild_course_counters(db, course_id)
+    db.expire_all()
+    course = db.get(CourseModel, course_id)
+    rebuilt = {name: getattr(course, name) for name in COUNTERS}
+    db.rollback()
+
+    assert live == pytest.approx(rebuilt)
+
+    stats = get_rating_stats(db, course_id)
+    histogram = sum(stats.distribution().values()) if stats else 0
+    assert histogram == live["rating_count"]
+    return live
+
+
+async def test_free_enrollment(api, db, school):
+    response = await api.post(f"/payment/purchase/{school.free.id}", headers=auth_headers(school.student))
+    assert response.json()["type"] == "free_enrollment"
+
+    assert assert_counters_match_rebuild(db, school.free.id)["enrollment_count"] == 1
+
+
+async def test_paid_checkout(api, db, school, stub):
+    response = await api.post(f"/payment/purchase/{school.paid.id}", headers=auth_headers(school.student))
+    transaction_id = response.json()["transaction_id"]
+    val_id = stub.complete(transaction_id)
+
+    response = await api.post(f"/payment/success/{transaction_id}", data={"val_id": val_id})
+    assert response.status_code == 303
+
+    live = assert_counters_match_rebuild(db, school.paid.id)
+    assert (live["enrollment_count"], live["revenue_total"]) == (1, 500.0)
+
+
+async def test_reconciler_settlement(db, school, stub):
+    transaction_id = uuid4().hex
+    stale = datetime.utcnow() - timedelta(hours=1)
+    db.add(PaymentModel(
+        user_id=school.student.id,
+        course_id=school.paid.id,
+        transaction_id=transaction_id,
+        amount=500.0,
+        status=PAYMENT_PENDING,
+        payment_date=stale,
+        status_changed_at=stale
+    ))
+    db.commit()
+    stub.transactions[transaction_id] = {"amount": "500.00", "status": "PENDING", "val_id": None}
+    stub.complete(transaction_id)
+
+    try:
+        report = await reconcile_payments()
+    finally:
+        # The async engine's connections belong to this test's event loop
+        await database_config.async_engine.dispose()
+        database_config.async_engine = None
+
+    assert report["completed"] == 1
+    live = assert_counters_match_rebuild(db, school.paid.id)
+    assert (live["enrollment_count"], live["revenue_total"]) == (1, 500.0)
+
+
+async def test_video_add_and_delete(api, db, school, tmp_path, monkeypatch):
+    # Uploaded objects land under the working directory
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / VIDEO_OBJECTS).mkdir(parents=True)
+    course_id = school.free.id
+    headers = auth_headers(school.instructor)
+
+    response = await api.post(
+        f"/instructor/courses/{course_id}/add-video",
+        headers=headers,
+        data={"titles": json.dumps(["Intro", "Lesson 1"]), "orders": json.dumps([1, 2])},
+        files=[("videos", ("intro.mp4", b"intro", "video/mp4")), ("videos", ("lesson.mp4", b"lesson", "video/mp4"))]
+    )
+    assert response.status_code == 200, response.text
+    video_ids = [video["id"] for video in response.json()["videos"]]
+
+    assert assert_counters_match_rebuild(db, course_id)["video_count"] == 2
+
+    response = await api.request(
+        "DELETE", f"/instructor/courses/{course_id}/delete-videos",
+        headers=headers, data={"video_ids": json.dumps(video_ids[:1])}
+    )
+    assert response.status_code == 200, response.text
+
+    assert assert_counters_match_rebuild(db, course_id)["video_count"] == 1
+
+
+async def test_rating(api, db, school):
+    for stars, student in ((5, school.student), (2, make_user(db))):
+        enroll_user(db, student.id, school.free.id)
+        db.query(EnrollmentModel).filter(EnrollmentModel.user_id == student.id).update({"completed_at": datetime.utcnow()})
+        db.commit()
+
+        response = await api.post(
+            f"/payment/courses/{school.free.id}/rate",
+            headers=auth_headers(student),
+            json={"rating": stars, "comment": "ok"}
+        )
+        assert response.status_code == 200, response.text
+
+    live = assert_counters_match_rebuild(db, school.free.id)
+    assert (live["rating_count"], live["rating_sum"], live["average_rating"]) == (2, 7, 3.5)
+
+    summary = (await api.get(f"/payment/courses/{school.free.id}/rating-summary")).json()
+    assert summary["total_ratings"] == 2
+    assert summary["average_rating"] == 3.5
+    assert summary["rating_distribution"] == {"1": 0, "2": 1, "3": 0, "4": 0, "5": 1}
@@ -0,0 +1,68 @@
+import email
+
+import pytest
+
+from models.email_outbox_model import EmailOutboxModel
+from models.user_models import UserModel
+from utils import email_worker
+from utils.send_email import enqueue_email
+from utils.smtp_stub import SMTPStub
+
+
+pytestmark = pytest.mark.anyio
+
+
+
+
+@pytest.fixture
+async def smtp(monkeypatch):
+    stub = SMTPStub(port=0)
+    await stub.start()
+    monkeypatch.setattr(email_worker, "MAIL_SERVER", stub.host)
+    monkeypatch.setattr(email_worker, "MAIL_PORT", stub.port)
+    monkeypatch.setattr(email_worker, "MAIL_STARTTLS", False)
+    monkeypatch.setattr(email_worker, "MAIL_SSL_TLS", False)
+    monkeypatch.setattr(email_worker, "MAIL_USE_CREDENTIALS", False)
+    yield stub
+    await stub.stop()
+
+
+async def test_registration_email_is_delivered_from_the_outbox(api, db, smtp):
+    response = await api.post("/auth/register", data={
+        "first_name": "Ada",
+        "last_name": "Lovelace",
+        "email": "ada@example.com",
+        "password": "secret123",
+        "role": "user"
+    })
+    assert response.status_code == 200
+
+    user = db.query(UserModel).filter(UserModel.email == "ada@example.com").one()
+    outbox = db.query(EmailOutboxModel).one()
+    assert (outbox.recipient, outbox.template, outbox.status) == ("ada@example.com", "verification", "pending")
+
+    worker = email_worker.EmailWorker()
+    try:
+        assert await worker.drain_once() == 1
+    finally:
+        await worker.smtp.close()
+
+    assert len(smtp.messages) == 1
+    _, rcpt_tos, raw = smtp.messages[0]
+    assert rcpt_tos == ["<ada@example.com>"]
+
+    message = email.message_from_bytes(raw)
+    assert message["To"] == "ada@example.com"
+    assert message["Subject"] == "Verify Your Email"
+    assert f"verify-email?token={user.verification_token}" in message.get_payload(decode=True).decode()
+
+    db.expire_all()
+    assert db.query(EmailOutboxModel).one().status == "sent"
+
+
+async def test_rolled_back_request_queues_nothing(db):
+    enqueue_email(db, "ada@example.com", "blocked")
+    db.rollback()
+
+    assert db.query(EmailOutboxModel).count() == 0
+    assert "email_queued" not in db.info
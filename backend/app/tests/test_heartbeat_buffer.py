@@ -0,0 +1,69 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from models.user_models import UserRole
+from models.video_model import VideoModel
+from models.video_progress_model import VideoProgressModel
+from utils import heartbeat_buffer as heartbeat_module
+from utils.heartbeat_buffer import HeartbeatBuffer, HEARTBEAT_MAX_REQUEUES
+
+from conftest import make_user, make_course
+
+
+
+
+@pytest.fixture
+def playback(db):
+    instructor = make_user(db, UserRole.instructor)
+    student = make_user(db)
+    course = make_course(db, instructor)
+    videos = [
+        VideoModel(course_id=course.id, title=f"Video {i}", video_url=f"videos/{i}.mp4", order=i)
+        for i in range(2)
+    ]
+    db.add_all(videos)
+    db.commit()
+    return student, course, videos
+
+
+def test_flush_skips_heartbeats_for_a_deleted_video(db, playback):
+    student, course, (kept, deleted) = playback
+    buffer = HeartbeatBuffer()
+    buffer.record(student.id, course.id, kept.id, 30.0, 10.0)
+    buffer.record(student.id, course.id, deleted.id, 45.0, 10.0)
+
+    db.delete(deleted)
+    db.commit()
+
+    assert buffer.flush() == 1
+    assert buffer.stats()["pending"] == 0
+    assert buffer.dropped_rows == 1
+
+    rows = db.query(VideoProgressModel).all()
+    assert [(r.video_id, r.position_seconds, r.watch_seconds) for r in rows] == [(kept.id, 30.0, 10.0)]
+
+    # The next flush is not held up by the deleted video
+    buffer.record(student.id, course.id, kept.id, 60.0, 20.0)
+    assert buffer.flush() == 1
+    db.expire_all()
+    assert db.query(VideoProgressModel).one().watch_seconds == 30.0
+
+
+def test_integrity_error_requeues_then_drops_the_batch(db, playback, monkeypatch):
+    student, course, (video, _) = playback
+    buffer = HeartbeatBuffer()
+    buffer.record(student.id, course.id, video.id, 30.0, 10.0)
+
+    def failing_statement(db, rows):
+        raise IntegrityError("INSERT INTO video_progress", {}, Exception("FOREIGN KEY constraint failed"))
+
+    monkeypatch.setattr(heartbeat_module, "upsert_heartbeats_statement", failing_statement)
+
+    for _ in range(HEARTBEAT_MAX_REQUEUES):
+        assert buffer.flush() == 0
+        assert buffer.stats()["pending"] == 1
+
+    assert buffer.flush() == 0
+    assert buffer.stats()["pending"] == 0
+    assert buffer.flush_failures == HEARTBEAT_MAX_REQUEUES + 1
+    assert buffer.dropped_rows == 1
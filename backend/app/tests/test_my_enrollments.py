@@ -0,0 +1,39 @@
+from models.user_models import UserRole
+from models.enrollment_model import EnrollmentModel
+
+from conftest import make_user, make_course, auth_headers
+
+
+
+
+def enroll_in_new_courses(db, student, instructor, count: int):
+    for i in range(count):
+        course = make_course(db, instructor, title=f"Course {i}")
+        db.add(EnrollmentModel(user_id=student.id, course_id=course.id))
+    db.commit()
+
+
+def my_enrollments_queries(client, count_queries, headers) -> tuple[int, list]:
+    # Warm the principal cache so only the route's own queries are counted
+    client.get("/user/my-enrollments", headers=headers)
+
+    count_queries.clear()
+    response = client.get("/user/my-enrollments", headers=headers)
+    assert response.status_code == 200
+    return len(count_queries), response.json()
+
+
+def test_my_enrollments_query_count_does_not_grow(client, db, count_queries):
+    instructor = make_user(db, UserRole.instructor)
+    student = make_user(db)
+    headers = auth_headers(student)
+
+    enroll_in_new_courses(db, student, instructor, 5)
+    few_queries, few = my_enrollments_queries(client, count_queries, headers)
+
+    enroll_in_new_courses(db, student, instructor, 45)
+    many_queries, many = my_enrollments_queries(client, count_queries, headers)
+
+    assert len(few) == 5
+    assert len(many) == 50
+    assert many_queries == few_queries
@@ -0,0 +1,232 @@
+import asyncio
+import socket
+import time
+
+import httpx
+import pytest
+
+import main
+import routes.payment_route as payment_route
+from utils import payment_gateway, sslcommerz_stub
+from utils.payment_gateway import SSLCommerzClient, CircuitBreaker, GatewayError, GatewayUnavailable
+from utils.sslcommerz_stub import SSLCommerzStub, SESSION_PATH, VALIDATION_PATH, TRANSACTION_PATH
+from models.user_models import UserRole
+
+from conftest import make_user, make_course, auth_headers
+
+
+pytestmark = pytest.mark.anyio
+
+
+
+
+@pytest.fixture
+async def stub():
+    server = SSLCommerzStub(port=0)
+    await server.start()
+    yield server
+    await server.stop()
+
+
+@pytest.fixture
+def point_gateway_at(monkeypatch):
+    def point(base_url: str):
+        monkeypatch.setattr(payment_gateway, "SSLCOMMERZ_SESSION_API", f"{base_url}{SESSION_PATH}")
+        monkeypatch.setattr(payment_gateway, "SSLCOMMERZ_VALIDATION_API", f"{base_url}{VALIDATION_PATH}")
+        monkeypatch.setattr(payment_gateway, "SSLCOMMERZ_TRANSACTION_API", f"{base_url}{TRANSACTION_PATH}")
+    return point
+
+
+@pytest.fixture
+async def gateway_client(stub, point_gateway_at, monkeypatch):
+    """A fresh SSLCommerzClient against the stub, with two retries and near-zero backoff"""
+    point_gateway_at(stub.base_url)
+    monkeypatch.setattr(payment_gateway, "SSLCOMMERZ_MAX_RETRIES", 2)
+    monkeypatch.setattr(payment_gateway, "SSLCOMMERZ_RETRY_BACKOFF", 0.001)
+    monkeypatch.setattr(payment_gateway, "SSLCOMMERZ_RETRY_BACKOFF_MAX", 0.001)
+
+    gateway = SSLCommerzClient()
+    yield gateway
+    await gateway.aclose()
+
+
+def unused_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+
+
+# -------------------------------
+# Retries
+# -------------------------------
+async def test_validates_a_completed_transaction(stub, gateway_client):
+    await gateway_client.create_session({"tran_id": "t-1", "total_amount": 500})
+    val_id = stub.complete("t-1")
+
+    data = await gateway_client.validate(val_id)
+
+    assert data["status"] == "VALID"
+    assert data["tran_id"] == "t-1"
+
+
+async def test_retries_5xx_until_the_attempts_run_out(stub, gateway_client):
+    stub.failure_rate = 1.0
+
+    with pytest.raises(GatewayError, match="HTTP 503"):
+        await gateway_client.transaction_status("t-1")
+
+    assert stub.requests == 3
+    assert gateway_client.latency.snapshot()["transaction_status"]["errors"] == 3
+
+
+async def test_retry_recovers_after_a_5xx(stub, gateway_client, monkeypatch):
+    stub.failure_rate = 0.5
+    draws = iter([0.0, 0.9])     # first attempt fails, the retry goes through
+    monkeypatch.setattr(sslcommerz_stub.random, "random", lambda: next(draws))
+
+    data = await gateway_client.transaction_status("t-1")
+
+    assert data["APIConnect"] == "DONE"
+    assert stub.requests == 2
+    assert gateway_client.breaker.failures == 0
+
+
+async def test_retries_transport_errors(gateway_client, point_gateway_at):
+    point_gateway_at(f"http://127.0.0.1:{unused_port()}")
+
+    with pytest.raises(GatewayError, match="ConnectError"):
+        await gateway_client.validate("val-1")
+
+    assert gateway_client.latency.snapshot()["validate"]["count"] == 3
+
+
+async def test_4xx_is_not_retried(stub, gateway_client, point_gateway_at):
+    point_gateway_at(f"{stub.base_url}/missing")
+
+    with pytest.raises(GatewayError, match="HTTP 404"):
+        await gateway_client.validate("val-1")
+
+    assert stub.requests == 0
+    assert gateway_client.breaker.failures == 0
+
+
+async def test_timeout_is_enforced(stub, monkeypatch, point_gateway_at):
+    point_gateway_at(stub.base_url)
+    monkeypatch.setattr(payment_gateway, "SSLCOMMERZ_TIMEOUT", 0.2)
+    monkeypatch.setattr(payment_gateway, "SSLCOMMERZ_MAX_RETRIES", 0)
+    stub.delay = 1.0
+
+    gateway = SSLCommerzClient()
+    started = time.monotonic()
+    try:
+        with pytest.raises(GatewayError, match="ReadTimeout"):
+            await gateway.validate("val-1")
+    finally:
+        await gateway.aclose()
+
+    assert time.monotonic() - started < 0.8
+
+
+
+
+# -------------------------------
+# Circuit Breaker
+# -------------------------------
+async def test_breaker_opens_after_consecutive_failures(stub, gateway_client):
+    gateway_client.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    stub.failure_rate = 1.0
+
+    for _ in range(2):
+        with pytest.raises(GatewayError):
+            await gateway_client.validate("val-1")
+    requests_before = stub.requests
+
+    with pytest.raises(GatewayUnavailable):
+        await gateway_client.validate("val-1")
+
+    assert gateway_client.breaker.state == "open"
+    assert gateway_client.breaker.times_opened == 1
+    assert stub.requests == requests_before     # failed fast, the gateway was not called
+
+
+async def test_breaker_half_opens_and_closes_on_a_good_probe(stub, gateway_client):
+    gateway_client.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.2)
+    stub.failure_rate = 1.0
+    with pytest.raises(GatewayError):
+        await gateway_client.transaction_status("t-1")
+    assert gateway_client.breaker.state == "open"
+
+    await asyncio.sleep(0.25)
+    assert gateway_client.breaker.state == "half_open"
+
+    stub.failure_rate = 0.0
+    await gateway_client.transaction_status("t-1")
+
+    assert gateway_client.breaker.state == "closed"
+
+
+async def test_breaker_reopens_on_a_failed_probe(stub, gateway_client):
+    gateway_client.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.2)
+    stub.failure_rate = 1.0
+    with pytest.raises(GatewayError):
+        await gateway_client.transaction_status("t-1")
+
+    await asyncio.sleep(0.25)
+    with pytest.raises(GatewayError, match="HTTP 503"):
+        await gateway_client.transaction_status("t-1")
+
+    assert gateway_client.breaker.state == "open"
+    assert gateway_client.breaker.times_opened == 2
+
+
+
+
+# -------------------------------
+# Gateway Errors at the Route
+# -------------------------------
+@pytest.fixture
+def paid_course_buyer(db):
+    instructor = make_user(db, UserRole.instructor)
+    student = make_user(db)
+    course = make_course(db, instructor, is_paid=True, price=500.0)
+    return course.id, auth_headers(student)
+
+
+async def purchase(course_id: int, headers: dict) -> httpx.Response:
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        return await http.post(f"/payment/purchase/{course_id}", headers=headers)
+
+
+async def test_purchase_redirects_to_the_gateway(stub, gateway_client, monkeypatch, paid_course_buyer):
+    monkeypatch.setattr(payment_route, "gateway", gateway_client)
+
+    response = await purchase(*paid_course_buyer)
+
+    assert response.status_code == 200
+    assert response.json()["GatewayPageURL"].startswith(stub.base_url)
+    assert response.json()["transaction_id"] in stub.transactions
+
+
+async def test_purchase_maps_gateway_errors_to_502(stub, gateway_client, monkeypatch, paid_course_buyer):
+    monkeypatch.setattr(payment_route, "gateway", gateway_client)
+    stub.failure_rate = 1.0
+
+    response = await purchase(*paid_course_buyer)
+
+    assert response.status_code == 502
+
+
+async def test_purchase_maps_an_open_breaker_to_503(stub, gateway_client, monkeypatch, paid_course_buyer):
+    monkeypatch.setattr(payment_route, "gateway", gateway_client)
+    gateway_client.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    stub.failure_rate = 1.0
+    await purchase(*paid_course_buyer)
+    requests_before = stub.requests
+
+    response = await purchase(*paid_course_buyer)
+
+    assert response.status_code == 503
+    assert stub.requests == requests_before
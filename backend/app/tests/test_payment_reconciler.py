@@ -0,0 +1,215 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+import database_config
+from utils import payment_gateway, payment_reconciler
+from utils.payment_gateway import SSLCommerzClient, GatewayError
+from utils.payment_reconciler import decide, reconcile_payments
+from utils.payments import transition_payment, PAYMENT_PENDING, PAYMENT_VALIDATING, PAYMENT_COMPLETED, PAYMENT_FAILED
+from utils.sslcommerz_stub import SSLCommerzStub, TRANSACTION_PATH
+from models.payment_model import PaymentModel
+from models.enrollment_model import EnrollmentModel
+from models.course_model import CourseModel
+from models.user_models import UserRole
+
+from conftest import make_user, make_course
+
+
+
+
+# -------------------------------
+# decide()
+# -------------------------------
+NOW = datetime.utcnow()
+ABANDON_BEFORE = NOW - timedelta(hours=payment_reconciler.PAYMENT_ABANDON_AFTER_HOURS)
+
+
+def pending_payment(payment_date: datetime = NOW - timedelta(hours=1)):
+    return SimpleNamespace(transaction_id="t-1", amount=500.0, currency="BDT", payment_date=payment_date)
+
+
+def answer(*elements):
+    return {"APIConnect": "DONE", "element": list(elements)}
+
+
+def test_decide_completes_a_valid_payment():
+    target, _, element = decide(pending_payment(), answer({"status": "VALID", "tran_id": "t-1", "amount": "500.00", "currency": "BDT"}), ABANDON_BEFORE)
+    assert target == PAYMENT_COMPLETED
+    assert element["status"] == "VALID"
+
+
+def test_decide_completes_when_any_attempt_is_valid():
+    result = answer({"status": "FAILED", "tran_id": "t-1", "amount": "500"}, {"status": "VALIDATED", "tran_id": "t-1", "amount": "500", "currency": "BDT"})
+    assert decide(pending_payment(), result, ABANDON_BEFORE)[0] == PAYMENT_COMPLETED
+
+
+def test_decide_fails_an_amount_mismatch():
+    target, reason, _ = decide(pending_payment(), answer({"status": "VALID", "tran_id": "t-1", "amount": "5.00", "currency": "BDT"}), ABANDON_BEFORE)
+    assert target == PAYMENT_FAILED
+    assert "does not match" in reason
+
+
+@pytest.mark.parametrize("status", ["FAILED", "CANCELLED", "EXPIRED", "UNATTEMPTED"])
+def test_decide_fails_unsuccessful_attempts(status):
+    assert decide(pending_payment(), answer({"status": status, "tran_id": "t-1"}), ABANDON_BEFORE)[0] == PAYMENT_FAILED
+
+
+def test_decide_fails_an_abandoned_session():
+    payment = pending_payment(ABANDON_BEFORE - timedelta(minutes=1))
+    target, reason, element = decide(payment, answer(), ABANDON_BEFORE)
+    assert target == PAYMENT_FAILED
+    assert reason == "abandoned before payment"
+    assert element is None
+
+
+def test_decide_leaves_a_recent_unpaid_session_pending():
+    assert decide(pending_payment(), answer(), ABANDON_BEFORE)[0] is None
+    assert decide(pending_payment(), answer({"status": "PENDING", "tran_id": "t-1"}), ABANDON_BEFORE)[0] is None
+
+
+def test_decide_leaves_the_payment_alone_on_gateway_errors():
+    target, reason, _ = decide(pending_payment(), GatewayError("transaction_status: HTTP 503"), ABANDON_BEFORE)
+    assert target is None
+    assert "gateway error" in reason
+
+
+
+
+# -------------------------------
+# reconcile_payments() against the stub
+# -------------------------------
+@pytest.fixture
+async def stub(monkeypatch):
+    server = SSLCommerzStub(port=0)
+    await server.start()
+    monkeypatch.setattr(payment_gateway, "SSLCOMMERZ_TRANSACTION_API", f"{server.base_url}{TRANSACTION_PATH}")
+    monkeypatch.setattr(payment_gateway, "SSLCOMMERZ_MAX_RETRIES", 0)
+
+    gateway = SSLCommerzClient()
+    monkeypatch.setattr(payment_reconciler, "gateway", gateway)
+    yield server
+
+    await gateway.aclose()
+    await server.stop()
+    # The async engine's connections belong to this test's event loop
+    if database_config.async_engine is not None:
+        await database_config.async_engine.dispose()
+        database_config.async_engine = None
+
+
+@pytest.fixture
+def shop(db):
+    instructor = make_user(db, UserRole.instructor)
+    student = make_user(db)
+    course = make_course(db, instructor, is_paid=True, price=500.0)
+    return SimpleNamespace(student=student, course=course)
+
+
+def add_payment(db, stub, shop, gateway_status: str | None = None, paid_amount: float = 500.0, status: str = PAYMENT_PENDING, age=timedelta(hours=1)) -> str:
+    transaction_id = uuid4().hex
+    db.add(PaymentModel(
+        user_id=shop.student.id,
+        course_id=shop.course.id,
+        transaction_id=transaction_id,
+        amount=500.0,
+        status=status,
+        payment_date=datetime.utcnow() - age,
+        status_changed_at=datetime.utcnow() - age
+    ))
+    db.commit()
+
+    if gateway_status is not None:
+        stub.transactions[transaction_id] = {"amount": str(paid_amount), "status": "PENDING", "val_id": None}
+        stub.complete(transaction_id, gateway_status)
+    return transaction_id
+
+
+def statuses(db, *transaction_ids) -> list:
+    db.expire_all()
+    return [
+        db.query(PaymentModel.status).filter(PaymentModel.transaction_id == transaction_id).scalar()
+        for transaction_id in transaction_ids
+    ]
+
+
+def course_counters(db, course_id: int) -> tuple:
+    db.expire_all()
+    course = db.get(CourseModel, course_id)
+    return course.enrollment_count, course.revenue_total
+
+
+@pytest.mark.anyio
+async def test_settles_each_kind_of_stuck_payment(db, stub, shop):
+    paid = add_payment(db, stub, shop, "VALID")
+    short = add_payment(db, stub, shop, "VALID", paid_amount=5.0)
+    failed = add_payment(db, stub, shop, "FAILED")
+    cancelled = add_payment(db, stub, shop, "CANCELLED")
+    abandoned = add_payment(db, stub, shop, age=timedelta(hours=payment_reconciler.PAYMENT_ABANDON_AFTER_HOURS + 1))
+    waiting = add_payment(db, stub, shop)
+    fresh = add_payment(db, stub, shop, "VALID", age=timedelta(minutes=1))
+    stuck_validating = add_payment(db, stub, shop, "VALID", status=PAYMENT_VALIDATING)
+
+    report = await reconcile_payments(batch_size=3)
+
+    assert statuses(db, paid, short, failed, cancelled, abandoned, waiting, fresh, stuck_validating) == [
+        PAYMENT_COMPLETED, PAYMENT_FAILED, PAYMENT_FAILED, PAYMENT_FAILED,
+        PAYMENT_FAILED, PAYMENT_PENDING, PAYMENT_PENDING, PAYMENT_COMPLETED
+    ]
+    assert (report["scanned"], report["completed"], report["failed"], report["unchanged"]) == (7, 2, 4, 1)
+
+
+@pytest.mark.anyio
+async def test_dry_run_writes_nothing(db, stub, shop):
+    paid = add_payment(db, stub, shop, "VALID")
+    failed = add_payment(db, stub, shop, "FAILED")
+
+    report = await reconcile_payments(dry_run=True)
+
+    assert (report["completed"], report["failed"]) == (1, 1)
+    assert statuses(db, paid, failed) == [PAYMENT_PENDING, PAYMENT_PENDING]
+    assert db.query(EnrollmentModel).count() == 0
+    assert course_counters(db, shop.course.id) == (0, 0)
+
+
+@pytest.mark.anyio
+async def test_counters_are_applied_exactly_once(db, stub, shop):
+    add_payment(db, stub, shop, "VALID")
+    # A second successful payment for the same course and student: revenue counts twice, the enrollment once
+    add_payment(db, stub, shop, "VALID")
+
+    await reconcile_payments()
+    await reconcile_payments()
+
+    assert course_counters(db, shop.course.id) == (1, 1000.0)
+    assert db.query(EnrollmentModel).filter(
+        EnrollmentModel.user_id == shop.student.id,
+        EnrollmentModel.course_id == shop.course.id
+    ).count() == 1
+
+
+@pytest.mark.anyio
+async def test_payment_settled_by_a_callback_mid_batch_is_left_alone(db, stub, shop, monkeypatch):
+    raced = add_payment(db, stub, shop, "VALID")
+    other = add_payment(db, stub, shop, "VALID")
+
+    gateway = payment_reconciler.gateway
+    lookup = gateway.transaction_status
+
+    async def callback_wins(transaction_id):
+        # A fail callback settles the payment after the batch was read
+        if transaction_id == raced:
+            transition_payment(db, raced, PAYMENT_FAILED)
+            db.commit()
+        return await lookup(transaction_id)
+
+    monkeypatch.setattr(gateway, "transaction_status", callback_wins)
+
+    report = await reconcile_payments()
+
+    assert statuses(db, raced, other) == [PAYMENT_FAILED, PAYMENT_COMPLETED]
+    assert (report["completed"], report["unchanged"]) == (1, 1)
+    assert [item["transaction_id"] for item in report["transactions"]] == [other]
+    assert course_counters(db, shop.course.id) == (1, 500.0)
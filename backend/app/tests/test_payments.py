@@ -0,0 +1,152 @@
+import asyncio
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+from utils import payment_gateway, payments
+from utils.payment_gateway import SSLCommerzClient
+from utils.payments import is_valid_for, PAYMENT_PENDING, PAYMENT_COMPLETED
+from utils.sslcommerz_stub import SSLCommerzStub, VALIDATION_PATH
+from models.payment_model import PaymentModel
+from models.enrollment_model import EnrollmentModel
+from models.course_model import CourseModel
+from models.user_models import UserRole
+
+from conftest import make_user, make_course
+
+
+
+
+# -------------------------------
+# is_valid_for()
+# -------------------------------
+PAYMENT = SimpleNamespace(transaction_id="t-1", amount=500.0, currency="BDT")
+VALID_ANSWER = {"status": "VALID", "tran_id": "t-1", "amount": "500.00", "currency": "BDT"}
+
+
+def test_accepts_a_matching_answer():
+    assert is_valid_for(PAYMENT, VALID_ANSWER)
+    assert is_valid_for(PAYMENT, {**VALID_ANSWER, "status": "VALIDATED"})
+
+
+@pytest.mark.parametrize("changes", [
+    {"status": "FAILED"},
+    {"tran_id": "t-2"},
+    {"tran_id": None},
+    {"amount": "499.00"},
+    {"amount": None},
+    {"amount": "five hundred"},
+    {"currency": "USD"},
+    {"currency": None},
+])
+def test_rejects_an_answer_for_another_payment(changes):
+    assert not is_valid_for(PAYMENT, {**VALID_ANSWER, **changes})
+
+
+@pytest.mark.parametrize("field", ["tran_id", "amount", "currency"])
+def test_rejects_an_answer_missing_a_field(field):
+    answer = dict(VALID_ANSWER)
+    del answer[field]
+    assert not is_valid_for(PAYMENT, answer)
+
+
+
+
+# -------------------------------
+# Gateway callbacks against the stub
+# -------------------------------
+@pytest.fixture
+async def stub(monkeypatch):
+    server = SSLCommerzStub(port=0)
+    await server.start()
+    monkeypatch.setattr(payment_gateway, "SSLCOMMERZ_VALIDATION_API", f"{server.base_url}{VALIDATION_PATH}")
+    monkeypatch.setattr(payment_gateway, "SSLCOMMERZ_MAX_RETRIES", 0)
+
+    gateway = SSLCommerzClient()
+    monkeypatch.setattr(payments, "gateway", gateway)
+    yield server
+
+    await gateway.aclose()
+    await server.stop()
+
+
+@pytest.fixture
+def paid_checkout(db, stub):
+    """A pending payment the customer has paid for at the gateway"""
+    instructor = make_user(db, UserRole.instructor)
+    student = make_user(db)
+    course = make_course(db, instructor, is_paid=True, price=500.0)
+
+    transaction_id = uuid4().hex
+    db.add(PaymentModel(
+        user_id=student.id,
+        course_id=course.id,
+        transaction_id=transaction_id,
+        amount=500.0,
+        status=PAYMENT_PENDING
+    ))
+    db.commit()
+
+    stub.transactions[transaction_id] = {"amount": "500.00", "status": "PENDING", "val_id": None}
+    val_id = stub.complete(transaction_id)
+    return SimpleNamespace(transaction_id=transaction_id, val_id=val_id, course_id=course.id, student_id=student.id)
+
+
+def settled(db, checkout) -> tuple:
+    db.expire_all()
+    status = db.query(PaymentModel.status).filter(PaymentModel.transaction_id == checkout.transaction_id).scalar()
+    enrollments = db.query(EnrollmentModel).filter(
+        EnrollmentModel.user_id == checkout.student_id,
+        EnrollmentModel.course_id == checkout.course_id
+    ).count()
+    course = db.get(CourseModel, checkout.course_id)
+    return status, enrollments, course.enrollment_count, course.revenue_total
+
+
+@pytest.mark.anyio
+async def test_racing_success_and_ipn_callbacks_validate_once(api, db, stub, paid_checkout):
+    stub.delay = 0.2
+    form = {"val_id": paid_checkout.val_id}
+
+    responses = await asyncio.gather(
+        api.post(f"/payment/success/{paid_checkout.transaction_id}", data=form),
+        api.post(f"/payment/payment/ipn/{paid_checkout.transaction_id}", data=form),
+        api.post(f"/payment/success/{paid_checkout.transaction_id}", data=form),
+    )
+
+    assert [r.status_code for r in responses] == [303, 200, 303]
+    assert stub.requests == 1
+    assert settled(db, paid_checkout) == (PAYMENT_COMPLETED, 1, 1, 500.0)
+
+
+@pytest.mark.anyio
+async def test_duplicate_callbacks_after_completion_skip_the_gateway(api, db, stub, paid_checkout):
+    form = {"val_id": paid_checkout.val_id}
+
+    first = await api.post(f"/payment/success/{paid_checkout.transaction_id}", data=form)
+    again = await api.post(f"/payment/success/{paid_checkout.transaction_id}", data=form)
+    ipn = await api.post(f"/payment/payment/ipn/{paid_checkout.transaction_id}", data=form)
+
+    assert (first.status_code, again.status_code) == (303, 303)
+    assert ipn.json()["payment_status"] == PAYMENT_COMPLETED
+    assert stub.requests == 1
+    assert settled(db, paid_checkout) == (PAYMENT_COMPLETED, 1, 1, 500.0)
+
+
+@pytest.mark.anyio
+async def test_claim_is_released_when_the_gateway_fails(api, db, stub, paid_checkout):
+    form = {"val_id": paid_checkout.val_id}
+    stub.failure_rate = 1.0
+
+    response = await api.post(f"/payment/success/{paid_checkout.transaction_id}", data=form)
+
+    assert response.status_code == 502
+    assert settled(db, paid_checkout) == (PAYMENT_PENDING, 0, 0, 0.0)
+
+    # The gateway's retry of the IPN can settle it once the gateway is back
+    stub.failure_rate = 0.0
+    response = await api.post(f"/payment/payment/ipn/{paid_checkout.transaction_id}", data=form)
+
+    assert response.json()["payment_status"] == PAYMENT_COMPLETED
+    assert settled(db, paid_checkout) == (PAYMENT_COMPLETED, 1, 1, 500.0)
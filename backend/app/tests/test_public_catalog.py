@@ -0,0 +1,59 @@
+import pytest
+
+from models.user_models import UserRole
+from utils.pagination import encode_cursor
+
+from conftest import make_user, make_course
+
+
+pytestmark = pytest.mark.anyio
+
+
+
+
+@pytest.fixture
+def catalog(db):
+    instructor = make_user(db, UserRole.instructor)
+    free = [make_course(db, instructor, title=f"Free {i}") for i in range(5)]
+    paid = [make_course(db, instructor, title=f"Paid {i}", is_paid=True, price=price) for i, price in enumerate([10, 20, 20, 30, 5, 20, 50])]
+    make_course(db, instructor, title="Draft", is_published=False)
+    return {course.id: course.price for course in free + paid}
+
+
+async def all_pages(api, sort: str, limit: int = 3) -> list:
+    courses, cursor = [], None
+    while True:
+        params = {"sort": sort, "limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        response = await api.get("/public/courses", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        courses += page["courses"]
+        cursor = page["next_cursor"]
+        if not cursor:
+            return courses
+
+
+@pytest.mark.parametrize("sort", ["newest", "rating", "price_asc", "price_desc"])
+async def test_paging_visits_every_published_course_once(api, catalog, sort):
+    courses = await all_pages(api, sort)
+
+    ids = [course["id"] for course in courses]
+    assert len(ids) == len(set(ids))
+    assert set(ids) == set(catalog)
+
+
+@pytest.mark.parametrize("sort, descending", [("price_asc", False), ("price_desc", True)])
+async def test_price_pages_keep_free_courses_in_order(api, catalog, sort, descending):
+    courses = await all_pages(api, sort, limit=2)
+
+    prices = [course["price"] for course in courses]
+    assert prices == sorted(prices, reverse=descending)
+    assert prices.count(0.0) == 5
+
+
+async def test_rejects_a_cursor_without_a_sort_value(api, catalog):
+    response = await api.get("/public/courses", params={"sort": "price_asc", "cursor": encode_cursor(None, 1)})
+
+    assert response.status_code == 400
@@ -0,0 +1,181 @@
+"""
+Runs each read route against seeded data and EXPLAINs every statement it sends,
+failing when one of them would scan a table that has lookup indexes without using one.
+On SQLite this checks EXPLAIN QUERY PLAN for bare `SCAN <table>` steps; set
+TEST_DATABASE_URL=postgresql://... to check real PostgreSQL plans for Seq Scans.
+"""
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import json
+import re
+
+import pytest
+from sqlalchemy import event, text
+
+import database_config
+from database_config import engine
+from models.user_models import UserModel, UserRole
+from models.video_model import VideoModel
+from models.enrollment_model import EnrollmentModel
+from models.video_progress_model import VideoProgressModel
+from models.payment_model import PaymentModel, RatingModel
+
+from conftest import make_user, make_course, auth_headers
+
+
+pytestmark = pytest.mark.anyio
+
+# Tables the lookup indexes were added for; a sequential scan of any other table is not flagged
+INDEXED_TABLES = {"users", "courses", "enrollments", "videos", "video_progress", "payments", "ratings"}
+
+EXPLAINED_STATEMENTS = ("SELECT", "UPDATE", "DELETE", "WITH")
+
+SQLITE_SCAN_RE = re.compile(r"^SCAN (\w+)")
+
+ROUTES = [
+    ("student", "/user/my-enrollments"),
+    ("student", "/user/my-courses/{course}"),
+    ("student", "/user/courses/{course}/certificate"),
+    ("student", "/progress/courses/{course}/progress"),
+    ("student", "/progress/courses/{course}/can-rate"),
+    ("student", "/payment/payment-history"),
+    (None, "/payment/courses/{course}/ratings"),
+    (None, "/payment/courses/{course}/rating-summary"),
+    ("instructor", "/instructor/my-courses"),
+    ("instructor", "/instructor/courses/{course}"),
+    ("instructor", "/instructor/analytics/earnings"),
+    (None, "/public/courses"),
+    (None, "/public/courses?category_id={category}"),
+    (None, "/public/courses?instructor_id={instructor}"),
+    (None, "/public/courses/{course}"),
+    (None, "/public/search?q=course"),
+    (None, "/auth/verify-email?token={token}"),
+]
+
+
+
+
+@pytest.fixture
+def catalog(db):
+    """A few instructors and students with courses, videos, enrollments, progress, payments and ratings"""
+
+    instructors = [make_user(db, UserRole.instructor) for _ in range(3)]
+    students = [make_user(db) for _ in range(10)]
+    courses = [make_course(db, instructors[i % 3], title=f"Course {i}", is_paid=True, price=100.0) for i in range(30)]
+
+    for course in courses:
+        db.add_all([VideoModel(course_id=course.id, title=f"Video {n}", video_url=f"uploads/videos/{course.id}-{n}.mp4", order=n) for n in range(5)])
+    db.flush()
+
+    now = datetime.utcnow()
+    for s, student in enumerate(students):
+        for course in courses[s:s + 10]:
+            db.add(EnrollmentModel(user_id=student.id, course_id=course.id, total_videos=5))
+            db.add(PaymentModel(user_id=student.id, course_id=course.id, transaction_id=f"{student.id}-{course.id}", amount=100.0, status="completed", payment_date=now))
+            db.add(RatingModel(user_id=student.id, course_id=course.id, rating=4, comment="Good"))
+            for video in db.query(VideoModel.id).filter(VideoModel.course_id == course.id).limit(3):
+                db.add(VideoProgressModel(user_id=student.id, course_id=course.id, video_id=video.id, watched=True))
+
+    students[-1].is_verified = False
+    students[-1].verification_token = "verify-me"
+    students[-1].token_expiry = now + timedelta(hours=1)
+    db.commit()
+
+    # SQLite is left without statistics: it then treats every index as selective,
+    # which is what pricing out sequential scans does for PostgreSQL below
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+
+    return SimpleNamespace(
+        student=students[0],
+        instructor=instructors[0],
+        course=courses[0],
+        values={"course": courses[0].id, "category": courses[0].category_id, "instructor": instructors[0].id, "token": "verify-me"},
+    )
+
+
+@pytest.fixture
+async def explained():
+    """(statement, unindexed scans of INDEXED_TABLES) for every statement sent through the sync or async engine while the test runs"""
+
+    plans = []
+    scans_of = postgresql_scans if engine.dialect.name == "postgresql" else sqlite_scans
+
+    def explain(conn, cursor, statement, parameters, context, executemany):
+        if executemany or not statement.lstrip().upper().startswith(EXPLAINED_STATEMENTS):
+            return
+        plans.append((statement, scans_of(cursor, statement, parameters)))
+
+    engines = [engine, database_config.get_async_engine().sync_engine]
+    for target in engines:
+        event.listen(target, "before_cursor_execute", explain)
+    yield plans
+    for target in engines:
+        event.remove(target, "before_cursor_execute", explain)
+
+    # The async engine's connections belong to this test's event loop
+    if database_config.async_engine is not None:
+        await database_config.async_engine.dispose()
+        database_config.async_engine = None
+
+
+
+
+def postgresql_scans(cursor, statement, parameters) -> list:
+    # With sequential scans priced out, the planner only picks one when no index applies
+    cursor.execute("SET enable_seqscan = off")
+    try:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+        plan = cursor.fetchone()[0]
+    finally:
+        cursor.execute("RESET enable_seqscan")
+    return sequential_scans(json.loads(plan) if isinstance(plan, str) else plan)
+
+
+def sqlite_scans(cursor, statement, parameters) -> list:
+    cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+    return table_scans([row[-1] for row in cursor.fetchall()])
+
+
+def table_scans(details: list) -> list:
+    """Tables an EXPLAIN QUERY PLAN reads row by row, e.g. `SCAN users` but not `SCAN users USING INDEX ...`"""
+    found = []
+    for detail in details:
+        match = SQLITE_SCAN_RE.match(detail)
+        if match and match.group(1) in INDEXED_TABLES and " USING " not in detail:
+            found.append(match.group(1))
+    return found
+
+
+def sequential_scans(plan) -> list:
+    found = []
+
+    def walk(node):
+        if node.get("Node Type") == "Seq Scan" and node.get("Relation Name") in INDEXED_TABLES:
+            found.append(node["Relation Name"])
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(plan[0]["Plan"])
+    return found
+
+
+@pytest.mark.parametrize("who, path", ROUTES)
+async def test_route_queries_use_indexes(api, catalog, explained, who, path):
+    headers = auth_headers(getattr(catalog, who)) if who else {}
+    url = path.format(**catalog.values)
+
+    response = await api.get(url, headers=headers)
+
+    assert response.status_code < 500, response.text
+    assert explained, f"{url} ran no queries"
+
+    offenders = [(scans, statement) for statement, scans in explained if scans]
+    assert not offenders, f"{url} scans {offenders[0][0]} sequentially:\n{offenders[0][1]}"
+
+
+async def test_unindexed_lookup_is_flagged(catalog, explained, db):
+    db.query(UserModel).filter(UserModel.bio == "nobody writes this").all()
+
+    assert [scans for _, scans in explained] == [["users"]]
@@ -0,0 +1,73 @@
+import pytest
+
+from models.user_models import UserRole
+from utils.search import search_courses, highlight, render_headline, HEADLINE_START_TOKEN, HEADLINE_STOP_TOKEN
+
+from conftest import make_user, make_course
+
+
+
+
+@pytest.fixture
+def instructor(db):
+    return make_user(db, UserRole.instructor, first_name="Ada", last_name="Lovelace")
+
+
+def test_title_match_outranks_description_match(db, instructor):
+    in_description = make_course(db, instructor, title="Web Basics", description="Learn python for the web")
+    in_title = make_course(db, instructor, title="Python Basics", description="Start here")
+
+    results = search_courses(db, "python", limit=10)
+
+    assert [r["id"] for r in results] == [in_title.id, in_description.id]
+    assert results[0]["rank"] > results[1]["rank"]
+
+
+def test_every_prefix_must_match(db, instructor):
+    both = make_course(db, instructor, title="Python Web Development")
+    make_course(db, instructor, title="Python Data Science")
+
+    results = search_courses(db, "pyth web", limit=10)
+
+    assert [r["id"] for r in results] == [both.id]
+
+
+def test_unpublished_courses_are_not_found(db, instructor):
+    make_course(db, instructor, title="Python Draft", is_published=False)
+
+    assert search_courses(db, "python", limit=10) == []
+
+
+def test_matches_are_highlighted(db, instructor):
+    make_course(db, instructor, title="Intro to Python", description="Python from zero to hero")
+
+    result = search_courses(db, "pyth", limit=10)[0]
+
+    assert result["title_highlight"] == "Intro to <mark>Python</mark>"
+    assert result["snippet"] == "<mark>Python</mark> from zero to hero"
+
+
+def test_instructor_content_is_escaped(db, instructor):
+    make_course(
+        db, instructor,
+        title="Python <script>alert(1)</script>",
+        description='<img src=x onerror="alert(1)"> python & more'
+    )
+
+    result = search_courses(db, "python", limit=10)[0]
+
+    assert "<script>" not in result["title_highlight"]
+    assert result["title_highlight"] == "<mark>Python</mark> &lt;script&gt;alert(1)&lt;/script&gt;"
+    assert "<img" not in result["snippet"]
+    assert result["snippet"] == "&lt;img src=x onerror=&quot;alert(1)&quot;&gt; <mark>python</mark> &amp; more"
+
+
+def test_highlight_escapes_matched_words():
+    assert highlight("<b>python</b>", {"python"}) == "<mark>&lt;b&gt;python&lt;/b&gt;</mark>"
+
+
+def test_render_headline_escapes_before_marking():
+    headline = f"{HEADLINE_START_TOKEN}Python{HEADLINE_STOP_TOKEN} <script>"
+
+    assert render_headline(headline) == "<mark>Python</mark> &lt;script&gt;"
+    assert render_headline(None) == ""
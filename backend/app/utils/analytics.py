@@ -0,0 +1,120 @@
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import func
+from datetime import datetime
+
+from models.payment_model import PaymentModel
+from models.course_model import CourseModel
+from models.user_models import UserModel
+from utils.pagination import encode_cursor, decode_cursor, keyset_filter
+
+
+ADMIN_SHARE = 0.25
+INSTRUCTOR_SHARE = 0.75
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+
+
+def _completed_payments(db: Session, *columns, instructor_id: int | None = None):
+    """Base query over completed payments, optionally limited to one instructor's courses"""
+
+    query = db.query(*columns).select_from(PaymentModel).filter(
+        PaymentModel.status == "completed"
+    )
+
+    if instructor_id is not None:
+        query = query.join(
+            CourseModel, PaymentModel.course_id == CourseModel.id
+        ).filter(
+            CourseModel.instructor_id == instructor_id
+        )
+
+    return query
+
+
+
+def get_earnings_totals(db: Session, instructor_id: int | None = None) -> dict:
+    """Gross revenue, platform/instructor split and sale count in a single aggregate query"""
+
+    gross, count = _completed_payments(
+        db,
+        func.coalesce(func.sum(PaymentModel.amount), 0.0),
+        func.count(PaymentModel.id),
+        instructor_id=instructor_id
+    ).one()
+
+    gross = float(gross)
+
+    return {
+        "gross": gross,
+        "admin_share": gross * ADMIN_SHARE,
+        "instructor_share": gross * INSTRUCTOR_SHARE,
+        "count": count
+    }
+
+
+
+def get_earnings_transactions(
+    db: Session,
+    instructor_id: int | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None
+) -> tuple[list, str | None]:
+    """
+    One page of completed payments joined with course, instructor and student names.
+    Ordered newest first and paginated on (payment_date, id) so every page is an index range read.
+    """
+
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    Instructor = aliased(UserModel)
+    Student = aliased(UserModel)
+
+    query = db.query(
+        PaymentModel.id,
+        PaymentModel.transaction_id,
+        PaymentModel.amount,
+        PaymentModel.payment_date,
+        CourseModel.title.label("course_title"),
+        Instructor.first_name.label("instructor_first_name"),
+        Instructor.last_name.label("instructor_last_name"),
+        Student.first_name.label("student_first_name"),
+        Student.last_name.label("student_last_name")
+    ).outerjoin(
+        CourseModel, PaymentModel.course_id == CourseModel.id
+    ).outerjoin(
+        Instructor, CourseModel.instructor_id == Instructor.id
+    ).outerjoin(
+        Student, PaymentModel.user_id == Student.id
+    ).filter(
+        PaymentModel.status == "completed"
+    )
+
+    if instructor_id is not None:
+        query = query.filter(CourseModel.instructor_id == instructor_id)
+
+    if cursor:
+        last_date, last_id = decode_cursor(cursor, datetime, int)
+        query = query.filter(
+            keyset_filter(PaymentModel.payment_date, PaymentModel.id, last_date, last_id)
+        )
+
+    rows = query.order_by(
+        PaymentModel.payment_date.desc(), PaymentModel.id.desc()
+    ).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].payment_date, rows[-1].id)
+
+    return rows, next_cursor
+
+
+
+def format_name(first_name: str | None, last_name: str | None, fallback: str) -> str:
+    if first_name is None and last_name is None:
+        return fallback
+    return f"{first_name} {last_name}"
@@ -0,0 +1,128 @@
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from collections import OrderedDict
+from dotenv import load_dotenv
+import threading
+import json
+import time
+import os
+
+load_dotenv()
+
+
+PUBLIC_CACHE_TTL = float(os.getenv("PUBLIC_CACHE_TTL", "60"))
+PUBLIC_CACHE_MAX_ENTRIES = int(os.getenv("PUBLIC_CACHE_MAX_ENTRIES", "512"))
+
+
+
+
+class TTLCache:
+    """
+    Small thread-safe LRU cache whose entries also expire after `ttl` seconds.
+    Values are stored as ready-to-send JSON bytes.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate(self, prefix: str | None = None):
+        """Drops every entry, or only the ones whose key starts with `prefix`"""
+        with self._lock:
+            if prefix is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k.startswith(prefix)]:
+                    del self._entries[key]
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "invalidations": self.invalidations
+            }
+
+
+public_cache = TTLCache(ttl=PUBLIC_CACHE_TTL, max_entries=PUBLIC_CACHE_MAX_ENTRIES)
+
+
+
+
+def json_bytes(data) -> bytes:
+    return json.dumps(jsonable_encoder(data), separators=(",", ":")).encode("utf-8")
+
+
+
+def cached_json_response(key: str, build) -> Response:
+    """Serves `key` from the public cache, calling `build()` and storing its JSON bytes on a miss"""
+
+    body = public_cache.get(key)
+    if body is None:
+        body = json_bytes(build())
+        public_cache.set(key, body)
+
+    return Response(content=body, media_type="application/json")
+
+
+
+async def async_cached_json_response(key: str, build) -> Response:
+    """Same as cached_json_response for routes whose `build()` is a coroutine"""
+
+    body = public_cache.get(key)
+    if body is None:
+        body = json_bytes(await build())
+        public_cache.set(key, body)
+
+    return Response(content=body, media_type="application/json")
+
+
+
+# -------------------------------
+# Invalidation Hooks
+# -------------------------------
+def invalidate_public_courses():
+    public_cache.invalidate("courses")
+
+
+def invalidate_public_categories():
+    public_cache.invalidate("categories")
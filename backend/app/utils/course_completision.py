@@ -1,5 +1,8 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import select, update, func, case, and_, or_
+from datetime import datetime
 
+from models.enrollment_model import EnrollmentModel
 from models.video_model import VideoModel
 from models.video_progress_model import VideoProgressModel
 
@@ -9,17 +12,63 @@ from models.video_progress_model import VideoProgressModel
 
 def is_course_completed(db: Session, user_id: int, course_id: int) -> bool:
     """Returns True if the user has watched ALL videos in the course"""
-    
-    total_videos = db.query(VideoModel).filter(VideoModel.course_id == course_id).count()
-    
-    if total_videos == 0:
-        return False
-        
-
-    watched_count = db.query(VideoProgressModel).join(VideoModel).filter(
-        VideoProgressModel.user_id == user_id,
-        VideoProgressModel.course_id == course_id,
+
+    completed_at = db.query(EnrollmentModel.completed_at).filter(
+        EnrollmentModel.user_id == user_id,
+        EnrollmentModel.course_id == course_id
+    ).scalar()
+
+    return completed_at is not None
+
+
+
+def course_video_count(course_id):
+    """Scalar subquery, so a new enrollment gets its total in the INSERT itself"""
+    return select(func.count(VideoModel.id)).where(VideoModel.course_id == course_id).scalar_subquery()
+
+
+
+def sync_enrollment_progress(db: Session, course_ids=None, user_id: int | None = None, drifted_only: bool = False) -> int:
+    """
+    Recounts watched_count / total_videos and sets completed_at for the matching
+    enrollments in one UPDATE, inside the caller's transaction. Call it after
+    progress rows or a course's videos change. Returns the number of rows updated.
+    """
+
+    total = select(func.count(VideoModel.id)).where(
+        VideoModel.course_id == EnrollmentModel.course_id
+    ).scalar_subquery()
+
+    # Joined to videos so progress on deleted videos stops counting
+    watched = select(func.count(VideoProgressModel.id)).join(
+        VideoModel, VideoModel.id == VideoProgressModel.video_id
+    ).where(
+        VideoProgressModel.user_id == EnrollmentModel.user_id,
+        VideoModel.course_id == EnrollmentModel.course_id,
         VideoProgressModel.watched == True
-    ).count()
-    
-    return watched_count == total_videos
+    ).scalar_subquery()
+
+    complete = and_(total > 0, watched >= total)
+
+    statement = update(EnrollmentModel).values(
+        watched_count=watched,
+        total_videos=total,
+        completed_at=case(
+            (complete, func.coalesce(EnrollmentModel.completed_at, datetime.utcnow())),
+            else_=None
+        )
+    )
+
+    if course_ids is not None:
+        statement = statement.where(EnrollmentModel.course_id.in_(list(course_ids)))
+    if user_id is not None:
+        statement = statement.where(EnrollmentModel.user_id == user_id)
+    if drifted_only:
+        statement = statement.where(or_(
+            EnrollmentModel.watched_count != watched,
+            EnrollmentModel.total_videos != total,
+            and_(complete, EnrollmentModel.completed_at.is_(None)),
+            and_(~complete, EnrollmentModel.completed_at.is_not(None))
+        ))
+
+    return db.execute(statement.execution_options(synchronize_session=False)).rowcount
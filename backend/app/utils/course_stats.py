@@ -0,0 +1,69 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select, update, func
+
+from models.course_model import CourseModel
+from models.enrollment_model import EnrollmentModel
+from models.payment_model import PaymentModel, RatingModel
+from models.video_model import VideoModel
+
+
+
+
+def course_counters_statement(course_id: int, **deltas):
+    """UPDATE adding `deltas` to the course's counters in place, or None if there is nothing to add"""
+
+    values = {name: getattr(CourseModel, name) + delta for name, delta in deltas.items() if delta}
+    if not values:
+        return None
+    return update(CourseModel).where(CourseModel.id == course_id).values(**values).execution_options(synchronize_session=False)
+
+
+
+def bump_course_counters(db: Session, course_id: int, **deltas):
+    """
+    In-place increments inside the caller's transaction, e.g.
+    bump_course_counters(db, 3, enrollment_count=1, revenue_total=500).
+    Concurrent writers add up instead of overwriting each other.
+    """
+
+    statement = course_counters_statement(course_id, **deltas)
+    if statement is not None:
+        db.execute(statement)
+
+
+
+def rebuild_course_counters(db: Session, course_id: int | None = None) -> int:
+    """Recomputes every counter, and the average rating, from the source tables. Returns the number of courses written"""
+
+    counts = {
+        "enrollment_count": select(func.count(EnrollmentModel.id)).where(
+            EnrollmentModel.course_id == CourseModel.id
+        ),
+        "rating_count": select(func.count(RatingModel.id)).where(
+            RatingModel.course_id == CourseModel.id
+        ),
+        "rating_sum": select(func.coalesce(func.sum(RatingModel.rating), 0)).where(
+            RatingModel.course_id == CourseModel.id
+        ),
+        "video_count": select(func.count(VideoModel.id)).where(
+            VideoModel.course_id == CourseModel.id
+        ),
+        "revenue_total": select(func.coalesce(func.sum(PaymentModel.amount), 0)).where(
+            PaymentModel.course_id == CourseModel.id,
+            PaymentModel.status == "completed"
+        ),
+    }
+
+    average_rating = select(func.coalesce(func.avg(RatingModel.rating), 0.0)).where(
+        RatingModel.course_id == CourseModel.id
+    )
+
+    statement = update(CourseModel).values(
+        **{name: subquery.scalar_subquery() for name, subquery in counts.items()},
+        average_rating=average_rating.scalar_subquery()
+    ).execution_options(synchronize_session=False)
+
+    if course_id is not None:
+        statement = statement.where(CourseModel.id == course_id)
+
+    return db.execute(statement).rowcount
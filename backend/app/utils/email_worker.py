@@ -0,0 +1,180 @@
+from email.message import EmailMessage
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from dotenv import load_dotenv
+import aiosmtplib
+import asyncio
+import random
+import json
+import os
+
+import database_config
+from models.email_outbox_model import EmailOutboxModel
+from utils.send_email import (
+    render_email, MAIL_FROM, MAIL_SERVER, MAIL_PORT, MAIL_STARTTLS, MAIL_SSL_TLS,
+    MAIL_USE_CREDENTIALS, MAIL_USERNAME, MAIL_PASSWORD
+)
+
+load_dotenv()
+
+
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "50"))
+EMAIL_POLL_INTERVAL = float(os.getenv("EMAIL_POLL_INTERVAL", "5"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "6"))
+EMAIL_RETRY_BASE_SECONDS = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", "30"))
+# A claimed row becomes claimable again after this, so a crashed worker never strands mail
+EMAIL_CLAIM_LEASE_SECONDS = int(os.getenv("EMAIL_CLAIM_LEASE_SECONDS", "300"))
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+
+
+
+
+class PooledSMTP:
+    """Keeps a single SMTP session open across messages and reconnects when it drops"""
+
+    def __init__(self):
+        self._client = None
+
+    async def _connect(self):
+        self._client = aiosmtplib.SMTP(
+            hostname=MAIL_SERVER,
+            port=MAIL_PORT,
+            use_tls=MAIL_SSL_TLS,
+            start_tls=MAIL_STARTTLS,
+            username=MAIL_USERNAME if MAIL_USE_CREDENTIALS else None,
+            password=MAIL_PASSWORD if MAIL_USE_CREDENTIALS else None,
+            timeout=SMTP_TIMEOUT
+        )
+        await self._client.connect()
+
+    async def send(self, message: EmailMessage):
+        if self._client is None or not self._client.is_connected:
+            await self._connect()
+
+        try:
+            await self._client.send_message(message)
+        except (aiosmtplib.SMTPServerDisconnected, ConnectionError):
+            # Server closed an idle session, retry once on a fresh one
+            await self._connect()
+            await self._client.send_message(message)
+
+    async def close(self):
+        if self._client is not None and self._client.is_connected:
+            try:
+                await self._client.quit()
+            except aiosmtplib.SMTPException:
+                self._client.close()
+        self._client = None
+
+
+
+class EmailWorker:
+    """Drains email_outbox in batches on the app's event loop"""
+
+    def __init__(self):
+        self.smtp = PooledSMTP()
+        self._task = None
+        self._loop = None
+        self._wakeup = None
+        self._stopping = False
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._stopping = True
+        if self._task is not None:
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.smtp.close()
+
+    def notify(self):
+        """Wakes the worker; safe to call from request threads"""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                sent = await self.drain_once()
+            except Exception as e:
+                print(f"Email worker error: {str(e)}")
+                sent = 0
+
+            if sent >= EMAIL_BATCH_SIZE:
+                continue
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=EMAIL_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def drain_once(self) -> int:
+        """Claims one batch of due emails, sends them and records the outcome. Returns the batch size."""
+
+        database_config.get_async_engine()
+        now = datetime.utcnow()
+
+        async with database_config.AsyncSessionLocal() as db:
+            batch = (await db.execute(
+                select(EmailOutboxModel).where(
+                    EmailOutboxModel.status.in_(["pending", "sending"]),
+                    EmailOutboxModel.next_attempt_at <= now
+                ).order_by(
+                    EmailOutboxModel.next_attempt_at, EmailOutboxModel.id
+                ).limit(EMAIL_BATCH_SIZE).with_for_update(skip_locked=True)
+            )).scalars().all()
+
+            if not batch:
+                return 0
+
+            for item in batch:
+                item.status = "sending"
+                item.next_attempt_at = now + timedelta(seconds=EMAIL_CLAIM_LEASE_SECONDS)
+            await db.commit()
+
+            for item in batch:
+                try:
+                    await self.smtp.send(build_message(item))
+                    item.status = "sent"
+                    item.sent_at = datetime.utcnow()
+                    item.last_error = None
+                except Exception as e:
+                    item.attempts += 1
+                    item.last_error = str(e)
+                    if item.attempts >= EMAIL_MAX_ATTEMPTS:
+                        item.status = "failed"
+                    else:
+                        item.status = "pending"
+                        item.next_attempt_at = datetime.utcnow() + retry_delay(item.attempts)
+
+            await db.commit()
+            return len(batch)
+
+
+
+def build_message(item: EmailOutboxModel) -> EmailMessage:
+    subject, html = render_email(item.template, json.loads(item.context or "{}"))
+
+    message = EmailMessage()
+    message["From"] = MAIL_FROM
+    message["To"] = item.recipient
+    message["Subject"] = subject
+    message.set_content(html, subtype="html")
+    return message
+
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff with jitter: ~30s, 60s, 2m, 4m, ..."""
+    base = EMAIL_RETRY_BASE_SECONDS * (2 ** (attempts - 1))
+    return timedelta(seconds=base * random.uniform(0.8, 1.2))
+
+
+
+email_worker = EmailWorker()
@@ -1,7 +1,26 @@
+from concurrent.futures import ThreadPoolExecutor
 from passlib.context import CryptContext
+from fastapi import HTTPException
+from dotenv import load_dotenv
+import threading
+import asyncio
+import os
+
+load_dotenv()
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt releases the GIL, so a small thread pool runs hashes in parallel
+# without blocking the event loop or FastAPI's request threadpool.
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Requests allowed to wait for a worker before new ones are rejected with 503
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", str(HASH_WORKERS * 16)))
+
+_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="password-hash")
+_lock = threading.Lock()
+_stats = {"pending": 0, "peak_pending": 0, "completed": 0, "failed": 0, "rejected": 0}
+
+
 def hash_password(password):
     if not isinstance(password, str):
         password = password.decode("utf-8")
@@ -13,3 +32,55 @@ def verify_password(plain, hashed):
         plain = plain.decode("utf-8")
 
     return pwd_context.verify(plain, hashed)
+
+
+async def _run_in_hash_pool(func, *args):
+    with _lock:
+        if _stats["pending"] >= HASH_MAX_PENDING:
+            _stats["rejected"] += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Server is busy. Please try again in a moment.",
+                headers={"Retry-After": "1"}
+            )
+        _stats["pending"] += 1
+        _stats["peak_pending"] = max(_stats["peak_pending"], _stats["pending"])
+
+    try:
+        future = _executor.submit(func, *args)
+    except RuntimeError:
+        # The pool is shutting down
+        with _lock:
+            _stats["pending"] -= 1
+        raise
+    # Counted when the worker thread is done, not when the request stops waiting for it,
+    # so a cancelled request's hash still counts against the cap while it runs
+    future.add_done_callback(_hash_done)
+
+    return await asyncio.wrap_future(future)
+
+def _hash_done(future):
+    with _lock:
+        _stats["pending"] -= 1
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            _stats["failed"] += 1
+        else:
+            _stats["completed"] += 1
+
+async def hash_password_async(password):
+    return await _run_in_hash_pool(hash_password, password)
+
+async def verify_password_async(plain, hashed):
+    return await _run_in_hash_pool(verify_password, plain, hashed)
+
+
+def hash_pool_stats():
+    """Queue depth (pending includes in-flight hashes) and lifetime counters"""
+    with _lock:
+        return {
+            "workers": HASH_WORKERS,
+            "max_pending": HASH_MAX_PENDING,
+            **_stats
+        }
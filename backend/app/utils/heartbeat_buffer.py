@@ -0,0 +1,220 @@
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime
+from sqlalchemy import case, select
+from dotenv import load_dotenv
+import threading
+import asyncio
+import os
+
+import database_config
+from models.video_progress_model import VideoProgressModel
+from models.video_model import VideoModel
+from models.user_models import UserModel
+
+load_dotenv()
+
+
+HEARTBEAT_FLUSH_INTERVAL = float(os.getenv("HEARTBEAT_FLUSH_INTERVAL", "10"))
+HEARTBEAT_FLUSH_SIZE = int(os.getenv("HEARTBEAT_FLUSH_SIZE", "500"))
+# Upper bound for watch time credited by a single heartbeat, so a bad client can't inflate totals
+HEARTBEAT_MAX_DELTA_SECONDS = float(os.getenv("HEARTBEAT_MAX_DELTA_SECONDS", "60"))
+# A (user, video) entry whose write keeps failing is dropped after this many requeues
+HEARTBEAT_MAX_REQUEUES = int(os.getenv("HEARTBEAT_MAX_REQUEUES", "3"))
+
+
+
+
+class HeartbeatBuffer:
+    """
+    Collects playback heartbeats in memory and writes them in bulk.
+    Per (user, video) the latest position wins and watched seconds add up,
+    so thousands of heartbeats become one upserted row per flush.
+    """
+
+    def __init__(self):
+        self._pending = {}      # (user_id, video_id) -> [course_id, position, watch_seconds, at, requeues]
+        self._lock = threading.Lock()
+        self._task = None
+        self._loop = None
+        self._wakeup = None
+        self._stopping = False
+        self.flushed_rows = 0
+        self.flush_failures = 0
+        self.dropped_rows = 0
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stops the timer and writes out whatever is still buffered"""
+        self._stopping = True
+        if self._task is not None:
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await asyncio.to_thread(self.flush)
+
+    def record(self, user_id: int, course_id: int, video_id: int, position: float, watched_seconds: float):
+        """Buffers one heartbeat; safe to call from request threads"""
+        now = datetime.utcnow()
+        delta = min(max(watched_seconds, 0.0), HEARTBEAT_MAX_DELTA_SECONDS)
+
+        with self._lock:
+            entry = self._pending.get((user_id, video_id))
+            if entry is None:
+                self._pending[(user_id, video_id)] = [course_id, position, delta, now, 0]
+            else:
+                entry[1] = position
+                entry[2] += delta
+                entry[3] = now
+            full = len(self._pending) >= HEARTBEAT_FLUSH_SIZE
+
+        if full and self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def pending_position(self, user_id: int, video_id: int) -> float | None:
+        """Position not yet flushed, so reads on this worker never go backwards"""
+        with self._lock:
+            entry = self._pending.get((user_id, video_id))
+            return entry[1] if entry else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "pending": pending,
+            "flushed_rows": self.flushed_rows,
+            "flush_failures": self.flush_failures,
+            "dropped_rows": self.dropped_rows,
+            "flush_interval_seconds": HEARTBEAT_FLUSH_INTERVAL,
+            "flush_size": HEARTBEAT_FLUSH_SIZE
+        }
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=HEARTBEAT_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                print(f"Heartbeat flush error: {str(e)}")
+
+    def flush(self) -> int:
+        """Writes the buffered heartbeats in one statement. Returns the number of rows written."""
+
+        with self._lock:
+            batch, self._pending = self._pending, {}
+
+        if not batch:
+            return 0
+
+        db = database_config.SessionLocal()
+        try:
+            batch = self._drop_orphans(db, batch)
+            rows = [
+                {
+                    "user_id": user_id,
+                    "course_id": course_id,
+                    "video_id": video_id,
+                    "watched": False,
+                    "watch_date": None,
+                    "position_seconds": position,
+                    "watch_seconds": watch_seconds,
+                    "last_heartbeat_at": at
+                }
+                for (user_id, video_id), (course_id, position, watch_seconds, at, _) in batch.items()
+            ]
+            if rows:
+                db.execute(upsert_heartbeats_statement(db, rows))
+                db.commit()
+        except IntegrityError as e:
+            # A video or user was deleted after the orphan check; the next flush leaves it out
+            db.rollback()
+            self.flush_failures += 1
+            self._requeue(batch)
+            print(f"Heartbeat flush conflict, batch requeued: {str(e.orig)}")
+            return 0
+        except Exception:
+            db.rollback()
+            self.flush_failures += 1
+            self._requeue(batch)
+            raise
+        finally:
+            db.close()
+
+        self.flushed_rows += len(rows)
+        return len(rows)
+
+    def _drop_orphans(self, db, batch: dict) -> dict:
+        """
+        Leaves out heartbeats for videos or users deleted since they were buffered;
+        one such row would otherwise fail the foreign keys of every flush.
+        """
+        video_ids = {video_id for _, video_id in batch}
+        user_ids = {user_id for user_id, _ in batch}
+
+        video_courses = dict(db.execute(
+            select(VideoModel.id, VideoModel.course_id).where(VideoModel.id.in_(video_ids))
+        ).all())
+        live_users = set(db.execute(
+            select(UserModel.id).where(UserModel.id.in_(user_ids))
+        ).scalars())
+
+        live = {
+            (user_id, video_id): entry
+            for (user_id, video_id), entry in batch.items()
+            if user_id in live_users and video_courses.get(video_id) == entry[0]
+        }
+        self.dropped_rows += len(batch) - len(live)
+        return live
+
+    def _requeue(self, batch: dict):
+        """
+        Puts a failed batch back without losing heartbeats that arrived meanwhile.
+        Entries that already failed HEARTBEAT_MAX_REQUEUES times are dropped instead,
+        e.g. a video deleted between the orphan check and the insert (IntegrityError).
+        """
+        with self._lock:
+            for key, (course_id, position, watch_seconds, at, requeues) in batch.items():
+                if requeues >= HEARTBEAT_MAX_REQUEUES:
+                    self.dropped_rows += 1
+                    continue
+
+                entry = self._pending.get(key)
+                if entry is None:
+                    self._pending[key] = [course_id, position, watch_seconds, at, requeues + 1]
+                else:
+                    entry[2] += watch_seconds
+                    entry[4] = max(entry[4], requeues + 1)
+
+
+
+def upsert_heartbeats_statement(db, rows: list):
+    insert = postgresql_insert if db.bind.dialect.name == "postgresql" else sqlite_insert
+    table = VideoProgressModel.__table__
+
+    statement = insert(table).values(rows)
+    newer = (table.c.last_heartbeat_at.is_(None)) | (statement.excluded.last_heartbeat_at >= table.c.last_heartbeat_at)
+
+    # `watched` is left alone; watch time adds up across workers, position follows the newest heartbeat
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.video_id],
+        set_={
+            "watch_seconds": table.c.watch_seconds + statement.excluded.watch_seconds,
+            "position_seconds": case((newer, statement.excluded.position_seconds), else_=table.c.position_seconds),
+            "last_heartbeat_at": case((newer, statement.excluded.last_heartbeat_at), else_=table.c.last_heartbeat_at)
+        }
+    )
+
+
+
+heartbeat_buffer = HeartbeatBuffer()
@@ -0,0 +1,166 @@
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageOps, features
+from dotenv import load_dotenv
+import threading
+import shutil
+import json
+import os
+
+import database_config
+
+load_dotenv()
+
+
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+
+# name -> (width, height); every preset is center-cropped to its aspect ratio
+IMAGE_PRESETS = {
+    "course": {"card": (480, 270), "hero": (1280, 720)},
+    "profile": {"avatar": (96, 96), "avatar_lg": (256, 256)},
+}
+
+_SAVE_OPTIONS = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+    "avif": {"format": "AVIF", "quality": 55, "speed": 6},
+    "jpeg": {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True},
+    "png": {"format": "PNG", "optimize": True},
+}
+
+
+
+
+def variants_dir(source: str) -> str:
+    """uploads/course_images/abc.jpg -> uploads/course_images/variants/abc"""
+    folder, filename = os.path.split(source)
+    return os.path.join(folder, "variants", os.path.splitext(filename)[0])
+
+
+
+def generate_variants(source: str, kind: str) -> dict:
+    """
+    Runs in a worker process. Decodes the upload once and writes every preset as
+    WebP, AVIF (when this Pillow build has it) and the original format.
+    Returns {"card": {"webp": path, "avif": path, "jpeg": path}, ...}.
+    """
+
+    out_dir = variants_dir(source)
+    os.makedirs(out_dir, exist_ok=True)
+
+    with Image.open(source) as image:
+        original_format = "png" if image.format == "PNG" else "jpeg"
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+        formats = ["webp"] + (["avif"] if features.check("avif") else []) + [original_format]
+        variants = {}
+
+        for name, (width, height) in IMAGE_PRESETS[kind].items():
+            # Crop to the preset's shape but never enlarge a small upload
+            if image.width >= width and image.height >= height:
+                size = (width, height)
+            else:
+                size = _fit_within(image.size, (width, height))
+            resized = ImageOps.fit(image, size, Image.Resampling.LANCZOS)
+
+            variants[name] = {}
+            for fmt in formats:
+                frame = resized.convert("RGB") if fmt == "jpeg" and resized.mode != "RGB" else resized
+                path = os.path.join(out_dir, f"{name}.{'jpg' if fmt == 'jpeg' else fmt}")
+                tmp_path = f"{path}.tmp"
+                frame.save(tmp_path, **_SAVE_OPTIONS[fmt])
+                os.replace(tmp_path, path)
+                variants[name][fmt] = path
+
+    return variants
+
+
+
+def _fit_within(size: tuple[int, int], box: tuple[int, int]) -> tuple[int, int]:
+    """Largest box-shaped size that fits inside `size`"""
+    width, height = size
+    ratio = min(width / box[0], height / box[1])
+    return max(1, int(box[0] * ratio)), max(1, int(box[1] * ratio))
+
+
+
+def remove_variants(source: str | None):
+    if source:
+        shutil.rmtree(variants_dir(source), ignore_errors=True)
+
+
+
+def parse_variants(value: str | None) -> dict | None:
+    return json.loads(value) if value else None
+
+
+
+
+class ImageVariantPool:
+    """Process pool for derivative generation; results are written back from the callback"""
+
+    def __init__(self):
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+            return self._pool
+
+    def schedule(self, kind: str, entity_id: int, source: str):
+        """Queues derivatives for a stored upload; safe to call from request threads"""
+        future = self._executor().submit(generate_variants, source, kind)
+        future.add_done_callback(lambda f: self._store(kind, entity_id, source, f))
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True, cancel_futures=True)
+                self._pool = None
+
+    def _store(self, kind: str, entity_id: int, source: str, future):
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            print(f"Image variants failed for {source}: {future.exception()}")
+            return
+
+        try:
+            if not store_variants(kind, entity_id, source, future.result()):
+                # The image was replaced while this ran
+                remove_variants(source)
+        except Exception as e:
+            print(f"Saving image variants failed for {source}: {str(e)}")
+
+
+
+def store_variants(kind: str, entity_id: int, source: str, variants: dict) -> bool:
+    """Saves the variant map on the row if it still points at `source`. Returns whether it did."""
+
+    from models.course_model import CourseModel
+    from models.user_models import UserModel
+    from utils.cache import invalidate_public_courses
+
+    db = database_config.SessionLocal()
+    try:
+        if kind == "course":
+            updated = db.query(CourseModel).filter(
+                CourseModel.id == entity_id, CourseModel.image_url == source
+            ).update({"image_variants": json.dumps(variants)}, synchronize_session=False)
+        else:
+            updated = db.query(UserModel).filter(
+                UserModel.id == entity_id, UserModel.profile_image == source
+            ).update({"profile_image_variants": json.dumps(variants)}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+    if updated:
+        invalidate_public_courses()
+    return bool(updated)
+
+
+
+image_pool = ImageVariantPool()
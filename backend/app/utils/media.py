@@ -0,0 +1,202 @@
+from fastapi.responses import FileResponse, Response
+from sqlalchemy.orm import Session
+from fastapi import HTTPException, Request
+from mimetypes import guess_type
+from dotenv import load_dotenv
+import base64
+import hashlib
+import hmac
+import time
+import os
+
+from models.enrollment_model import EnrollmentModel
+from models.course_model import CourseModel
+from models.video_model import VideoModel
+from models.user_models import UserRole
+from utils.principal import Principal
+from utils.cache import TTLCache
+from utils.jwt import SECRET_KEY
+from utils.transcode import HLS_OUTPUT_DIR
+
+load_dotenv()
+
+
+MEDIA_ACCESS_CACHE_TTL = float(os.getenv("MEDIA_ACCESS_CACHE_TTL", "300"))
+MEDIA_ACCESS_CACHE_MAX_ENTRIES = int(os.getenv("MEDIA_ACCESS_CACHE_MAX_ENTRIES", "50000"))
+MEDIA_MAX_AGE = int(os.getenv("MEDIA_MAX_AGE", "3600"))
+# When the app sits behind nginx, set this (e.g. "/protected/") and map it to the uploads
+# directory as an `internal` location; nginx then does the Range handling and sendfile itself
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv("MEDIA_ACCEL_REDIRECT_PREFIX", "")
+MEDIA_CHUNK_SIZE = 1024 * 1024
+
+MEDIA_SIGNING_KEY = (os.getenv("MEDIA_SIGNING_KEY") or SECRET_KEY or "").encode()
+MEDIA_URL_TTL = int(os.getenv("MEDIA_URL_TTL", str(6 * 3600)))
+# Expiry is rounded up to this step so the same video keeps the same URL for a while (browser cache friendly)
+MEDIA_URL_EXPIRY_STEP = int(os.getenv("MEDIA_URL_EXPIRY_STEP", "600"))
+SIGNED_MEDIA_ROOT = "uploads/videos"
+# The system mime table maps .ts to TypeScript on some hosts
+MEDIA_TYPES = {".m3u8": "application/vnd.apple.mpegurl", ".ts": "video/mp2t", ".mp4": "video/mp4"}
+
+# "video:{id}" -> (path, course_id, instructor_id), "enrolled:{user_id}:{course_id}" -> True
+media_cache = TTLCache(ttl=MEDIA_ACCESS_CACHE_TTL, max_entries=MEDIA_ACCESS_CACHE_MAX_ENTRIES)
+
+
+
+
+def get_video_location(db: Session, video_id: int) -> tuple[str, int, int]:
+    key = f"video:{video_id}"
+    location = media_cache.get(key)
+    if location is not None:
+        return location
+
+    row = db.query(
+        VideoModel.video_url, VideoModel.course_id, CourseModel.instructor_id
+    ).join(CourseModel, CourseModel.id == VideoModel.course_id).filter(
+        VideoModel.id == video_id
+    ).first()
+
+    if not row:
+        raise HTTPException(status_code=404, detail="Video not found")
+
+    location = (row.video_url, row.course_id, row.instructor_id)
+    media_cache.set(key, location)
+    return location
+
+
+
+def has_course_access(db: Session, principal: Principal, course_id: int, instructor_id: int) -> bool:
+    if principal.role == UserRole.admin or principal.id == instructor_id:
+        return True
+
+    key = f"enrolled:{principal.id}:{course_id}"
+    if media_cache.get(key):
+        return True
+
+    enrolled = db.query(EnrollmentModel.id).filter(
+        EnrollmentModel.user_id == principal.id,
+        EnrollmentModel.course_id == course_id
+    ).first() is not None
+
+    # Only grants are cached, so a student who just enrolled is never shut out
+    if enrolled:
+        media_cache.set(key, True)
+    return enrolled
+
+
+
+def invalidate_video_location(video_id: int):
+    media_cache.delete(f"video:{video_id}")
+
+
+
+
+class VideoFileResponse(FileResponse):
+    # Bigger reads than the 64 KiB default, fewer thread hops per seek
+    chunk_size = MEDIA_CHUNK_SIZE
+
+
+
+def media_file_response(request: Request, path: str) -> Response:
+    """
+    Serves `path` with a strong validator so players can resume and seek cheaply:
+    If-None-Match answers 304, and Range/If-Range are honoured by the file response.
+    Full-file bodies go out with the server's zero-copy pathsend when it offers it.
+    """
+
+    try:
+        stat_result = os.stat(path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Video file not found")
+
+    # Size and mtime in ns change whenever the file is replaced, which is what a strong ETag promises
+    etag = f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"private, max-age={MEDIA_MAX_AGE}",
+        "Accept-Ranges": "bytes"
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+
+    media_type = MEDIA_TYPES.get(os.path.splitext(path)[1].lower()) or guess_type(path)[0] or "application/octet-stream"
+
+    if MEDIA_ACCEL_REDIRECT_PREFIX:
+        relative = os.path.relpath(path, "uploads").replace(os.sep, "/")
+        headers["X-Accel-Redirect"] = MEDIA_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + relative
+        return Response(status_code=200, headers=headers, media_type=media_type)
+
+    return VideoFileResponse(
+        path,
+        headers=headers,
+        media_type=media_type,
+        stat_result=stat_result
+    )
+
+
+
+
+# -------------------------------
+# Signed URLs
+# -------------------------------
+def _media_signature(path: str, expires: int) -> str:
+    digest = hmac.new(MEDIA_SIGNING_KEY, f"{expires}:{path}".encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+
+def _expiry(ttl: int) -> int:
+    return -(-(int(time.time()) + ttl) // MEDIA_URL_EXPIRY_STEP) * MEDIA_URL_EXPIRY_STEP
+
+
+
+def sign_media_path(path: str, ttl: int = MEDIA_URL_TTL) -> str:
+    """Time-limited URL for a stored video that the media route serves without a database lookup"""
+
+    expires = _expiry(ttl)
+    return f"/media/s/{expires}/{_media_signature(path, expires)}/{path}"
+
+
+
+def sign_hls_playlist(hls_path: str, ttl: int = MEDIA_URL_TTL) -> str:
+    """
+    Signs the rendition directory instead of the single file, so the relative
+    variant playlists and segments the player resolves from it carry a valid token too.
+    """
+
+    expires = _expiry(ttl)
+    scope = os.path.dirname(hls_path) + "/"
+    return f"/media/s/{expires}/{_media_signature(scope, expires)}/{hls_path}"
+
+
+
+def _hls_scope(path: str) -> str | None:
+    # uploads/videos/hls/<video dir>/... -> uploads/videos/hls/<video dir>/
+    parts = path.split("/")
+    if path.startswith(HLS_OUTPUT_DIR + "/") and len(parts) > 4:
+        return "/".join(parts[:4]) + "/"
+    return None
+
+
+
+def verify_media_signature(path: str, expires: int, signature: str) -> str:
+    """Returns the normalized path when the signature is valid and unexpired, raises 403 otherwise"""
+
+    if expires < time.time():
+        raise HTTPException(status_code=403, detail="Media link has expired")
+
+    # Signed paths come from the database, but never let one step outside the video store
+    normalized = os.path.normpath(path)
+    if normalized != path or not normalized.startswith(SIGNED_MEDIA_ROOT + os.sep):
+        raise HTTPException(status_code=403, detail="Invalid media path")
+
+    valid = hmac.compare_digest(_media_signature(path, expires), signature)
+    scope = _hls_scope(path)
+    if scope is not None:
+        valid = hmac.compare_digest(_media_signature(scope, expires), signature) or valid
+
+    if not valid:
+        raise HTTPException(status_code=403, detail="Invalid media signature")
+
+    return normalized
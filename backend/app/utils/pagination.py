@@ -0,0 +1,56 @@
+from datetime import datetime
+import base64
+import json
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+
+
+
+def encode_cursor(*values) -> str:
+    """Packs the sort key of the last row into an opaque cursor string"""
+
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+
+def decode_cursor(cursor: str, *types) -> list:
+    """Unpacks a cursor made by encode_cursor, converting each value with the given types"""
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+
+        if not isinstance(payload, list) or len(payload) != len(types):
+            raise ValueError("cursor shape mismatch")
+
+        values = []
+        for value, kind in zip(payload, types):
+            if value is None:
+                values.append(None)
+            elif kind is datetime:
+                values.append(datetime.fromisoformat(value))
+            else:
+                values.append(kind(value))
+        return values
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+
+def keyset_filter(sort_column, id_column, last_value, last_id, descending: bool = True):
+    """Rows strictly after (last_value, last_id) in (sort_column, id_column) order"""
+
+    if descending:
+        return or_(
+            sort_column < last_value,
+            and_(sort_column == last_value, id_column < last_id)
+        )
+
+    return or_(
+        sort_column > last_value,
+        and_(sort_column == last_value, id_column > last_id)
+    )
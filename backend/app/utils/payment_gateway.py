@@ -0,0 +1,243 @@
+from dotenv import load_dotenv
+import threading
+import asyncio
+import random
+import httpx
+import time
+import os
+
+load_dotenv()
+
+
+SSLCOMMERZ_STORE_ID = os.getenv("SSLCOMMERZ_STORE_ID")
+SSLCOMMERZ_STORE_PASSWORD = os.getenv("SSLCOMMERZ_STORE_PASSWORD")
+SSLCOMMERZ_SESSION_API = os.getenv("SSLCOMMERZ_SESSION_API")
+SSLCOMMERZ_VALIDATION_API = os.getenv("SSLCOMMERZ_VALIDATION_API")
+SSLCOMMERZ_TRANSACTION_API = os.getenv("SSLCOMMERZ_TRANSACTION_API")
+
+SSLCOMMERZ_CONNECT_TIMEOUT = float(os.getenv("SSLCOMMERZ_CONNECT_TIMEOUT", "3"))
+SSLCOMMERZ_TIMEOUT = float(os.getenv("SSLCOMMERZ_TIMEOUT", "10"))
+SSLCOMMERZ_MAX_CONNECTIONS = int(os.getenv("SSLCOMMERZ_MAX_CONNECTIONS", "20"))
+SSLCOMMERZ_MAX_RETRIES = int(os.getenv("SSLCOMMERZ_MAX_RETRIES", "2"))
+SSLCOMMERZ_RETRY_BACKOFF = float(os.getenv("SSLCOMMERZ_RETRY_BACKOFF", "0.2"))
+SSLCOMMERZ_RETRY_BACKOFF_MAX = float(os.getenv("SSLCOMMERZ_RETRY_BACKOFF_MAX", "2"))
+# Consecutive failed calls that open the breaker, and how long it stays open before one probe call
+SSLCOMMERZ_BREAKER_THRESHOLD = int(os.getenv("SSLCOMMERZ_BREAKER_THRESHOLD", "5"))
+SSLCOMMERZ_BREAKER_RESET_SECONDS = float(os.getenv("SSLCOMMERZ_BREAKER_RESET_SECONDS", "30"))
+
+# Upper bounds in seconds; the last bucket is everything slower
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+
+
+class GatewayError(Exception):
+    """The gateway could not be reached or gave an unusable answer"""
+
+
+class GatewayUnavailable(GatewayError):
+    """The circuit breaker is open, so the call was not attempted"""
+
+
+
+
+class CircuitBreaker:
+    """
+    Closed: calls go through. After `failure_threshold` consecutive failures it opens
+    and calls fail fast. After `reset_timeout` one probe call is let through
+    (half open); its result closes or re-opens the breaker.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "open" or self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self._probing:
+                    self.times_opened += 1
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+
+
+
+class LatencyHistogram:
+    """Per-operation call latency in fixed buckets, cheap enough to record on every call"""
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, operation: str, seconds: float, ok: bool = True):
+        with self._lock:
+            series = self._series.setdefault(operation, {
+                "counts": [0] * (len(self.buckets) + 1), "count": 0, "errors": 0, "sum": 0.0
+            })
+            index = next((i for i, bound in enumerate(self.buckets) if seconds <= bound), len(self.buckets))
+            series["counts"][index] += 1
+            series["count"] += 1
+            series["sum"] += seconds
+            if not ok:
+                series["errors"] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            result = {}
+            for operation, series in self._series.items():
+                cumulative, buckets = 0, {}
+                for bound, count in zip(list(self.buckets) + ["+Inf"], series["counts"]):
+                    cumulative += count
+                    buckets[f"le_{bound}"] = cumulative
+                result[operation] = {
+                    "count": series["count"],
+                    "errors": series["errors"],
+                    "avg_seconds": round(series["sum"] / series["count"], 4) if series["count"] else 0,
+                    "buckets": buckets
+                }
+            return result
+
+
+
+
+class SSLCommerzClient:
+    """
+    Shared async client for the SSLCommerz APIs. One keep-alive connection pool per
+    event loop, per-call timeouts, retries with full jitter on transport errors and
+    5xx answers, and a circuit breaker so a slow gateway can't tie up our workers.
+    """
+
+    def __init__(self):
+        self._client = None
+        self._loop = None
+        self.breaker = CircuitBreaker(SSLCOMMERZ_BREAKER_THRESHOLD, SSLCOMMERZ_BREAKER_RESET_SECONDS)
+        self.latency = LatencyHistogram()
+
+    def _http(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        # A pool is tied to the loop it was opened on (CLI commands run their own loop)
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(SSLCOMMERZ_TIMEOUT, connect=SSLCOMMERZ_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=SSLCOMMERZ_MAX_CONNECTIONS,
+                    max_keepalive_connections=SSLCOMMERZ_MAX_CONNECTIONS,
+                    keepalive_expiry=30
+                )
+            )
+            self._loop = loop
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    async def create_session(self, payload: dict) -> dict:
+        data = {"store_id": SSLCOMMERZ_STORE_ID, "store_passwd": SSLCOMMERZ_STORE_PASSWORD, **payload}
+        return await self._request("create_session", "POST", SSLCOMMERZ_SESSION_API, data=data)
+
+    async def validate(self, val_id: str) -> dict:
+        params = {
+            "val_id": val_id,
+            "store_id": SSLCOMMERZ_STORE_ID,
+            "store_passwd": SSLCOMMERZ_STORE_PASSWORD,
+            "format": "json"
+        }
+        return await self._request("validate", "GET", SSLCOMMERZ_VALIDATION_API, params=params)
+
+    async def transaction_status(self, tran_id: str) -> dict:
+        """Every gateway-side attempt for one of our transaction ids (`element` list)"""
+        params = {
+            "tran_id": tran_id,
+            "store_id": SSLCOMMERZ_STORE_ID,
+            "store_passwd": SSLCOMMERZ_STORE_PASSWORD,
+            "format": "json"
+        }
+        return await self._request("transaction_status", "GET", SSLCOMMERZ_TRANSACTION_API, params=params)
+
+    def stats(self) -> dict:
+        return {
+            "breaker": {
+                "state": self.breaker.state,
+                "consecutive_failures": self.breaker.failures,
+                "times_opened": self.breaker.times_opened
+            },
+            "latency": self.latency.snapshot()
+        }
+
+    async def _request(self, operation: str, method: str, url: str, **kwargs) -> dict:
+        if not self.breaker.allow():
+            raise GatewayUnavailable("Payment gateway is temporarily unavailable")
+
+        error = None
+        for attempt in range(SSLCOMMERZ_MAX_RETRIES + 1):
+            if attempt:
+                await asyncio.sleep(random.uniform(0, min(SSLCOMMERZ_RETRY_BACKOFF_MAX, SSLCOMMERZ_RETRY_BACKOFF * 2 ** attempt)))
+
+            started = time.perf_counter()
+            try:
+                response = await self._http().request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                self.latency.observe(operation, time.perf_counter() - started, ok=False)
+                error = GatewayError(f"{operation}: {e.__class__.__name__}")
+                continue
+
+            self.latency.observe(operation, time.perf_counter() - started, ok=response.status_code < 500)
+
+            if response.status_code >= 500:
+                error = GatewayError(f"{operation}: HTTP {response.status_code}")
+                continue
+
+            if response.status_code >= 400:
+                # The gateway is up; the request itself is wrong, so retrying won't help
+                self.breaker.record_success()
+                raise GatewayError(f"{operation}: HTTP {response.status_code}")
+
+            try:
+                data = response.json()
+            except ValueError:
+                self.breaker.record_failure()
+                raise GatewayError(f"{operation}: invalid JSON response")
+
+            self.breaker.record_success()
+            return data
+
+        self.breaker.record_failure()
+        raise error
+
+
+
+gateway = SSLCommerzClient()
@@ -0,0 +1,242 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, or_, and_
+from collections import Counter
+from dotenv import load_dotenv
+import asyncio
+import json
+import os
+
+import database_config
+from models.payment_model import PaymentModel
+from models.enrollment_model import EnrollmentModel
+from utils.payment_gateway import gateway, GatewayError, SSLCOMMERZ_TRANSACTION_API
+from utils.course_stats import course_counters_statement
+from utils.payments import (
+    enrollment_upsert_statement, is_valid_for, PAYMENT_TRANSITIONS, VALID_GATEWAY_STATUSES,
+    PAYMENT_PENDING, PAYMENT_VALIDATING, PAYMENT_COMPLETED, PAYMENT_FAILED
+)
+
+load_dotenv()
+
+
+# Payments younger than this are left to the browser callbacks and the IPN
+PAYMENT_RECONCILE_AFTER_MINUTES = int(os.getenv("PAYMENT_RECONCILE_AFTER_MINUTES", "30"))
+PAYMENT_RECONCILE_BATCH_SIZE = int(os.getenv("PAYMENT_RECONCILE_BATCH_SIZE", "100"))
+PAYMENT_RECONCILE_CONCURRENCY = int(os.getenv("PAYMENT_RECONCILE_CONCURRENCY", "5"))
+PAYMENT_RECONCILE_INTERVAL = float(os.getenv("PAYMENT_RECONCILE_INTERVAL", "900"))
+# A session the gateway still has no record of after this was abandoned before paying
+PAYMENT_ABANDON_AFTER_HOURS = int(os.getenv("PAYMENT_ABANDON_AFTER_HOURS", "24"))
+
+FAILED_GATEWAY_STATUSES = ("FAILED", "CANCELLED", "EXPIRED", "UNATTEMPTED")
+
+
+
+
+def decide(payment, answer, abandon_before: datetime) -> tuple[str | None, str, dict | None]:
+    """(target status or None, reason, gateway element) for one payment"""
+
+    if isinstance(answer, Exception):
+        return None, f"gateway error: {answer}", None
+
+    elements = answer.get("element") or []
+
+    for element in elements:
+        if is_valid_for(payment, element):
+            return PAYMENT_COMPLETED, "paid at gateway", element
+
+    # Paid, but not this transaction's amount: same outcome as in the success callback
+    for element in elements:
+        if element.get("status") in VALID_GATEWAY_STATUSES:
+            return PAYMENT_FAILED, "gateway answer does not match the payment", element
+
+    if elements and all(element.get("status") in FAILED_GATEWAY_STATUSES for element in elements):
+        return PAYMENT_FAILED, f"gateway status {elements[-1].get('status')}", elements[-1]
+
+    if not elements and payment.payment_date < abandon_before:
+        return PAYMENT_FAILED, "abandoned before payment", None
+
+    return None, "still pending at gateway", None
+
+
+
+async def _lookup(semaphore: asyncio.Semaphore, transaction_id: str):
+    async with semaphore:
+        try:
+            return await gateway.transaction_status(transaction_id)
+        except GatewayError as e:
+            return e
+
+
+
+async def reconcile_payments(
+    dry_run: bool = False,
+    older_than_minutes: int = PAYMENT_RECONCILE_AFTER_MINUTES,
+    batch_size: int = PAYMENT_RECONCILE_BATCH_SIZE,
+    concurrency: int = PAYMENT_RECONCILE_CONCURRENCY
+) -> dict:
+    """
+    Settles payments stuck in `pending` (or in `validating` after a crashed callback)
+    by asking the gateway. Walks them in id order with keyset pagination, queries the
+    gateway for a batch concurrently, then applies the batch in one transaction.
+    """
+
+    database_config.get_async_engine()
+    now = datetime.utcnow()
+    cutoff = now - timedelta(minutes=older_than_minutes)
+    abandon_before = now - timedelta(hours=PAYMENT_ABANDON_AFTER_HOURS)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    report = {"dry_run": dry_run, "scanned": 0, "completed": 0, "failed": 0, "unchanged": 0, "errors": 0, "transactions": []}
+    last_id = 0
+
+    while True:
+        async with database_config.AsyncSessionLocal() as db:
+            batch = (await db.execute(
+                select(
+                    PaymentModel.id, PaymentModel.transaction_id, PaymentModel.user_id,
+                    PaymentModel.course_id, PaymentModel.amount, PaymentModel.currency, PaymentModel.status, PaymentModel.payment_date
+                ).where(
+                    PaymentModel.id > last_id,
+                    or_(
+                        and_(PaymentModel.status == PAYMENT_PENDING, PaymentModel.payment_date < cutoff),
+                        and_(PaymentModel.status == PAYMENT_VALIDATING, PaymentModel.status_changed_at < cutoff)
+                    )
+                ).order_by(PaymentModel.id).limit(batch_size)
+            )).all()
+
+        if not batch:
+            break
+
+        last_id = batch[-1].id
+        report["scanned"] += len(batch)
+
+        answers = await asyncio.gather(*(_lookup(semaphore, payment.transaction_id) for payment in batch))
+
+        decisions = {PAYMENT_COMPLETED: [], PAYMENT_FAILED: []}
+        for payment, answer in zip(batch, answers):
+            target, reason, element = decide(payment, answer, abandon_before)
+            if target is None and isinstance(answer, Exception):
+                report["errors"] += 1
+                report["transactions"].append({"transaction_id": payment.transaction_id, "from": payment.status, "to": None, "reason": reason})
+            elif target is None:
+                report["unchanged"] += 1
+            else:
+                decisions[target].append((payment, reason, element))
+
+        if dry_run:
+            for target, items in decisions.items():
+                report[target] += len(items)
+                report["transactions"] += [
+                    {"transaction_id": payment.transaction_id, "from": payment.status, "to": target, "reason": reason}
+                    for payment, reason, _ in items
+                ]
+            continue
+
+        async with database_config.AsyncSessionLocal() as db:
+            for target, items in decisions.items():
+                moved = await _apply(db, target, items, now)
+                report[target] += len(moved)
+                report["unchanged"] += len(items) - len(moved)
+                report["transactions"] += [
+                    {"transaction_id": payment.transaction_id, "from": payment.status, "to": target, "reason": reason}
+                    for payment, reason, _ in items if payment.transaction_id in moved
+                ]
+            await db.commit()
+
+    return report
+
+
+
+async def _apply(db, target: str, items: list, now: datetime) -> set:
+    """Moves a batch to `target` with one guarded UPDATE; returns the transaction ids that moved"""
+
+    if not items:
+        return set()
+
+    by_transaction = {payment.transaction_id: (payment, element) for payment, _, element in items}
+
+    # Rows a callback settled since we read them are skipped by the status guard
+    moved = (await db.execute(
+        update(PaymentModel).where(
+            PaymentModel.transaction_id.in_(by_transaction.keys()),
+            PaymentModel.status.in_(PAYMENT_TRANSITIONS[target])
+        ).values(status=target, status_changed_at=now)
+        .returning(PaymentModel.id, PaymentModel.transaction_id)
+        .execution_options(synchronize_session=False)
+    )).all()
+
+    responses = [
+        {"id": row.id, "sslcommerz_response": json.dumps(by_transaction[row.transaction_id][1])}
+        for row in moved if by_transaction[row.transaction_id][1] is not None
+    ]
+    if responses:
+        await db.execute(update(PaymentModel), responses)
+
+    if target == PAYMENT_COMPLETED and moved:
+        payments = [by_transaction[row.transaction_id][0] for row in moved]
+        pairs = {(payment.user_id, payment.course_id) for payment in payments}
+
+        # RETURNING only yields the enrollments that were actually inserted
+        created = (await db.execute(
+            enrollment_upsert_statement(db.bind.dialect.name, list(pairs)).returning(EnrollmentModel.course_id)
+        )).scalars().all()
+
+        enrolled = Counter(created)
+        revenue = Counter()
+        for payment in payments:
+            revenue[payment.course_id] += payment.amount
+
+        for course_id in revenue:
+            statement = course_counters_statement(course_id, enrollment_count=enrolled[course_id], revenue_total=revenue[course_id])
+            if statement is not None:
+                await db.execute(statement)
+
+    return {row.transaction_id for row in moved}
+
+
+
+
+class PaymentReconciler:
+    """Runs reconcile_payments every PAYMENT_RECONCILE_INTERVAL seconds"""
+
+    def __init__(self):
+        self._task = None
+        self._wakeup = None
+        self._stopping = False
+        self.last_report = None
+
+    def start(self):
+        if not SSLCOMMERZ_TRANSACTION_API:
+            print("Payment reconciler disabled: SSLCOMMERZ_TRANSACTION_API not set")
+            return
+
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._stopping = True
+        if self._task is not None:
+            self._wakeup.set()
+            await self._task
+            self._task = None
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=PAYMENT_RECONCILE_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            if self._stopping:
+                break
+
+            try:
+                self.last_report = await reconcile_payments()
+                if self.last_report["completed"] or self.last_report["failed"]:
+                    print(f"Payment reconciler: {self.last_report['completed']} completed, {self.last_report['failed']} failed")
+            except Exception as e:
+                print(f"Payment reconciler error: {str(e)}")
+
+
+
+payment_reconciler = PaymentReconciler()
@@ -0,0 +1,161 @@
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from datetime import datetime
+import json
+
+from models.payment_model import PaymentModel
+from models.enrollment_model import EnrollmentModel
+from utils.course_completision import course_video_count
+from utils.payment_gateway import gateway, GatewayError
+from utils.course_stats import bump_course_counters
+
+
+PAYMENT_PENDING = "pending"
+PAYMENT_VALIDATING = "validating"
+PAYMENT_COMPLETED = "completed"
+PAYMENT_FAILED = "failed"
+PAYMENT_CANCELLED = "cancelled"
+
+# target status -> statuses it may be entered from; completed/failed/cancelled are final
+PAYMENT_TRANSITIONS = {
+    PAYMENT_VALIDATING: (PAYMENT_PENDING,),
+    PAYMENT_PENDING: (PAYMENT_VALIDATING,),     # gateway unreachable, release the claim
+    PAYMENT_COMPLETED: (PAYMENT_PENDING, PAYMENT_VALIDATING),
+    PAYMENT_FAILED: (PAYMENT_PENDING, PAYMENT_VALIDATING),
+    PAYMENT_CANCELLED: (PAYMENT_PENDING,),
+}
+
+VALID_GATEWAY_STATUSES = ("VALID", "VALIDATED")
+DEFAULT_CURRENCY = "BDT"
+
+
+
+
+def transition_payment(db: Session, transaction_id: str, to_status: str, **values) -> bool:
+    """
+    Conditional UPDATE that only moves a payment along an allowed edge, inside the
+    caller's transaction. Of two racing callbacks exactly one gets True.
+    """
+
+    updated = db.query(PaymentModel).filter(
+        PaymentModel.transaction_id == transaction_id,
+        PaymentModel.status.in_(PAYMENT_TRANSITIONS[to_status])
+    ).update({"status": to_status, "status_changed_at": datetime.utcnow(), **values}, synchronize_session=False)
+
+    return updated == 1
+
+
+
+def enrollment_upsert_statement(dialect_name: str, pairs: list):
+    """INSERT ... ON CONFLICT DO NOTHING for (user_id, course_id) pairs"""
+
+    insert = postgresql_insert if dialect_name == "postgresql" else sqlite_insert
+    now = datetime.utcnow()
+
+    return insert(EnrollmentModel).values([
+        {
+            "user_id": user_id,
+            "course_id": course_id,
+            "enrolled_at": now,
+            "total_videos": course_video_count(course_id)
+        }
+        for user_id, course_id in pairs
+    ]).on_conflict_do_nothing(index_elements=["user_id", "course_id"])
+
+
+
+def enroll_user(db: Session, user_id: int, course_id: int) -> bool:
+    """Idempotent enrollment inside the caller's transaction. Returns False if it already existed."""
+
+    statement = enrollment_upsert_statement(db.bind.dialect.name, [(user_id, course_id)])
+    created = db.execute(statement).rowcount == 1
+
+    if created:
+        bump_course_counters(db, course_id, enrollment_count=1)
+    return created
+
+
+
+def is_valid_for(payment: PaymentModel, data: dict) -> bool:
+    """The gateway's answer must be a success for exactly this transaction, in its currency, covering its amount"""
+
+    if data.get("status") not in VALID_GATEWAY_STATUSES:
+        return False
+    if data.get("tran_id") != payment.transaction_id:
+        return False
+    if data.get("currency") != (payment.currency or DEFAULT_CURRENCY):
+        return False
+    try:
+        return float(data["amount"]) + 0.005 >= payment.amount
+    except (KeyError, TypeError, ValueError):
+        return False
+
+
+
+def apply_gateway_result(db: Session, payment: PaymentModel, data: dict) -> str:
+    """Completes (and enrolls) or fails a claimed payment from a validation answer. Commits."""
+
+    response = json.dumps(data)
+
+    if is_valid_for(payment, data):
+        status = PAYMENT_COMPLETED
+        moved = transition_payment(db, payment.transaction_id, status, sslcommerz_response=response)
+        if moved:
+            enroll_user(db, payment.user_id, payment.course_id)
+            bump_course_counters(db, payment.course_id, revenue_total=payment.amount)
+    else:
+        status = PAYMENT_FAILED
+        moved = transition_payment(db, payment.transaction_id, status, sslcommerz_response=response)
+
+    db.commit()
+
+    if not moved:
+        # Someone else settled it first
+        db.refresh(payment)
+        return payment.status
+    return status
+
+
+
+def _claim_payment(db: Session, payment: PaymentModel) -> str | None:
+    """pending -> validating. None if we now hold the claim, otherwise the status someone else left"""
+
+    claimed = transition_payment(db, payment.transaction_id, PAYMENT_VALIDATING)
+    db.commit()
+    if not claimed:
+        db.refresh(payment)
+        return payment.status
+    return None
+
+
+
+def _release_claim(db: Session, payment: PaymentModel):
+    transition_payment(db, payment.transaction_id, PAYMENT_PENDING)
+    db.commit()
+
+
+
+async def confirm_payment(db: Session, payment: PaymentModel, val_id: str) -> str:
+    """
+    Validates a gateway callback at most once per transaction. Duplicate or racing
+    callbacks see the claim and return the current status without calling the gateway.
+    The sync session's work runs in the threadpool so the event loop never waits on the database.
+    """
+
+    if payment.status != PAYMENT_PENDING:
+        return payment.status
+
+    current = await run_in_threadpool(_claim_payment, db, payment)
+    if current is not None:
+        return current
+
+    try:
+        data = await gateway.validate(val_id)
+    except GatewayError:
+        # Let the next callback or the reconciliation job try again
+        await run_in_threadpool(_release_claim, db, payment)
+        raise
+
+    return await run_in_threadpool(apply_gateway_result, db, payment, data)
@@ -7,8 +7,9 @@ from fastapi import Depends, HTTPException
 # -------------------------------
 # Import From Files
 # -------------------------------
-from routes.auth_route import get_current_user
+from routes.auth_route import get_current_principal
 from models.user_models import UserModel
+from utils.principal import Principal
 from database_config import get_db
 
 
@@ -16,7 +17,7 @@ from database_config import get_db
 # -------------------------------------------
 # Check is reqest coming from admin or not
 # -------------------------------------------
-def admin_required(current_user: UserModel = Depends(get_current_user)):
+def admin_required(current_user: Principal = Depends(get_current_principal)):
     if current_user.role.value != "admin":
         raise HTTPException(
             status_code=403,
@@ -30,7 +31,7 @@ def admin_required(current_user: UserModel = Depends(get_current_user)):
 # -------------------------------------------
 # Check is reqest coming from Instructor or not
 # -------------------------------------------
-def instructor_required(current_user: UserModel = Depends(get_current_user)):
+def instructor_required(current_user: Principal = Depends(get_current_principal)):
     if current_user.role.value != "instructor":
         raise HTTPException(
             status_code=403,
@@ -0,0 +1,64 @@
+from sqlalchemy.orm import Session
+from dataclasses import dataclass
+from dotenv import load_dotenv
+import os
+
+from models.user_models import UserModel, UserRole
+from utils.cache import TTLCache
+
+load_dotenv()
+
+
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "30"))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+
+
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The authorization facts about a user that most routes need, without the full row"""
+
+    id: int
+    role: UserRole
+    is_blocked: bool
+    is_verified: bool
+    token_version: int
+
+
+# Per-process cache, invalidated explicitly on this worker and by TTL on the others
+principal_cache = TTLCache(ttl=PRINCIPAL_CACHE_TTL, max_entries=PRINCIPAL_CACHE_MAX_ENTRIES)
+
+
+
+
+def load_principal(db: Session, user_id: int) -> Principal | None:
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+
+    row = db.query(
+        UserModel.id,
+        UserModel.role,
+        UserModel.is_blocked,
+        UserModel.is_verified,
+        UserModel.token_version
+    ).filter(UserModel.id == user_id).first()
+
+    if not row:
+        return None
+
+    principal = Principal(
+        id=row.id,
+        role=row.role,
+        is_blocked=bool(row.is_blocked),
+        is_verified=bool(row.is_verified),
+        token_version=row.token_version or 0
+    )
+    principal_cache.set(user_id, principal)
+    return principal
+
+
+
+def invalidate_principal(user_id: int):
+    principal_cache.delete(user_id)
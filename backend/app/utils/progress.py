@@ -0,0 +1,95 @@
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from datetime import datetime, timezone
+from sqlalchemy import or_
+
+from models.video_progress_model import VideoProgressModel
+from models.enrollment_model import EnrollmentModel
+from models.video_model import VideoModel
+from utils.course_completision import sync_enrollment_progress
+
+
+
+
+def _utc(timestamp: datetime | None, now: datetime) -> datetime:
+    if timestamp is None:
+        return now
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    # A client clock running ahead must not pin a row against later updates
+    return min(timestamp, now)
+
+
+
+def apply_progress_events(db: Session, user_id: int, events: list) -> dict:
+    """
+    Writes a batch of {video_id, watched, timestamp} events for one user with a
+    fixed number of queries: one video lookup, one enrollment check covering every
+    course in the batch, one INSERT ... ON CONFLICT upsert and one enrollment counter
+    refresh. Commits the session.
+
+    Returns {"accepted": [video ids], "rejected": [{"video_id", "reason"}]}. Accepted events
+    older than the stored state are absorbed without changing it.
+    """
+
+    now = datetime.utcnow()
+
+    # Coalesce: only the newest event per video matters
+    latest = {}
+    for event in events:
+        at = _utc(event.timestamp, now)
+        current = latest.get(event.video_id)
+        if current is None or at >= current[1]:
+            latest[event.video_id] = (event.watched, at)
+
+    video_courses = dict(db.query(VideoModel.id, VideoModel.course_id).filter(
+        VideoModel.id.in_(latest.keys())
+    ).all())
+
+    # Locking the enrollments orders concurrent batches of this user, so the recount below sees both
+    enrolled = {course_id for (course_id,) in db.query(EnrollmentModel.course_id).filter(
+        EnrollmentModel.user_id == user_id,
+        EnrollmentModel.course_id.in_(set(video_courses.values()))
+    ).with_for_update()} if video_courses else set()
+
+    rows = []
+    rejected = []
+    for video_id, (watched, at) in latest.items():
+        course_id = video_courses.get(video_id)
+        if course_id is None:
+            rejected.append({"video_id": video_id, "reason": "Video not found"})
+        elif course_id not in enrolled:
+            rejected.append({"video_id": video_id, "reason": "Not enrolled"})
+        else:
+            rows.append({
+                "user_id": user_id,
+                "course_id": course_id,
+                "video_id": video_id,
+                "watched": watched,
+                "watch_date": at
+            })
+
+    if rows:
+        db.execute(upsert_progress_statement(db, rows))
+        sync_enrollment_progress(db, {row["course_id"] for row in rows}, user_id)
+        db.commit()
+
+    return {"accepted": [row["video_id"] for row in rows], "rejected": rejected}
+
+
+
+def upsert_progress_statement(db: Session, rows: list):
+    insert = postgresql_insert if db.bind.dialect.name == "postgresql" else sqlite_insert
+    table = VideoProgressModel.__table__
+
+    statement = insert(table).values(rows)
+    # Out-of-order delivery: an older event never overwrites a newer state
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.video_id],
+        set_={
+            "watched": statement.excluded.watched,
+            "watch_date": statement.excluded.watch_date
+        },
+        where=or_(table.c.watch_date.is_(None), table.c.watch_date <= statement.excluded.watch_date)
+    )
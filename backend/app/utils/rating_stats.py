@@ -0,0 +1,110 @@
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import func, case
+
+from models.rating_stats_model import CourseRatingStatsModel
+from models.payment_model import RatingModel
+from models.course_model import CourseModel
+from utils.course_stats import bump_course_counters
+
+
+EMPTY_DISTRIBUTION = {"1": 0, "2": 0, "3": 0, "4": 0, "5": 0}
+
+
+
+
+def record_rating(db: Session, course_id: int, rating: int):
+    """
+    Adds one rating to the course's counters and star histogram inside the caller's
+    transaction. Uses in-place increments so concurrent raters never overwrite each other.
+    """
+
+    star_column = getattr(CourseRatingStatsModel, f"star_{rating}")
+
+    increments = {star_column: star_column + 1}
+
+    updated = db.query(CourseRatingStatsModel).filter(
+        CourseRatingStatsModel.course_id == course_id
+    ).update(increments, synchronize_session=False)
+
+    if not updated:
+        _create_stats_row(db, course_id, rating, increments)
+
+    bump_course_counters(db, course_id, rating_count=1, rating_sum=rating)
+    sync_course_average(db, course_id)
+
+
+
+def _create_stats_row(db: Session, course_id: int, rating: int, increments: dict):
+    try:
+        with db.begin_nested():
+            stats = CourseRatingStatsModel(
+                course_id=course_id,
+                star_1=0, star_2=0, star_3=0, star_4=0, star_5=0
+            )
+            setattr(stats, f"star_{rating}", 1)
+            db.add(stats)
+    except IntegrityError:
+        # Another request created the row first, fall back to incrementing it
+        db.query(CourseRatingStatsModel).filter(
+            CourseRatingStatsModel.course_id == course_id
+        ).update(increments, synchronize_session=False)
+
+
+
+def sync_course_average(db: Session, course_id: int | None = None):
+    """Derives courses.average_rating, which backs the rating sort index, from the course's rating counters"""
+
+    average = case(
+        (CourseModel.rating_count > 0, CourseModel.rating_sum * 1.0 / CourseModel.rating_count),
+        else_=0.0
+    )
+
+    query = db.query(CourseModel)
+    if course_id is not None:
+        query = query.filter(CourseModel.id == course_id)
+
+    query.update({CourseModel.average_rating: average}, synchronize_session=False)
+
+
+
+def get_rating_stats(db: Session, course_id: int) -> CourseRatingStatsModel | None:
+    return db.query(CourseRatingStatsModel).filter(
+        CourseRatingStatsModel.course_id == course_id
+    ).first()
+
+
+
+def rebuild_rating_stats(db: Session) -> int:
+    """
+    Recomputes every star histogram from the ratings table. Returns the number of courses written.
+    Rating counts and sums are course counters, rebuilt by utils.course_stats.rebuild_course_counters.
+    """
+
+    star_counts = [
+        func.sum(case((RatingModel.rating == star, 1), else_=0)).label(f"star_{star}")
+        for star in range(1, 6)
+    ]
+
+    rows = db.query(
+        RatingModel.course_id,
+        *star_counts
+    ).group_by(RatingModel.course_id).all()
+
+    db.query(CourseRatingStatsModel).delete(synchronize_session=False)
+
+    for row in rows:
+        db.add(CourseRatingStatsModel(
+            course_id=row.course_id,
+            star_1=row.star_1,
+            star_2=row.star_2,
+            star_3=row.star_3,
+            star_4=row.star_4,
+            star_5=row.star_5
+        ))
+
+    db.flush()
+    sync_course_average(db)
+
+    db.commit()
+    return len(rows)
@@ -0,0 +1,277 @@
+from starlette.concurrency import run_in_threadpool
+from fastapi import HTTPException, Request
+from datetime import datetime, timedelta
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from uuid import uuid4, UUID
+import threading
+import hashlib
+import fcntl
+import json
+import os
+
+from utils.upload_stream import UPLOAD_CHUNK_SIZE, MAX_VIDEO_UPLOAD_BYTES
+
+load_dotenv()
+
+
+# Lives outside the public /uploads mount but on the same filesystem, so finalizing is a hard link
+UPLOAD_SESSION_DIR = os.getenv("UPLOAD_SESSION_DIR", "upload_sessions")
+UPLOAD_SESSION_TTL_HOURS = int(os.getenv("UPLOAD_SESSION_TTL_HOURS", "48"))
+
+os.makedirs(UPLOAD_SESSION_DIR, exist_ok=True)
+
+# Running SHA-256 of each upload as (bytes hashed, hasher), so finalize never re-reads
+# the file. A worker that didn't write the previous chunk catches up from disk first.
+_hashers = {}
+_hashers_lock = threading.Lock()
+
+
+
+
+def _paths(upload_id: str) -> tuple[str, str]:
+    base = os.path.join(UPLOAD_SESSION_DIR, upload_id)
+    return f"{base}.json", f"{base}.part"
+
+
+
+def create_session(instructor_id: int, course_id: int, filename: str, length: int, title: str, order: int) -> dict:
+    if length <= 0:
+        raise HTTPException(status_code=400, detail="Upload length must be greater than 0")
+    if length > MAX_VIDEO_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Upload is too large")
+
+    session = {
+        "id": str(uuid4()),
+        "instructor_id": instructor_id,
+        "course_id": course_id,
+        "filename": filename,
+        "length": length,
+        "title": title,
+        "order": order,
+        "created_at": datetime.utcnow().isoformat()
+    }
+
+    _, part_path = _paths(session["id"])
+    open(part_path, "wb").close()
+    _save_session(session)
+
+    return session
+
+
+
+def _save_session(session: dict):
+    meta_path, _ = _paths(session["id"])
+
+    # Write-then-rename so a crash never leaves half a metadata file behind
+    with open(f"{meta_path}.tmp", "w") as f:
+        json.dump(session, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(f"{meta_path}.tmp", meta_path)
+
+
+
+def load_session(upload_id: str, instructor_id: int) -> dict:
+    try:
+        upload_id = str(UUID(upload_id))
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+
+    meta_path, _ = _paths(upload_id)
+    try:
+        with open(meta_path) as f:
+            session = json.load(f)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+
+    if session["instructor_id"] != instructor_id:
+        raise HTTPException(status_code=404, detail="Upload not found")
+
+    return session
+
+
+
+def current_offset(session: dict) -> int:
+    """The bytes on disk are the source of truth, so a restarted worker resumes exactly where writes stopped"""
+    _, part_path = _paths(session["id"])
+    try:
+        return os.path.getsize(part_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+
+
+
+async def append_chunk(request: Request, session: dict, offset: int) -> int:
+    """Appends the request body at `offset` and returns the new offset"""
+
+    _, part_path = _paths(session["id"])
+    try:
+        fd = os.open(part_path, os.O_WRONLY)
+    except FileNotFoundError:
+        # Finalized or cancelled since load_session
+        raise HTTPException(status_code=404, detail="Upload not found")
+
+    try:
+        try:
+            # One writer per upload, across workers too
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise HTTPException(status_code=423, detail="Another request is writing to this upload")
+
+        on_disk = os.fstat(fd).st_size
+        if offset != on_disk:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Upload-Offset mismatch, the server has {on_disk} bytes",
+                headers={"Upload-Offset": str(on_disk)}
+            )
+
+        with _hashers_lock:
+            hashed, digest = _hashers.pop(session["id"], (None, None))
+        if hashed != offset:
+            digest = await run_in_threadpool(_hash_prefix, part_path, offset)
+
+        os.lseek(fd, offset, os.SEEK_SET)
+        written = offset
+        buffer = bytearray()
+
+        def flush(data: bytes):
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+            digest.update(data)
+
+        # Whatever arrived before a dropped connection is kept, the client resumes from there
+        try:
+            async for chunk in request.stream():
+                if written + len(buffer) + len(chunk) > session["length"]:
+                    raise HTTPException(status_code=413, detail="Chunk goes past the declared upload length")
+
+                buffer += chunk
+                if len(buffer) >= UPLOAD_CHUNK_SIZE:
+                    aligned = len(buffer) - (len(buffer) % UPLOAD_CHUNK_SIZE)
+                    await run_in_threadpool(flush, bytes(buffer[:aligned]))
+                    del buffer[:aligned]
+                    written += aligned
+        finally:
+            if buffer:
+                await run_in_threadpool(flush, bytes(buffer))
+                written += len(buffer)
+            await run_in_threadpool(os.fsync, fd)
+            with _hashers_lock:
+                _hashers[session["id"]] = (written, digest)
+
+        if written == session["length"]:
+            session["sha256"] = digest.hexdigest()
+            await run_in_threadpool(_save_session, session)
+
+        return written
+    finally:
+        os.close(fd)
+
+
+
+def _hash_prefix(path: str, length: int):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while length > 0:
+            chunk = f.read(min(UPLOAD_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            digest.update(chunk)
+            length -= len(chunk)
+    return digest
+
+
+
+@contextmanager
+def finalizing(session: dict, dest_dir: str):
+    """
+    Yields (path, sha256) of the completed file under a fresh name in `dest_dir` while holding the
+    session's lock, so no PATCH can write to it meanwhile. The session is only dropped
+    once the block finishes; if it raises, the .part file is still there and the
+    client can finalize again.
+    """
+
+    meta_path, part_path = _paths(session["id"])
+    try:
+        fd = os.open(part_path, os.O_RDONLY)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise HTTPException(status_code=423, detail="Another request is writing to this upload")
+
+        # A concurrent finalize may have finished between load_session and the lock
+        if not os.path.exists(meta_path):
+            raise HTTPException(status_code=404, detail="Upload not found")
+        if os.fstat(fd).st_size != session["length"]:
+            raise HTTPException(status_code=409, detail="Upload is not complete yet")
+
+        with open(meta_path) as f:
+            sha256 = json.load(f).get("sha256")
+        if sha256 is None:
+            # Completed before digests were recorded with the session
+            sha256 = _hash_prefix(part_path, session["length"]).hexdigest()
+
+        filename = session["filename"]
+        ext = filename.rsplit(".", 1)[-1] if "." in filename else "bin"
+        os.makedirs(dest_dir, exist_ok=True)
+        final_path = os.path.join(dest_dir, f".incoming-{uuid4()}.{ext}")
+
+        # A second name for the same bytes: the caller may move or delete it, the .part stays put
+        os.link(part_path, final_path)
+        # Fresh mtime, so the GC sweep's grace period doesn't treat the link as an old orphan
+        os.utime(final_path)
+
+        try:
+            yield final_path, sha256
+        except BaseException:
+            if os.path.exists(final_path):
+                os.remove(final_path)
+            raise
+
+        os.remove(meta_path)
+        os.remove(part_path)
+        with _hashers_lock:
+            _hashers.pop(session["id"], None)
+    finally:
+        os.close(fd)
+
+
+
+def delete_session(session: dict):
+    with _hashers_lock:
+        _hashers.pop(session["id"], None)
+    for path in _paths(session["id"]):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+
+def purge_expired_sessions(max_age_hours: int = UPLOAD_SESSION_TTL_HOURS) -> int:
+    """Removes sessions older than the TTL. Returns how many were removed."""
+
+    cutoff = datetime.utcnow() - timedelta(hours=max_age_hours)
+    removed = 0
+
+    for name in os.listdir(UPLOAD_SESSION_DIR):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(UPLOAD_SESSION_DIR, name)) as f:
+                session = json.load(f)
+        except (OSError, ValueError):
+            continue
+
+        if datetime.fromisoformat(session["created_at"]) < cutoff:
+            delete_session(session)
+            removed += 1
+
+    return removed
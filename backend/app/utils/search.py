@@ -0,0 +1,242 @@
+from sqlalchemy.orm import Session
+from collections import defaultdict
+from sqlalchemy import func
+import bisect
+import html
+import re
+
+from models.course_model import CourseModel
+from models.user_models import UserModel
+from utils.image_variants import parse_variants
+
+
+SEARCH_CONFIG = "english"
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+
+# ts_headline marks matches with control characters so the text can be HTML-escaped before they become <mark>
+HEADLINE_START_TOKEN = "\x02"
+HEADLINE_STOP_TOKEN = "\x03"
+HEADLINE_OPTIONS = f"StartSel={HEADLINE_START_TOKEN}, StopSel={HEADLINE_STOP_TOKEN}, MaxWords=35, MinWords=15, MaxFragments=2"
+TITLE_HEADLINE_OPTIONS = f"StartSel={HEADLINE_START_TOKEN}, StopSel={HEADLINE_STOP_TOKEN}, HighlightAll=true"
+
+# Same A/B/C weighting the tsvector trigger uses, with ts_rank's default weights
+FIELD_WEIGHTS = {"title": 1.0, "sub_title": 0.4, "instructor": 0.4, "description": 0.2}
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+
+
+def tokenize(text: str | None) -> list[str]:
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+
+def build_prefix_tsquery(query: str) -> str | None:
+    """Turns free text into an AND of prefix terms, e.g. 'pyth web' -> 'pyth:* & web:*'"""
+
+    terms = tokenize(query)
+    if not terms:
+        return None
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+
+def search_courses(db: Session, query: str, limit: int) -> list[dict]:
+    if db.get_bind().dialect.name == "postgresql":
+        return _search_postgres(db, query, limit)
+    return _search_in_memory(db, query, limit)
+
+
+
+# -------------------------------
+# PostgreSQL: tsvector + GIN
+# -------------------------------
+def _search_postgres(db: Session, query: str, limit: int) -> list[dict]:
+    tsquery_text = build_prefix_tsquery(query)
+    if not tsquery_text:
+        return []
+
+    ts_query = func.to_tsquery(SEARCH_CONFIG, tsquery_text)
+    rank = func.ts_rank_cd(CourseModel.search_vector, ts_query)
+
+    # Rank and limit first so ts_headline only runs on the rows we return
+    top = db.query(
+        CourseModel.id.label("id"),
+        rank.label("rank")
+    ).filter(
+        CourseModel.is_published == True,
+        CourseModel.search_vector.op("@@")(ts_query)
+    ).order_by(
+        rank.desc(), CourseModel.id
+    ).limit(limit).subquery()
+
+    rows = db.query(
+        CourseModel,
+        UserModel.first_name,
+        UserModel.last_name,
+        top.c.rank,
+        func.ts_headline(SEARCH_CONFIG, CourseModel.title, ts_query, TITLE_HEADLINE_OPTIONS).label("title_highlight"),
+        func.ts_headline(SEARCH_CONFIG, func.coalesce(CourseModel.description, ""), ts_query, HEADLINE_OPTIONS).label("snippet")
+    ).join(
+        top, top.c.id == CourseModel.id
+    ).join(
+        UserModel, CourseModel.instructor_id == UserModel.id
+    ).order_by(
+        top.c.rank.desc(), CourseModel.id
+    ).all()
+
+    return [
+        _result(course, f"{fname} {lname}", rank_value, render_headline(title_highlight), render_headline(snippet))
+        for course, fname, lname, rank_value, title_highlight, snippet in rows
+    ]
+
+
+
+# -------------------------------
+# Fallback: in-memory inverted index
+# -------------------------------
+class InvertedIndex:
+    """
+    Minimal inverted index with weighted term frequencies and prefix lookup.
+    Used when the database has no full-text support (e.g. SQLite in tests).
+    """
+
+    def __init__(self):
+        self.postings = defaultdict(dict)   # term -> {doc_id: score}
+        self.terms = []                     # sorted vocabulary for prefix scans
+
+    def add(self, doc_id, fields: dict):
+        for field, text in fields.items():
+            weight = FIELD_WEIGHTS.get(field, 0.1)
+            for term in tokenize(text):
+                self.postings[term][doc_id] = self.postings[term].get(doc_id, 0.0) + weight
+
+    def finalize(self):
+        self.terms = sorted(self.postings)
+
+    def expand(self, prefix: str) -> list[str]:
+        start = bisect.bisect_left(self.terms, prefix)
+        matches = []
+        for term in self.terms[start:]:
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+        return matches
+
+    def search(self, query: str) -> list[tuple]:
+        """Returns (doc_id, score, matched_terms) for docs containing every query prefix"""
+
+        scores = None
+        matched = defaultdict(set)
+
+        for prefix in tokenize(query):
+            prefix_scores = defaultdict(float)
+            for term in self.expand(prefix):
+                for doc_id, score in self.postings[term].items():
+                    prefix_scores[doc_id] += score
+                    matched[doc_id].add(term)
+
+            if scores is None:
+                scores = dict(prefix_scores)
+            else:
+                scores = {d: s + prefix_scores[d] for d, s in scores.items() if d in prefix_scores}
+
+            if not scores:
+                return []
+
+        if not scores:
+            return []
+
+        return sorted(
+            ((doc_id, score, matched[doc_id]) for doc_id, score in scores.items()),
+            key=lambda item: (-item[1], item[0])
+        )
+
+
+
+def render_headline(text: str | None) -> str:
+    """Escapes ts_headline output, then swaps its placeholder markers for <mark> tags"""
+
+    if not text:
+        return ""
+    return html.escape(text).replace(HEADLINE_START_TOKEN, HIGHLIGHT_START).replace(HEADLINE_STOP_TOKEN, HIGHLIGHT_STOP)
+
+
+
+def highlight(text: str | None, terms: set, max_words: int | None = None) -> str:
+    """HTML-escapes text and wraps matched words in <mark>, optionally trimming to a window around the first match"""
+
+    if not text:
+        return ""
+
+    words = text.split()
+    hits = [i for i, w in enumerate(words) if any(t in terms for t in tokenize(w))]
+
+    if max_words and len(words) > max_words:
+        start = max(0, (hits[0] if hits else 0) - max_words // 3)
+        words = words[start:start + max_words]
+        hits = [i - start for i in hits if start <= i < start + max_words]
+
+    words = [html.escape(w) for w in words]
+    for i in hits:
+        words[i] = f"{HIGHLIGHT_START}{words[i]}{HIGHLIGHT_STOP}"
+
+    return " ".join(words)
+
+
+
+def _search_in_memory(db: Session, query: str, limit: int) -> list[dict]:
+    rows = db.query(
+        CourseModel, UserModel.first_name, UserModel.last_name
+    ).join(
+        UserModel, CourseModel.instructor_id == UserModel.id
+    ).filter(
+        CourseModel.is_published == True
+    ).all()
+
+    index = InvertedIndex()
+    courses = {}
+    for course, fname, lname in rows:
+        instructor_name = f"{fname} {lname}"
+        courses[course.id] = (course, instructor_name)
+        index.add(course.id, {
+            "title": course.title,
+            "sub_title": course.sub_title,
+            "instructor": instructor_name,
+            "description": course.description
+        })
+    index.finalize()
+
+    results = []
+    for doc_id, score, terms in index.search(query)[:limit]:
+        course, instructor_name = courses[doc_id]
+        results.append(_result(
+            course,
+            instructor_name,
+            score,
+            highlight(course.title, terms),
+            highlight(course.description, terms, max_words=35)
+        ))
+
+    return results
+
+
+
+def _result(course: CourseModel, instructor_name: str, rank: float, title_highlight: str, snippet: str) -> dict:
+    return {
+        "id": course.id,
+        "title": course.title,
+        "sub_title": course.sub_title,
+        "category_id": course.category_id,
+        "image_url": course.image_url,
+        "image_variants": parse_variants(course.image_variants),
+        "instructor_id": course.instructor_id,
+        "instructor_name": instructor_name,
+        "price": course.price if course.is_paid else 0.0,
+        "is_paid": course.is_paid,
+        "rank": round(float(rank), 4),
+        "title_highlight": title_highlight,
+        "snippet": snippet
+    }
@@ -1,100 +1,132 @@
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig
+from sqlalchemy.orm import Session
+from sqlalchemy import event
 from dotenv import load_dotenv
+from jinja2 import Environment
+import json
 import os
+
+from models.email_outbox_model import EmailOutboxModel
+
 load_dotenv()
 
 
-conf = ConnectionConfig(
-    MAIL_USERNAME=os.getenv("MAIL_USERNAME"),
-    MAIL_PASSWORD=os.getenv("MAIL_PASSWORD"),   
-    MAIL_FROM=os.getenv("MAIL_FROM"),
-    MAIL_PORT=587,
-    MAIL_SERVER="smtp.gmail.com",
-    MAIL_STARTTLS=True,
-    MAIL_SSL_TLS=False,
-    USE_CREDENTIALS=True,
-)
+MAIL_USERNAME = os.getenv("MAIL_USERNAME")
+MAIL_PASSWORD = os.getenv("MAIL_PASSWORD")
+MAIL_FROM = os.getenv("MAIL_FROM")
+MAIL_PORT = int(os.getenv("MAIL_PORT", "587"))
+MAIL_SERVER = os.getenv("MAIL_SERVER", "smtp.gmail.com")
+MAIL_STARTTLS = os.getenv("MAIL_STARTTLS", "true").lower() == "true"
+MAIL_SSL_TLS = os.getenv("MAIL_SSL_TLS", "false").lower() == "true"
+MAIL_USE_CREDENTIALS = os.getenv("MAIL_USE_CREDENTIALS", "true").lower() == "true"
 
 
-async def send_verification_email(email: str, token: str):
-    verification_link = f"http://localhost:8000/auth/verify-email?token={token}"
+# -------------------------------
+# Templates (compiled once at import)
+# -------------------------------
+_jinja = Environment(autoescape=True)
 
-    html = f"""
+EMAIL_TEMPLATES = {
+    "verification": (
+        "Verify Your Email",
+        """
     <h3>Email Verification</h3>
     <p>Click the link below to verify your account:</p>
-    <a href="{verification_link}">{verification_link}</a>
+    <a href="{{ verification_link }}">{{ verification_link }}</a>
     """
+    ),
+    "reset_password": (
+        "Reset Your Password",
+        """
+    <h3>Password Reset Request</h3>
+    <p>We received a request to reset your password. Click the link below to set a new password:</p>
+    <a href="{{ reset_link }}">Reset Password</a>
+    <p>If you didn't ask to reset your password, you can ignore this email.</p>
+    """
+    ),
+    "blocked": (
+        "Account Blocked",
+        """
+    <h3>Account Blocked</h3>
+    <p>Your account has been blocked by the administrator due to a violation of our policies.</p>
+    <p>You can no longer log in. Please contact support if you believe this is an error.</p>
+    """
+    ),
+    "unblocked": (
+        "Account Unblocked",
+        """
+    <h3>Account Unblocked</h3>
+    <p>Good news! Your account has been unblocked by the administrator.</p>
+    <p>You can now log in and access your account.</p>
+    """
+    ),
+}
 
-    message = MessageSchema(
-        subject="Verify Your Email",
-        recipients=[email],
-        body=html,
-        subtype="html"
-    )
-
-    fm = FastMail(conf)
-    await fm.send_message(message)
+COMPILED_TEMPLATES = {
+    name: (subject, _jinja.from_string(body))
+    for name, (subject, body) in EMAIL_TEMPLATES.items()
+}
 
 
+def render_email(template: str, context: dict) -> tuple[str, str]:
+    subject, body = COMPILED_TEMPLATES[template]
+    return subject, body.render(**context)
 
 
-async def send_reset_password_email(email: str, token: str):
-    """Sends a password reset email to the user."""
-    # In production, change localhost to your frontend domain
-    reset_link = f"http://localhost:5173/set-password?token={token}"
 
-    html = f"""
-    <h3>Password Reset Request</h3>
-    <p>We received a request to reset your password. Click the link below to set a new password:</p>
-    <a href="{reset_link}">Reset Password</a>
-    <p>If you didn't ask to reset your password, you can ignore this email.</p>
+# -------------------------------
+# Outbox
+# -------------------------------
+def enqueue_email(db: Session, recipient: str, template: str, context: dict | None = None):
+    """
+    Adds the email to the outbox in the caller's transaction; the caller commits.
+    The delivery worker is woken once that commit succeeds, so a rolled-back
+    request never sends mail and a committed one never loses it.
     """
 
-    message = MessageSchema(
-        subject="Reset Your Password",
-        recipients=[email],
-        body=html,
-        subtype="html"
-    )
+    if template not in COMPILED_TEMPLATES:
+        raise ValueError(f"Unknown email template: {template}")
 
-    fm = FastMail(conf)
-    await fm.send_message(message)
+    db.add(EmailOutboxModel(
+        recipient=recipient,
+        template=template,
+        context=json.dumps(context or {}),
+        status="pending"
+    ))
+    db.info["email_queued"] = True
 
 
+@event.listens_for(Session, "after_commit")
+def _wake_email_worker(session: Session):
+    if session.info.pop("email_queued", False):
+        from utils.email_worker import email_worker
+        email_worker.notify()
 
-async def send_blocked_notification_email(email: str):
-    """Sends an email notification when a user is blocked."""
-    html = """
-    <h3>Account Blocked</h3>
-    <p>Your account has been blocked by the administrator due to a violation of our policies.</p>
-    <p>You can no longer log in. Please contact support if you believe this is an error.</p>
-    """
 
-    message = MessageSchema(
-        subject="Account Blocked",
-        recipients=[email],
-        body=html,
-        subtype="html"
-    )
+@event.listens_for(Session, "after_rollback")
+def _forget_queued_email(session: Session):
+    session.info.pop("email_queued", None)
 
-    fm = FastMail(conf)
-    await fm.send_message(message)
 
 
-async def send_unblocked_notification_email(email: str):
-    """Sends an email notification when a user is unblocked."""
-    html = """
-    <h3>Account Unblocked</h3>
-    <p>Good news! Your account has been unblocked by the administrator.</p>
-    <p>You can now log in and access your account.</p>
-    """
+def send_verification_email(db: Session, email: str, token: str):
+    verification_link = f"http://localhost:8000/auth/verify-email?token={token}"
+    enqueue_email(db, email, "verification", {"verification_link": verification_link})
+
+
+
+def send_reset_password_email(db: Session, email: str, token: str):
+    """Queues a password reset email to the user."""
+    # In production, change localhost to your frontend domain
+    reset_link = f"http://localhost:5173/set-password?token={token}"
+    enqueue_email(db, email, "reset_password", {"reset_link": reset_link})
+
+
+
+def send_blocked_notification_email(db: Session, email: str):
+    """Queues an email notification when a user is blocked."""
+    enqueue_email(db, email, "blocked")
 
-    message = MessageSchema(
-        subject="Account Unblocked",
-        recipients=[email],
-        body=html,
-        subtype="html"
-    )
 
-    fm = FastMail(conf)
-    await fm.send_message(message)
\ No newline at end of file
+def send_unblocked_notification_email(db: Session, email: str):
+    """Queues an email notification when a user is unblocked."""
+    enqueue_email(db, email, "unblocked")
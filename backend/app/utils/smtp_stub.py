@@ -0,0 +1,84 @@
+import asyncio
+
+
+class SMTPStub:
+    """
+    Tiny in-memory SMTP server for local development and tests.
+    Point MAIL_SERVER/MAIL_PORT at it with MAIL_STARTTLS=false and MAIL_USE_CREDENTIALS=false.
+    Every accepted message is kept in `messages` as (mail_from, rcpt_tos, raw_data).
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 1025):
+        self.host = host
+        self.port = port
+        self.messages = []
+        self.connections = 0
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+
+        async def reply(line: str):
+            writer.write(f"{line}\r\n".encode())
+            await writer.drain()
+
+        await reply("220 localhost SMTP stub ready")
+        mail_from, rcpt_tos = None, []
+
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command = line.decode(errors="replace").strip()
+            verb = command.split(" ", 1)[0].upper()
+
+            if verb in ("EHLO", "HELO"):
+                await reply("250-localhost")
+                await reply("250 8BITMIME")
+            elif verb == "MAIL":
+                mail_from, rcpt_tos = command.split(":", 1)[1].strip(), []
+                await reply("250 OK")
+            elif verb == "RCPT":
+                rcpt_tos.append(command.split(":", 1)[1].strip())
+                await reply("250 OK")
+            elif verb == "DATA":
+                await reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                while True:
+                    chunk = await reader.readline()
+                    if chunk in (b".\r\n", b".\n", b""):
+                        break
+                    data.append(chunk[1:] if chunk.startswith(b"..") else chunk)
+                self.messages.append((mail_from, rcpt_tos, b"".join(data)))
+                await reply("250 OK: queued")
+            elif verb in ("RSET", "NOOP"):
+                await reply("250 OK")
+            elif verb == "QUIT":
+                await reply("221 Bye")
+                break
+            else:
+                await reply("502 Command not implemented")
+
+        writer.close()
+
+
+
+async def serve_forever(host: str = "127.0.0.1", port: int = 1025):
+    stub = SMTPStub(host, port)
+    await stub.start()
+    print(f"SMTP stub listening on {stub.host}:{stub.port}")
+
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        await stub.stop()
@@ -0,0 +1,137 @@
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from uuid import uuid4
+import asyncio
+import random
+import uvicorn
+
+
+SESSION_PATH = "/gwprocess/v4/api.php"
+VALIDATION_PATH = "/validator/api/validationserverAPI.php"
+TRANSACTION_PATH = "/validator/api/merchantTransIDvalidationAPI.php"
+
+
+class SSLCommerzStub:
+    """
+    Fake SSLCommerz for local development and tests. Point SSLCOMMERZ_SESSION_API,
+    SSLCOMMERZ_VALIDATION_API and SSLCOMMERZ_TRANSACTION_API at it. `delay` and
+    `failure_rate` simulate a slow or flaky gateway; `complete(tran_id)` plays the
+    customer paying and returns the val_id.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8025, delay: float = 0.0, failure_rate: float = 0.0):
+        self.host = host
+        self.port = port
+        self.delay = delay
+        self.failure_rate = failure_rate
+        self.transactions = {}      # tran_id -> {"amount", "status", "val_id"}
+        self.requests = 0
+        self._server = None
+        self._task = None
+        self.app = Starlette(routes=[
+            Route(SESSION_PATH, self._create_session, methods=["POST"]),
+            Route(VALIDATION_PATH, self._validate, methods=["GET"]),
+            Route(TRANSACTION_PATH, self._transaction_status, methods=["GET"]),
+        ])
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        self._server = uvicorn.Server(uvicorn.Config(self.app, host=self.host, port=self.port, log_level="warning"))
+        self._task = asyncio.create_task(self._server.serve())
+        while not self._server.started:
+            await asyncio.sleep(0.01)
+        self.port = self._server.servers[0].sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.should_exit = True
+            await self._task
+
+    def complete(self, tran_id: str, status: str = "VALID") -> str:
+        transaction = self.transactions[tran_id]
+        transaction["status"] = status
+        transaction["val_id"] = transaction["val_id"] or uuid4().hex
+        return transaction["val_id"]
+
+    async def _simulate(self):
+        self.requests += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.failure_rate and random.random() < self.failure_rate:
+            return JSONResponse({"status": "FAILED", "failedreason": "Simulated outage"}, status_code=503)
+        return None
+
+    async def _create_session(self, request):
+        if (failure := await self._simulate()) is not None:
+            return failure
+
+        form = await request.form()
+        tran_id = form.get("tran_id")
+        if not tran_id:
+            return JSONResponse({"status": "FAILED", "failedreason": "tran_id missing"})
+
+        self.transactions.setdefault(tran_id, {"amount": form.get("total_amount"), "status": "PENDING", "val_id": None})
+        session_key = uuid4().hex
+        return JSONResponse({
+            "status": "SUCCESS",
+            "sessionkey": session_key,
+            "GatewayPageURL": f"{self.base_url}/gateway/{session_key}"
+        })
+
+    async def _validate(self, request):
+        if (failure := await self._simulate()) is not None:
+            return failure
+
+        val_id = request.query_params.get("val_id")
+        for tran_id, transaction in self.transactions.items():
+            if val_id and transaction["val_id"] == val_id:
+                return JSONResponse({
+                    "status": transaction["status"],
+                    "tran_id": tran_id,
+                    "val_id": val_id,
+                    "amount": transaction["amount"],
+                    "currency": "BDT"
+                })
+        return JSONResponse({"status": "INVALID_TRANSACTION"})
+
+    async def _transaction_status(self, request):
+        if (failure := await self._simulate()) is not None:
+            return failure
+
+        tran_id = request.query_params.get("tran_id")
+        transaction = self.transactions.get(tran_id)
+        # Sessions the customer never paid for have no gateway-side record yet
+        if transaction is None or transaction["val_id"] is None:
+            return JSONResponse({"APIConnect": "DONE", "no_of_trans_found": 0, "element": []})
+
+        return JSONResponse({
+            "APIConnect": "DONE",
+            "no_of_trans_found": 1,
+            "element": [{
+                "status": transaction["status"],
+                "tran_id": tran_id,
+                "val_id": transaction["val_id"],
+                "amount": transaction["amount"],
+                "currency": "BDT"
+            }]
+        })
+
+
+
+async def serve_forever(host: str = "127.0.0.1", port: int = 8025, delay: float = 0.0, failure_rate: float = 0.0):
+    stub = SSLCommerzStub(host, port, delay, failure_rate)
+    await stub.start()
+    print(f"SSLCommerz stub listening on {stub.base_url}")
+    print(f"  SSLCOMMERZ_SESSION_API={stub.base_url}{SESSION_PATH}")
+    print(f"  SSLCOMMERZ_VALIDATION_API={stub.base_url}{VALIDATION_PATH}")
+    print(f"  SSLCOMMERZ_TRANSACTION_API={stub.base_url}{TRANSACTION_PATH}")
+
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        await stub.stop()
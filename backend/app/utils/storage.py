@@ -0,0 +1,239 @@
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy import case
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from uuid import uuid4
+import hashlib
+import time
+import os
+
+from models.media_object_model import MediaObjectModel
+
+load_dotenv()
+
+
+MEDIA_STORAGE_BACKEND = os.getenv("MEDIA_STORAGE_BACKEND", "local")
+# Unreferenced objects and stray files younger than this are left alone by the sweep
+MEDIA_GC_GRACE_SECONDS = int(os.getenv("MEDIA_GC_GRACE_SECONDS", str(24 * 3600)))
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Objects live inside the directory they used to, so the static mount and signed media routes keep working
+VIDEO_OBJECTS = "uploads/videos/objects"
+COURSE_IMAGE_OBJECTS = "uploads/course_images/objects"
+PROFILE_IMAGE_OBJECTS = "uploads/profile_images/objects"
+OBJECT_ROOTS = [VIDEO_OBJECTS, COURSE_IMAGE_OBJECTS, PROFILE_IMAGE_OBJECTS]
+
+
+
+
+class LocalStorageBackend:
+    """Objects are plain files; keys are paths relative to the app directory"""
+
+    def put(self, source_path: str, key: str):
+        os.makedirs(os.path.dirname(key), exist_ok=True)
+        os.replace(source_path, key)
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(key)
+
+    def delete(self, key: str):
+        try:
+            os.remove(key)
+        except FileNotFoundError:
+            pass
+
+    def list(self, prefix: str):
+        """Yields (key, modified timestamp) for every object under `prefix`"""
+        for folder, _, files in os.walk(prefix):
+            for name in files:
+                key = os.path.join(folder, name)
+                try:
+                    yield key, os.path.getmtime(key)
+                except FileNotFoundError:
+                    continue
+
+
+# An S3-compatible backend registers here with the same put/exists/delete/list methods
+STORAGE_BACKENDS = {"local": LocalStorageBackend}
+
+backend = STORAGE_BACKENDS[MEDIA_STORAGE_BACKEND]()
+
+
+
+
+def object_key(root: str, sha256: str, filename: str) -> str:
+    ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else "bin"
+    return f"{root}/{sha256[:2]}/{sha256}.{ext}"
+
+
+
+def hash_file(path: str) -> tuple[str, int]:
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+
+def store_file(db: Session, temp_path: str, sha256: str, size: int, root: str, filename: str) -> str:
+    """
+    Takes ownership of `temp_path` and returns the storage key for its content.
+    Adds one reference inside the caller's transaction; identical content is kept once.
+    """
+
+    # The row lock taken here also orders us after a concurrent GC of the same object
+    obj = db.query(MediaObjectModel).filter(MediaObjectModel.sha256 == sha256).with_for_update().first()
+
+    if obj is not None:
+        obj.ref_count = MediaObjectModel.ref_count + 1
+        obj.released_at = None
+        key = obj.storage_key
+    else:
+        key = object_key(root, sha256, filename)
+        try:
+            with db.begin_nested():
+                db.add(MediaObjectModel(sha256=sha256, storage_key=key, size=size, ref_count=1))
+        except IntegrityError:
+            # Someone stored the same bytes a moment ago
+            db.query(MediaObjectModel).filter(MediaObjectModel.sha256 == sha256).update(
+                {"ref_count": MediaObjectModel.ref_count + 1, "released_at": None},
+                synchronize_session=False
+            )
+            key = db.query(MediaObjectModel.storage_key).filter(MediaObjectModel.sha256 == sha256).scalar()
+
+    if backend.exists(key):
+        os.remove(temp_path)
+    else:
+        # If the transaction later rolls back, the file is an orphan and the GC sweep removes it
+        backend.put(temp_path, key)
+
+    return key
+
+
+
+def store_upload_file(db: Session, fileobj, filename: str, root: str) -> str:
+    """Copies a FastAPI UploadFile's stream to disk while hashing it, then stores it by content"""
+
+    os.makedirs(root, exist_ok=True)
+    temp_path = os.path.join(root, f".incoming-{uuid4()}")
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        with open(temp_path, "wb") as out:
+            while chunk := fileobj.read(HASH_CHUNK_SIZE):
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+        return store_file(db, temp_path, digest.hexdigest(), size, root, filename)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+
+def release(db: Session, key: str | None) -> bool:
+    """
+    Drops one reference inside the caller's transaction. The bytes go away in the
+    GC sweep once nothing points at them. Returns False for files that predate the
+    object store, which the caller still owns.
+    """
+
+    if not key:
+        return True
+
+    released = db.query(MediaObjectModel).filter(
+        MediaObjectModel.storage_key == key,
+        MediaObjectModel.ref_count > 0
+    ).update({
+        "ref_count": MediaObjectModel.ref_count - 1,
+        "released_at": case((MediaObjectModel.ref_count <= 1, datetime.utcnow()), else_=MediaObjectModel.released_at)
+    }, synchronize_session=False)
+
+    return bool(released) or _is_object_key(key)
+
+
+
+def _is_object_key(key: str) -> bool:
+    return any(key.startswith(root + "/") for root in OBJECT_ROOTS)
+
+
+
+def remove_legacy_file(path: str | None):
+    """
+    Deletes a pre-object-store upload (and its image variants) once the row that pointed
+    at it is committed away. Object-store files are shared and left to the GC sweep.
+    """
+    from utils.image_variants import remove_variants
+
+    if path and not _is_object_key(path):
+        backend.delete(path)
+        remove_variants(path)
+
+
+
+
+# -------------------------------
+# Garbage Collection
+# -------------------------------
+def collect_garbage(db: Session, grace_seconds: int = MEDIA_GC_GRACE_SECONDS, dry_run: bool = False) -> dict:
+    """
+    Removes objects whose ref_count reached 0 more than `grace_seconds` ago, then
+    files under the object roots with no row at all (uploads whose transaction rolled back).
+    """
+
+    from utils.image_variants import remove_variants
+
+    cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+    stats = {"objects_removed": 0, "orphans_removed": 0, "bytes_freed": 0}
+
+    candidates = [row.sha256 for row in db.query(MediaObjectModel.sha256).filter(
+        MediaObjectModel.ref_count <= 0,
+        MediaObjectModel.released_at < cutoff
+    )]
+
+    for sha256 in candidates:
+        # Re-check under the row lock; an upload of the same bytes may have revived it
+        obj = db.query(MediaObjectModel).filter(
+            MediaObjectModel.sha256 == sha256,
+            MediaObjectModel.ref_count <= 0
+        ).with_for_update().first()
+
+        if obj is None:
+            db.commit()
+            continue
+
+        stats["objects_removed"] += 1
+        stats["bytes_freed"] += obj.size or 0
+
+        if dry_run:
+            db.rollback()
+            continue
+
+        backend.delete(obj.storage_key)
+        remove_variants(obj.storage_key)
+        db.delete(obj)
+        db.commit()
+
+    known = {key for (key,) in db.query(MediaObjectModel.storage_key)}
+    stale_before = time.time() - grace_seconds
+
+    for root in OBJECT_ROOTS:
+        for key, modified in backend.list(root):
+            if "/variants/" in key or key in known or modified > stale_before:
+                continue
+
+            stats["orphans_removed"] += 1
+            try:
+                stats["bytes_freed"] += os.path.getsize(key)
+            except OSError:
+                pass
+            if not dry_run:
+                backend.delete(key)
+
+    return stats
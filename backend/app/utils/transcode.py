@@ -0,0 +1,141 @@
+from dataclasses import dataclass
+from dotenv import load_dotenv
+import subprocess
+import shutil
+import json
+import os
+
+load_dotenv()
+
+
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+FFPROBE_BIN = os.getenv("FFPROBE_BIN", "ffprobe")
+FFMPEG_PRESET = os.getenv("FFMPEG_PRESET", "veryfast")
+HLS_SEGMENT_SECONDS = int(os.getenv("HLS_SEGMENT_SECONDS", "6"))
+HLS_OUTPUT_DIR = "uploads/videos/hls"
+HLS_MASTER_PLAYLIST = "master.m3u8"
+
+
+
+
+@dataclass(frozen=True)
+class Rendition:
+    name: str
+    height: int
+    video_bitrate: str
+    max_rate: str
+    buffer_size: str
+    audio_bitrate: str
+
+
+HLS_RENDITIONS = [
+    Rendition("360p", 360, "800k", "856k", "1200k", "96k"),
+    Rendition("720p", 720, "2800k", "2996k", "4200k", "128k"),
+    Rendition("1080p", 1080, "5000k", "5350k", "7500k", "192k"),
+]
+
+
+
+
+def probe_source(source: str) -> tuple[int, bool]:
+    """Returns (video height, has audio) for the uploaded file"""
+
+    result = subprocess.run(
+        [FFPROBE_BIN, "-v", "error", "-show_entries", "stream=codec_type,height", "-of", "json", source],
+        capture_output=True, text=True, check=True
+    )
+    streams = json.loads(result.stdout).get("streams", [])
+
+    heights = [s["height"] for s in streams if s.get("codec_type") == "video" and s.get("height")]
+    if not heights:
+        raise ValueError("No video stream found")
+
+    return heights[0], any(s.get("codec_type") == "audio" for s in streams)
+
+
+
+def pick_renditions(source_height: int) -> list[Rendition]:
+    # Never upscale; a source smaller than the lowest rung still gets that one rung
+    return [r for r in HLS_RENDITIONS if r.height <= source_height] or HLS_RENDITIONS[:1]
+
+
+
+def build_ffmpeg_command(source: str, output_dir: str, renditions: list[Rendition], has_audio: bool) -> list[str]:
+    """One ffmpeg pass: decode once, split, scale and encode every rendition with aligned keyframes"""
+
+    count = len(renditions)
+    splits = "".join(f"[v{i}]" for i in range(count))
+    filters = [f"[0:v]split={count}{splits}"]
+    filters += [f"[v{i}]scale=-2:{r.height}[v{i}out]" for i, r in enumerate(renditions)]
+
+    command = [FFMPEG_BIN, "-hide_banner", "-loglevel", "error", "-y", "-i", source,
+               "-filter_complex", ";".join(filters)]
+
+    for i, r in enumerate(renditions):
+        command += [
+            "-map", f"[v{i}out]",
+            f"-c:v:{i}", "libx264", f"-b:v:{i}", r.video_bitrate,
+            f"-maxrate:v:{i}", r.max_rate, f"-bufsize:v:{i}", r.buffer_size
+        ]
+        if has_audio:
+            command += ["-map", "a:0", f"-c:a:{i}", "aac", f"-b:a:{i}", r.audio_bitrate, "-ac", "2"]
+
+    stream_map = " ".join(
+        f"v:{i},a:{i},name:{r.name}" if has_audio else f"v:{i},name:{r.name}"
+        for i, r in enumerate(renditions)
+    )
+
+    # Fixed GOP at 2s so every rendition cuts segments on the same frames and players can switch cleanly
+    command += [
+        "-preset", FFMPEG_PRESET,
+        "-force_key_frames", "expr:gte(t,n_forced*2)",
+        "-sc_threshold", "0",
+        "-f", "hls",
+        "-hls_time", str(HLS_SEGMENT_SECONDS),
+        "-hls_playlist_type", "vod",
+        "-hls_flags", "independent_segments",
+        "-hls_segment_filename", os.path.join(output_dir, "%v", "segment_%05d.ts"),
+        "-master_pl_name", HLS_MASTER_PLAYLIST,
+        "-var_stream_map", stream_map,
+        os.path.join(output_dir, "%v", "index.m3u8")
+    ]
+    return command
+
+
+
+def transcode_to_hls(source: str, output_dir: str) -> str:
+    """
+    Runs in a worker process. Writes the renditions into a temporary sibling
+    directory and renames it into place, so a playlist is never visible half written.
+    Returns the master playlist path.
+    """
+
+    height, has_audio = probe_source(source)
+    renditions = pick_renditions(height)
+
+    work_dir = f"{output_dir}.partial"
+    shutil.rmtree(work_dir, ignore_errors=True)
+    for r in renditions:
+        os.makedirs(os.path.join(work_dir, r.name), exist_ok=True)
+
+    try:
+        subprocess.run(
+            build_ffmpeg_command(source, work_dir, renditions, has_audio),
+            capture_output=True, text=True, check=True
+        )
+        os.replace(work_dir, output_dir)
+    except subprocess.CalledProcessError as e:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise RuntimeError((e.stderr or "ffmpeg failed").strip()[-2000:])
+    except BaseException:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise
+
+    return os.path.join(output_dir, HLS_MASTER_PLAYLIST)
+
+
+
+def remove_hls_output(hls_path: str | None):
+    """Deletes the rendition directory that holds `hls_path`"""
+    if hls_path:
+        shutil.rmtree(os.path.dirname(hls_path), ignore_errors=True)
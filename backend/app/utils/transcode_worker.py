@@ -0,0 +1,151 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, or_, and_
+from dotenv import load_dotenv
+from uuid import uuid4
+import asyncio
+import shutil
+import os
+
+import database_config
+from models.video_model import VideoModel
+from utils.transcode import transcode_to_hls, remove_hls_output, HLS_OUTPUT_DIR, FFMPEG_BIN
+
+load_dotenv()
+
+
+# ffmpeg is CPU bound and already multithreaded, so one or two jobs per box is usually right
+TRANSCODE_CONCURRENCY = int(os.getenv("TRANSCODE_CONCURRENCY", "1"))
+TRANSCODE_POLL_INTERVAL = float(os.getenv("TRANSCODE_POLL_INTERVAL", "10"))
+# A job stuck in `processing` longer than this (worker died) is picked up again
+TRANSCODE_LEASE_SECONDS = int(os.getenv("TRANSCODE_LEASE_SECONDS", str(3 * 3600)))
+
+os.makedirs(HLS_OUTPUT_DIR, exist_ok=True)
+
+
+
+
+class TranscodeWorker:
+    """Claims queued videos and runs ffmpeg for them in a process pool"""
+
+    def __init__(self):
+        self._pool = None
+        self._task = None
+        self._loop = None
+        self._wakeup = None
+        self._stopping = False
+        self._running = set()
+
+    def start(self):
+        if shutil.which(FFMPEG_BIN) is None:
+            # Videos stay queued and keep playing from the original file until a worker with ffmpeg runs
+            print(f"Transcode worker disabled: '{FFMPEG_BIN}' not found")
+            return
+
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._pool = ProcessPoolExecutor(max_workers=TRANSCODE_CONCURRENCY)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._stopping = True
+        if self._task is not None:
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        for task in list(self._running):
+            task.cancel()
+        if self._pool is not None:
+            # Unfinished jobs keep their lease and are retried after it runs out
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def notify(self):
+        """Wakes the worker; safe to call from request threads"""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await self.claim_jobs()
+            except Exception as e:
+                print(f"Transcode worker error: {str(e)}")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=TRANSCODE_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def claim_jobs(self):
+        free_slots = TRANSCODE_CONCURRENCY - len(self._running)
+        if free_slots <= 0:
+            return
+
+        database_config.get_async_engine()
+        now = datetime.utcnow()
+
+        async with database_config.AsyncSessionLocal() as db:
+            batch = (await db.execute(
+                select(VideoModel).where(or_(
+                    VideoModel.transcode_status == "queued",
+                    and_(
+                        VideoModel.transcode_status == "processing",
+                        VideoModel.transcode_started_at < now - timedelta(seconds=TRANSCODE_LEASE_SECONDS)
+                    )
+                )).order_by(VideoModel.id).limit(free_slots).with_for_update(skip_locked=True)
+            )).scalars().all()
+
+            jobs = []
+            for video in batch:
+                video.transcode_status = "processing"
+                video.transcode_started_at = now
+                video.transcode_error = None
+                jobs.append((video.id, video.video_url))
+            await db.commit()
+
+        for video_id, source in jobs:
+            task = asyncio.create_task(self._transcode(video_id, source))
+            self._running.add(task)
+            task.add_done_callback(self._job_done)
+
+    def _job_done(self, task):
+        self._running.discard(task)
+        if not self._stopping:
+            self._wakeup.set()
+
+    async def _transcode(self, video_id: int, source: str):
+        output_dir = os.path.join(HLS_OUTPUT_DIR, f"{video_id}-{uuid4().hex[:8]}")
+
+        try:
+            master = await self._loop.run_in_executor(self._pool, transcode_to_hls, source, output_dir)
+            values = {"transcode_status": "ready", "hls_path": master, "transcoded_at": datetime.utcnow()}
+        except Exception as e:
+            master = None
+            values = {"transcode_status": "failed", "transcode_error": str(e) or e.__class__.__name__}
+
+        async with database_config.AsyncSessionLocal() as db:
+            previous = (await db.execute(
+                select(VideoModel.hls_path).where(VideoModel.id == video_id)
+            )).scalar_one_or_none()
+
+            # Only lands if the video still points at the file that was transcoded
+            result = await db.execute(
+                update(VideoModel).where(
+                    VideoModel.id == video_id,
+                    VideoModel.video_url == source,
+                    VideoModel.transcode_status == "processing"
+                ).values(**values)
+            )
+            await db.commit()
+
+        if result.rowcount == 0:
+            remove_hls_output(master)
+        elif master and previous and previous != master:
+            remove_hls_output(previous)
+
+
+
+transcode_worker = TranscodeWorker()
@@ -0,0 +1,213 @@
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.concurrency import run_in_threadpool
+from fastapi import HTTPException, Request
+from dataclasses import dataclass, field
+from dotenv import load_dotenv
+from uuid import uuid4
+import hashlib
+import os
+
+load_dotenv()
+
+
+# Writes are issued in multiples of this size (1 MiB), which keeps disk I/O aligned and syscalls few
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+MAX_VIDEO_UPLOAD_BYTES = int(os.getenv("MAX_VIDEO_UPLOAD_BYTES", str(5 * 1024 ** 3)))
+MAX_UPLOAD_REQUEST_BYTES = int(os.getenv("MAX_UPLOAD_REQUEST_BYTES", str(20 * 1024 ** 3)))
+MAX_FORM_FIELD_BYTES = 1024 * 1024
+
+
+
+
+@dataclass
+class StoredUpload:
+    field_name: str
+    filename: str
+    content_type: str | None
+    path: str
+    size: int = 0
+    sha256: str = ""
+
+
+@dataclass
+class StreamedForm:
+    fields: dict = field(default_factory=dict)     # name -> str
+    files: dict = field(default_factory=dict)      # name -> list[StoredUpload]
+
+    def get_files(self, name: str) -> list:
+        return self.files.get(name, [])
+
+    def discard_files(self):
+        """Removes everything written for this request, used when the upload is rejected"""
+        for uploads in self.files.values():
+            for upload in uploads:
+                try:
+                    os.remove(upload.path)
+                except FileNotFoundError:
+                    pass
+
+
+
+class _FileSink:
+    """Buffers part data and flushes it to disk in aligned chunks, hashing as it goes"""
+
+    def __init__(self, upload: StoredUpload, max_bytes: int):
+        self.upload = upload
+        self.max_bytes = max_bytes
+        self.buffer = bytearray()
+        self.digest = hashlib.sha256()
+        self.file = open(upload.path, "wb", buffering=0)
+
+    def _write(self, data: bytes):
+        self.digest.update(data)
+        self.file.write(data)
+
+    async def feed(self, data: bytes):
+        self.upload.size += len(data)
+        if self.upload.size > self.max_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File '{self.upload.filename}' exceeds the {self.max_bytes // (1024 * 1024)} MB limit"
+            )
+
+        self.buffer += data
+        if len(self.buffer) >= UPLOAD_CHUNK_SIZE:
+            aligned = len(self.buffer) - (len(self.buffer) % UPLOAD_CHUNK_SIZE)
+            chunk = bytes(self.buffer[:aligned])
+            del self.buffer[:aligned]
+            await run_in_threadpool(self._write, chunk)
+
+    async def finish(self):
+        if self.buffer:
+            await run_in_threadpool(self._write, bytes(self.buffer))
+            self.buffer.clear()
+        self.upload.sha256 = self.digest.hexdigest()
+        self.file.close()
+
+    def abort(self):
+        self.file.close()
+
+
+
+async def stream_multipart_upload(
+    request: Request,
+    upload_dir: str,
+    max_file_bytes: int = MAX_VIDEO_UPLOAD_BYTES
+) -> StreamedForm:
+    """
+    Parses a multipart body straight off the socket. File parts are written to
+    `upload_dir` under a fresh uuid name as the bytes arrive, with no temp spool
+    and no second copy. Oversized files abort the request mid-stream with 413.
+    """
+
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data body")
+
+    declared_length = request.headers.get("content-length")
+    if declared_length and declared_length.isdigit() and int(declared_length) > MAX_UPLOAD_REQUEST_BYTES:
+        raise HTTPException(status_code=413, detail="Upload is too large")
+
+    form = StreamedForm()
+    events = []
+    header = {"field": b"", "value": b""}
+    headers = {}
+
+    def on_part_begin():
+        headers.clear()
+
+    def on_header_field(data, start, end):
+        header["field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        header["value"] += data[start:end]
+
+    def on_header_end():
+        headers[header["field"].lower()] = header["value"]
+        header["field"], header["value"] = b"", b""
+
+    def on_headers_finished():
+        events.append(("begin", dict(headers)))
+
+    def on_part_data(data, start, end):
+        events.append(("data", bytes(data[start:end])))
+
+    def on_part_end():
+        events.append(("end", None))
+
+    parser = MultipartParser(params[b"boundary"], {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+
+    sink = None
+    skip_part = False
+    field_name = None
+    field_value = bytearray()
+    received = 0
+
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > MAX_UPLOAD_REQUEST_BYTES:
+                raise HTTPException(status_code=413, detail="Upload is too large")
+
+            parser.write(chunk)
+
+            for kind, payload in events:
+                if kind == "begin":
+                    skip_part = False
+                    _, disposition = parse_options_header(payload.get(b"content-disposition", b""))
+                    field_name = disposition.get(b"name", b"").decode("utf-8", "replace")
+                    filename = disposition.get(b"filename")
+
+                    if filename == b"":
+                        # Browsers send an empty file part when no file was picked
+                        skip_part = True
+                    elif filename is not None:
+                        filename = filename.decode("utf-8", "replace")
+                        ext = filename.rsplit(".", 1)[-1] if "." in filename else "bin"
+                        upload = StoredUpload(
+                            field_name=field_name,
+                            filename=filename,
+                            content_type=payload.get(b"content-type", b"").decode() or None,
+                            path=os.path.join(upload_dir, f"{uuid4()}.{ext}")
+                        )
+                        form.files.setdefault(field_name, []).append(upload)
+                        sink = _FileSink(upload, max_file_bytes)
+                    else:
+                        field_value.clear()
+
+                elif skip_part:
+                    continue
+
+                elif kind == "data":
+                    if sink is not None:
+                        await sink.feed(payload)
+                    else:
+                        field_value += payload
+                        if len(field_value) > MAX_FORM_FIELD_BYTES:
+                            raise HTTPException(status_code=413, detail=f"Form field '{field_name}' is too large")
+
+                elif kind == "end":
+                    if sink is not None:
+                        await sink.finish()
+                        sink = None
+                    else:
+                        form.fields[field_name] = field_value.decode("utf-8")
+
+            events.clear()
+
+        parser.finalize()
+    except BaseException:
+        if sink is not None:
+            sink.abort()
+        form.discard_files()
+        raise
+
+    return form
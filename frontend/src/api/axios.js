@@ -85,9 +85,13 @@ export const initiatePayment = (courseId) =>
 
 // --- PUBLIC ROUTES ---
 
-// Fetch all public courses
-export const getPublicCourses = () => 
-  api.get('/public/courses').then((r) => r.data);
+// Fetch one page of public courses ({ category_id, sort, limit, cursor }); pass next_cursor back as cursor
+export const getPublicCourses = (params = {}) => 
+  api.get('/public/courses', { params }).then((r) => r.data);
+
+// Full-text search over all published courses
+export const searchPublicCourses = (q, limit = 50) =>
+  api.get('/public/search', { params: { q, limit } }).then((r) => r.data);
 
 // Fetch public course details
 export const getPublicCourseDetails = (courseId) => 
@@ -147,6 +151,11 @@ export const updateVideoProgress = (videoId, watched) =>
   api.post(`/progress/videos/${videoId}/progress?watched=${watched}`).then((r) => r.data);
 
 
+// Playback Heartbeat (position + seconds watched since the last one)
+export const sendVideoHeartbeat = (videoId, position, watchedSeconds) =>
+  api.post(`/progress/videos/${videoId}/heartbeat`, { position, watched_seconds: watchedSeconds }).then((r) => r.data);
+
+
 // Get Course Certificate
 export const getCourseCertificate = (courseId) =>
   api.get(`/user/courses/${courseId}/certificate`).then((r) => r.data);
@@ -127,7 +127,28 @@ export default function MyCoursesGallery() {
                   {course.sub_title && (
                     <p className="text-sm text-[#222222]/60 line-clamp-1 mb-3">{course.sub_title}</p>
                   )}
-                  
+
+                  <div className="flex flex-wrap gap-x-4 gap-y-1 text-xs text-[#222222]/60 mb-3">
+                    <span className="flex items-center gap-1">
+                      <span className="material-symbols-outlined text-[16px]">group</span>
+                      {course.enrollment_count} students
+                    </span>
+                    <span className="flex items-center gap-1">
+                      <span className="material-symbols-outlined text-[16px]">star</span>
+                      {course.rating_count > 0 ? `${course.average_rating.toFixed(1)} (${course.rating_count})` : 'No ratings'}
+                    </span>
+                    <span className="flex items-center gap-1">
+                      <span className="material-symbols-outlined text-[16px]">play_circle</span>
+                      {course.video_count} videos
+                    </span>
+                    {course.is_paid && (
+                      <span className="flex items-center gap-1">
+                        <span className="material-symbols-outlined text-[16px]">payments</span>
+                        ${course.revenue_total.toFixed(2)}
+                      </span>
+                    )}
+                  </div>
+
                   <div className="mt-auto flex items-center justify-between border-t border-[#F5E7C6]/50 pt-4">
                     <span className={`text-xs font-bold px-2 py-1 rounded-md uppercase ${course.is_paid ? 'bg-[#FAF3E1] text-[#FF6D1F]' : 'bg-green-100 text-green-700'}`}>
                       {course.is_paid ? 'Paid' : 'Free'}
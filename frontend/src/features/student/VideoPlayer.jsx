@@ -1,7 +1,10 @@
 import React, { useState, useEffect, useRef } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
-import { getEnrolledCourseDetails, updateVideoProgress, getCourseProgress, submitCourseRating } from '../../api/axios';
+import { getEnrolledCourseDetails, updateVideoProgress, getCourseProgress, submitCourseRating, sendVideoHeartbeat } from '../../api/axios';
+
+// How often the player reports its position while playing
+const HEARTBEAT_INTERVAL_MS = 15000;
 
 // Base URL for video assets
 const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://127.0.0.1:8000';
@@ -129,6 +132,63 @@ export default function VideoPlayer() {
     return () => video.removeEventListener('timeupdate', handleTimeUpdate);
   }, [currentVideoIndex, courseData, watchedVideos, hasMarkedComplete, markWatchedMutation]);
 
+  // Resume where the student left off and report playback position
+  useEffect(() => {
+    const video = videoRef.current;
+    const currentVideo = courseData?.videos?.[currentVideoIndex];
+
+    if (!video || !currentVideo) return;
+
+    let lastTime = null;
+    let watchedSeconds = 0;
+
+    const handleLoadedMetadata = () => {
+      const resumeAt = currentVideo.position_seconds || 0;
+      // Start over if the previous session ended near the end
+      if (resumeAt > 0 && resumeAt < video.duration - 5) {
+        video.currentTime = resumeAt;
+      }
+    };
+
+    const handleTimeUpdate = () => {
+      // Only count time actually played, not seeks
+      if (lastTime !== null && !video.seeking) {
+        const delta = video.currentTime - lastTime;
+        if (delta > 0 && delta < 2) watchedSeconds += delta;
+      }
+      lastTime = video.currentTime;
+    };
+
+    const sendHeartbeat = () => {
+      if (lastTime === null) return;
+      const seconds = watchedSeconds;
+      watchedSeconds = 0;
+      sendVideoHeartbeat(currentVideo.id, video.currentTime, seconds).catch(() => {});
+    };
+
+    const handleSeeked = () => {
+      lastTime = video.currentTime;
+    };
+
+    const timer = setInterval(() => {
+      if (!video.paused) sendHeartbeat();
+    }, HEARTBEAT_INTERVAL_MS);
+
+    video.addEventListener('loadedmetadata', handleLoadedMetadata);
+    video.addEventListener('timeupdate', handleTimeUpdate);
+    video.addEventListener('seeked', handleSeeked);
+    video.addEventListener('pause', sendHeartbeat);
+
+    return () => {
+      clearInterval(timer);
+      sendHeartbeat();
+      video.removeEventListener('loadedmetadata', handleLoadedMetadata);
+      video.removeEventListener('timeupdate', handleTimeUpdate);
+      video.removeEventListener('seeked', handleSeeked);
+      video.removeEventListener('pause', sendHeartbeat);
+    };
+  }, [currentVideoIndex, courseData]);
+
   // Auto-show Rating Modal when progress reaches 100% (only once)
   useEffect(() => {
     const progressPercentage = progressData ? progressData.completion_percentage : 0;
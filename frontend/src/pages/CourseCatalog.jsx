@@ -1,10 +1,17 @@
-import React, { useState } from 'react';
-import { useQuery } from '@tanstack/react-query';
+import React, { useEffect, useState } from 'react';
+import { useInfiniteQuery, useQuery } from '@tanstack/react-query';
 import { useNavigate } from 'react-router-dom';
-import { getPublicCourses, getAllCategories } from '../api/axios'; 
+import { getPublicCourses, searchPublicCourses, getAllCategories } from '../api/axios'; 
 
 const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://127.0.0.1:8000';
 
+const SORT_OPTIONS = [
+  { value: 'newest', label: 'Newest' },
+  { value: 'rating', label: 'Highest Rated' },
+  { value: 'price_asc', label: 'Price: Low to High' },
+  { value: 'price_desc', label: 'Price: High to Low' },
+];
+
 const getImageUrl = (path) => {
   if (!path) return null;
   if (path.startsWith('http')) return path;
@@ -15,12 +22,36 @@ const getImageUrl = (path) => {
 export default function CourseCatalog() {
   const navigate = useNavigate();
   const [searchTerm, setSearchTerm] = useState('');
-  const [selectedCategories, setSelectedCategories] = useState([]);
+  const [debouncedSearch, setDebouncedSearch] = useState('');
+  const [selectedCategory, setSelectedCategory] = useState(null);
+  const [sort, setSort] = useState('newest');
+
+  // Wait for the user to stop typing before hitting the search endpoint
+  useEffect(() => {
+    const timer = setTimeout(() => setDebouncedSearch(searchTerm.trim()), 300);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
 
-  // Fetch Courses
-  const { data, isLoading, isError } = useQuery({
-    queryKey: ['public-courses'],
-    queryFn: getPublicCourses,
+  const isSearching = debouncedSearch.length > 0;
+
+  // Catalog pages, filtered and sorted on the server
+  const catalog = useInfiniteQuery({
+    queryKey: ['public-courses', selectedCategory, sort],
+    queryFn: ({ pageParam }) => getPublicCourses({
+      category_id: selectedCategory ?? undefined,
+      sort,
+      cursor: pageParam ?? undefined,
+    }),
+    initialPageParam: null,
+    getNextPageParam: (lastPage) => lastPage.next_cursor ?? undefined,
+    enabled: !isSearching,
+  });
+
+  // Search runs over every published course, not just the loaded pages
+  const search = useQuery({
+    queryKey: ['public-search', debouncedSearch],
+    queryFn: () => searchPublicCourses(debouncedSearch),
+    enabled: isSearching,
   });
 
   // Fetch Categories
@@ -29,29 +60,21 @@ export default function CourseCatalog() {
     queryFn: getAllCategories,
   });
 
-  const courses = data?.courses || [];
+  const courses = isSearching
+    ? (search.data?.results || []).filter(c => selectedCategory === null || c.category_id === selectedCategory)
+    : (catalog.data?.pages || []).flatMap(page => page.courses);
+  const isLoading = isSearching ? search.isLoading : catalog.isLoading;
+  const isError = isSearching ? search.isError : catalog.isError;
 
-  // Category Selection
-  const toggleCategory = (catName) => {
-    setSelectedCategories(prev => 
-      prev.includes(catName) 
-        ? prev.filter(c => c !== catName) 
-        : [...prev, catName]
-    );
+  // Category Selection (one at a time, click again to clear)
+  const toggleCategory = (categoryId) => {
+    setSelectedCategory(prev => (prev === categoryId ? null : categoryId));
   };
 
-  // Client-side filtering
-  const filteredCourses = courses.filter(c => {
-    const matchesSearch = 
-      c.title.toLowerCase().includes(searchTerm.toLowerCase()) || 
-      c.category.toLowerCase().includes(searchTerm.toLowerCase());
-    
-    const matchesCategory = 
-      selectedCategories.length === 0 || 
-      selectedCategories.includes(c.category);
-
-    return matchesSearch && matchesCategory;
-  });
+  const clearFilters = () => {
+    setSearchTerm('');
+    setSelectedCategory(null);
+  };
 
   return (
     <>
@@ -81,12 +104,12 @@ export default function CourseCatalog() {
                         <input 
                           type="checkbox" 
                           className="peer appearance-none h-5 w-5 border-2 border-[#222222]/20 rounded transition-colors checked:bg-[#FF6D1F] checked:border-[#FF6D1F]"
-                          checked={selectedCategories.includes(cat.name)}
-                          onChange={() => toggleCategory(cat.name)}
+                          checked={selectedCategory === cat.id}
+                          onChange={() => toggleCategory(cat.id)}
                         />
                         <span className="material-symbols-outlined text-white text-[14px] absolute left-1/2 top-1/2 -translate-x-1/2 -translate-y-1/2 opacity-0 peer-checked:opacity-100 pointer-events-none">check</span>
                       </div>
-                      <span className={`font-medium transition-colors ${selectedCategories.includes(cat.name) ? 'text-[#FF6D1F]' : 'text-[#222222] group-hover:text-[#FF6D1F]'}`}>
+                      <span className={`font-medium transition-colors ${selectedCategory === cat.id ? 'text-[#FF6D1F]' : 'text-[#222222] group-hover:text-[#FF6D1F]'}`}>
                         {cat.name}
                       </span>
                     </label>
@@ -105,6 +128,19 @@ export default function CourseCatalog() {
                   <p className="text-[#222222]/70 mt-2 font-medium">Find the perfect course to upgrade your skills.</p>
                 </div>
                 
+                <div className="flex flex-col sm:flex-row gap-3 w-full md:w-auto">
+                {/* sort */}
+                <select
+                  value={sort}
+                  onChange={(e) => setSort(e.target.value)}
+                  disabled={isSearching}
+                  className="px-4 py-3 bg-white border-2 border-[#F5E7C6] rounded-xl focus:outline-none focus:border-[#FF6D1F] text-[#222222] font-medium disabled:opacity-50"
+                >
+                  {SORT_OPTIONS.map(option => (
+                    <option key={option.value} value={option.value}>{option.label}</option>
+                  ))}
+                </select>
+
                 {/* search bar */}
                 <div className="relative w-full md:w-96">
                   <span className="material-symbols-outlined absolute left-4 top-1/2 -translate-y-1/2 text-[#222222]/40">search</span>
@@ -116,6 +152,7 @@ export default function CourseCatalog() {
                     className="w-full pl-12 pr-4 py-3 bg-white border-2 border-[#F5E7C6] rounded-xl focus:outline-none focus:border-[#FF6D1F] focus:ring-0 transition-colors placeholder-[#222222]/30 text-[#222222] font-medium"
                   />
                 </div>
+                </div>
               </div>
 
               {/* Loading State */}
@@ -131,24 +168,28 @@ export default function CourseCatalog() {
               {/* cards grid */}
               {!isLoading && !isError && (
                 <div className="grid grid-cols-1 md:grid-cols-2 xl:grid-cols-3 gap-6">
-                  {filteredCourses.length > 0 ? (
-                    filteredCourses.map((c) => (
+                  {courses.length > 0 ? (
+                    courses.map((c) => (
                       <CourseCard key={c.id} course={c} onClick={() => navigate(`/courses/${c.id}`)} />
                     ))
                   ) : (
                     <div className="col-span-full py-20 text-center bg-white rounded-2xl border border-dashed border-[#F5E7C6]">
                        <p className="text-[#222222]/40 font-bold">No courses found matching your criteria.</p>
-                       <button onClick={() => { setSearchTerm(''); setSelectedCategories([]); }} className="mt-4 text-[#FF6D1F] underline font-bold">Clear Filters</button>
+                       <button onClick={clearFilters} className="mt-4 text-[#FF6D1F] underline font-bold">Clear Filters</button>
                     </div>
                   )}
                 </div>
               )}
 
-              {/* pagination (visual only for now) */}
-              {!isLoading && filteredCourses.length > 0 && (
+              {/* pagination: the next page starts after the last course loaded */}
+              {!isSearching && catalog.hasNextPage && (
                 <div className="flex justify-center mt-12 mb-8">
-                  <button className="bg-[#F5E7C6] hover:bg-[#FF6D1F] hover:text-white text-[#222222] font-bold py-3 px-8 rounded-lg transition-colors flex items-center gap-2 group">
-                    Load More Courses
+                  <button
+                    onClick={() => catalog.fetchNextPage()}
+                    disabled={catalog.isFetchingNextPage}
+                    className="bg-[#F5E7C6] hover:bg-[#FF6D1F] hover:text-white text-[#222222] font-bold py-3 px-8 rounded-lg transition-colors flex items-center gap-2 group disabled:opacity-50"
+                  >
+                    {catalog.isFetchingNextPage ? 'Loading...' : 'Load More Courses'}
                     <span className="material-symbols-outlined group-hover:translate-y-0.5 transition-transform">expand_more</span>
                   </button>
                 </div>
@@ -191,9 +232,11 @@ function CourseCard({ course, onClick }) {
            </div>
         )}
         
-        <div className="absolute top-3 left-3 bg-white/90 backdrop-blur-sm px-2 py-1 rounded text-xs font-bold text-[#222222] uppercase tracking-wide">
-          {course.category}
-        </div>
+        {course.category && (
+          <div className="absolute top-3 left-3 bg-white/90 backdrop-blur-sm px-2 py-1 rounded text-xs font-bold text-[#222222] uppercase tracking-wide">
+            {course.category}
+          </div>
+        )}
       </div>
 
       {/* content */}
@@ -30,10 +30,10 @@ const Home = () => {
 
   const { data: coursesData, isLoading: isLoadingCourses } = useQuery({
     queryKey: ['home-courses'],
-    queryFn: getPublicCourses,
+    queryFn: () => getPublicCourses({ limit: 7 }),
   });
 
-  const featuredCourses = coursesData?.courses?.slice(0, 7) || [];
+  const featuredCourses = coursesData?.courses || [];
   const featuredCategories = categories.slice(0, 4);
   return (
     <main>